@@ -0,0 +1,38 @@
+"""
+Benchmark of `Registry.add` with heavily interleaved acks.
+
+Every worker of a pool acks its own stride of pks, so the registry stays
+fragmented in as many segments as acked pks until the strides meet.
+
+Usage: python benchmarks/registry_add.py [ACKS] [WORKERS]
+
+"""
+import sys
+import time
+
+from binlog.registry import Registry
+
+
+def interleaved(acks, workers):
+    for offset in range(workers):
+        yield from range(offset, acks * workers, workers)
+
+
+def main(acks=100000, workers=4):
+    registry = Registry()
+    pks = list(interleaved(acks // workers, workers))
+
+    start = time.perf_counter()
+    max_segments = 0
+    for i, pk in enumerate(pks):
+        registry.add(pk)
+        if i % 1000 == 0:
+            max_segments = max(max_segments, len(registry.acked))
+    elapsed = time.perf_counter() - start
+
+    print("%d acks, %d workers: %.3fs (%.2fus/ack, up to %d segments)" % (
+        len(pks), workers, elapsed, elapsed / len(pks) * 1e6, max_segments))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -20,9 +20,14 @@ class Database(metaclass=abc.ABCMeta):
         """ Value serializer """
         pass
 
+    #: Name of the database, the lowercased class name if None.
+    NAME = None
+
     @classmethod
     def get_db_name(cls, db_name):
-        return cls.__name__.lower() if db_name is None else db_name
+        if db_name is not None:
+            return db_name
+        return cls.__name__.lower() if cls.NAME is None else cls.NAME
 
     @classmethod
     def get_db_handler(cls, res, db_name=None):
@@ -64,3 +69,107 @@ class IterSeek(Iterator):
     def __or__(self, other):
         from .operations import ORIterSeek
         return ORIterSeek(self, other)
+
+
+class RawCursor(metaclass=abc.ABCMeta):
+    """
+    Raw cursor over the (right, left) records of a registry.
+
+    It mimics the subset of `lmdb.Cursor` used with the registries, keys
+    and values being the packed right and left bounds, on top of the LMDB
+    cursor `self.cursor`.
+
+    """
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_, **__):
+        self.close()
+
+    def close(self):
+        self.cursor.close()
+
+    @property
+    @abc.abstractmethod
+    def positioned(self):  # pragma: no cover
+        """True if the cursor points to a record."""
+
+    @abc.abstractmethod
+    def first(self):  # pragma: no cover
+        pass
+
+    @abc.abstractmethod
+    def last(self):  # pragma: no cover
+        pass
+
+    @abc.abstractmethod
+    def next(self):  # pragma: no cover
+        pass
+
+    @abc.abstractmethod
+    def prev(self):  # pragma: no cover
+        pass
+
+    @abc.abstractmethod
+    def set_range(self, key):  # pragma: no cover
+        pass
+
+    @abc.abstractmethod
+    def set_key(self, key):  # pragma: no cover
+        pass
+
+    @abc.abstractmethod
+    def key(self):  # pragma: no cover
+        pass
+
+    @abc.abstractmethod
+    def value(self):  # pragma: no cover
+        pass
+
+    @abc.abstractmethod
+    def delete(self, dupdata=False):  # pragma: no cover
+        pass
+
+    @abc.abstractmethod
+    def put(self, key, value, **kwargs):  # pragma: no cover
+        pass
+
+    def get(self, key, default=None):
+        if self.set_key(key):
+            return self.value()
+        return default
+
+    def item(self):
+        return self.key(), self.value()
+
+    def _iterate(self, step, keys, values):
+        while True:
+            if keys and values:
+                yield self.item()
+            elif keys:
+                yield self.key()
+            else:
+                yield self.value()
+            if not step():
+                return
+
+    def iternext(self, keys=True, values=True):
+        if not self.positioned and not self.first():
+            return iter(())
+        return self._iterate(self.next, keys, values)
+
+    def iterprev(self, keys=True, values=True):
+        if not self.positioned and not self.last():
+            return iter(())
+        return self._iterate(self.prev, keys, values)
+
+    def putmulti(self, items, dupdata=False, overwrite=True, append=False):
+        consumed = added = 0
+        for key, value in items:
+            consumed += 1
+            if self.put(key, value, overwrite=overwrite):
+                added += 1
+        return consumed, added
@@ -0,0 +1,356 @@
+"""
+asyncio interface.
+
+Every `AsyncConnection` owns a worker thread holding a connection that
+shares the LMDB environments of the process connection to the binlog.
+All the LMDB work is dispatched to that thread so the event loop never
+blocks. Consecutive `create()` calls queued while the worker is busy are
+written in a single transaction.
+
+Requires Python 3.7 or newer.
+
+"""
+from collections import deque, namedtuple
+from concurrent.futures import Future
+from itertools import islice
+import asyncio
+import queue
+import threading
+
+from .connection import Connection
+from .notify import Doorbell
+
+
+Job = namedtuple('Job', ['future', 'func', 'args', 'kwargs'])
+CreateJob = namedtuple('CreateJob', ['future', 'entry'])
+
+
+class WorkerConnection(Connection):
+    """
+    Connection of a worker thread.
+
+    LMDB environments can be opened only once per process, so it uses the
+    ones of `owner`, the process connection to the same binlog.
+
+    """
+    main_thread_only = False
+
+    def __init__(self, owner):
+        super().__init__(model=owner.model,
+                         path=owner.path,
+                         kwargs=owner.kwargs)
+        self.owner = owner
+
+    def _open_environments(self):
+        self._data_dbs = self.owner._data_dbs
+        self._readers_dbs = dict(self.owner._readers_dbs)
+        self._readers_serial = self.owner._readers_serial
+
+        self.data_env = self.owner.data_env
+        self.readers_env = self.owner.readers_env
+
+    def _reopen(self):
+        # The owner replaces the environments swapped by a compaction.
+        if self.owner.data_env is self.data_env:
+            self.owner._reopen()
+        self._fresh = {}
+        self._open_environments()
+
+    def close(self):
+        if self.refcount == 1:
+            # The environments are closed by the owner.
+            self.closed = True
+            self.refcount = 0
+            self.data_env = None
+            self.readers_env = None
+        else:
+            super().close()
+
+
+def fetch(reader, start, limit):
+    """Return up to `limit` non acknowledged entries starting at `start`."""
+    it = reader._iter_from(start)
+    try:
+        return list(islice(it, limit))
+    finally:
+        it.close()
+
+
+class Worker(threading.Thread):
+    def __init__(self, owner, max_batch=1000):
+        super().__init__(daemon=True)
+        self.owner = owner
+        self.max_batch = max_batch
+
+        self.jobs = queue.Queue()
+        self.ready = Future()
+        self.finished = Future()
+
+    def run(self):
+        try:
+            conn = WorkerConnection(self.owner).open()
+        except BaseException as exc:
+            self.ready.set_exception(exc)
+            self.finished.set_result(None)
+            return
+        else:
+            self.ready.set_result(conn)
+
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    break
+
+                batch = [job]
+                while len(batch) < self.max_batch:
+                    try:
+                        job = self.jobs.get_nowait()
+                    except queue.Empty:
+                        break
+                    else:
+                        if job is None:
+                            self.jobs.put(None)
+                            break
+                        batch.append(job)
+
+                self.run_batch(conn, batch)
+        finally:
+            conn.close()
+            self.finished.set_result(None)
+
+    def run_batch(self, conn, batch):
+        creates = []
+        for job in batch:
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            elif isinstance(job, CreateJob):
+                creates.append(job)
+            else:
+                self.run_creates(conn, creates)
+                creates = []
+                try:
+                    result = job.func(*job.args, **job.kwargs)
+                except BaseException as exc:
+                    job.future.set_exception(exc)
+                else:
+                    job.future.set_result(result)
+        self.run_creates(conn, creates)
+
+    def run_creates(self, conn, creates):
+        if not creates:
+            return
+
+        try:
+            conn.bulk_create([job.entry for job in creates])
+        except BaseException as exc:
+            if len(creates) == 1:
+                creates[0].future.set_exception(exc)
+            else:
+                # Nothing was written, create the entries one by one so
+                # only the invalid ones fail.
+                for job in creates:
+                    self.run_creates(conn, [job])
+        else:
+            for job in creates:
+                job.future.set_result(job.entry)
+
+
+class AsyncConnection:
+    def __init__(self, model, path, max_batch=1000, **kwargs):
+        self.model = model
+        self.path = path
+        self.connection = None
+        # Also the connection of this thread, if it's already open.
+        self._owner = model.open(path, **kwargs)
+        self._worker = Worker(self._owner, max_batch=max_batch)
+
+    @classmethod
+    async def open(cls, model, path, **kwargs):
+        self = cls(model, path, **kwargs)
+        self._worker.start()
+        try:
+            self.connection = await asyncio.wrap_future(self._worker.ready)
+        except BaseException:
+            await self.close()
+            raise
+        return self
+
+    @property
+    def closed(self):
+        return self._worker.finished.done()
+
+    async def close(self):
+        if not self.closed:
+            self._worker.jobs.put(None)
+            await asyncio.wrap_future(self._worker.finished)
+        if self._owner is not None:
+            owner, self._owner = self._owner, None
+            owner.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_, **__):
+        await self.close()
+
+    def _submit(self, func, *args, **kwargs):
+        future = Future()
+        self._worker.jobs.put(Job(future, func, args, kwargs))
+        return asyncio.wrap_future(future)
+
+    async def run(self, func, *args, **kwargs):
+        """Run `func(connection, *args, **kwargs)` in the worker thread."""
+        return await self._submit(func, self.connection, *args, **kwargs)
+
+    async def create(self, **kwargs):
+        future = Future()
+        self._worker.jobs.put(CreateJob(future, self.model(**kwargs)))
+        return await asyncio.wrap_future(future)
+
+    async def bulk_create(self, entries):
+        return await self._submit(self.connection.bulk_create, entries)
+
+    async def reader(self, name=None):
+        reader = await self._submit(self.connection.reader, name)
+        return AsyncReader(self, reader)
+
+    async def register_reader(self, name):
+        return await self._submit(self.connection.register_reader, name)
+
+    async def unregister_reader(self, name):
+        return await self._submit(self.connection.unregister_reader, name)
+
+    async def clone_reader(self, src, dst):
+        return await self._submit(self.connection.clone_reader, src, dst)
+
+    async def list_readers(self):
+        return await self._submit(self.connection.list_readers)
+
+    async def remove(self, entry):
+        return await self._submit(self.connection.remove, entry)
+
+    async def purge(self, chunk_size=1000):
+        return await self._submit(self.connection.purge, chunk_size)
+
+
+class AsyncReader:
+    def __init__(self, connection, reader):
+        self.connection = connection
+        self.reader = reader
+        self.name = reader.name
+
+    @property
+    def closed(self):
+        return self.reader.closed
+
+    async def ack(self, entry):
+        return await self.connection._submit(self.reader.ack, entry)
+
+    async def recursive_ack(self, entry):
+        return await self.connection._submit(self.reader.recursive_ack, entry)
+
+    async def is_acked(self, entry):
+        return await self.connection._submit(self.reader.is_acked, entry)
+
+    async def commit(self):
+        return await self.connection._submit(self.reader.commit)
+
+    async def close(self):
+        return await self.connection._submit(self.reader.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_, **__):
+        await self.close()
+
+    def follow(self, timeout=None, batch_size=100):
+        return AsyncFollower(self, timeout=timeout, batch_size=batch_size)
+
+
+class AsyncFollower:
+    """
+    Asynchronous iterator over the non acknowledged entries of a reader.
+
+    When there are no more entries the follower waits for the doorbell
+    without blocking the event loop. Consumers stopping before the end must
+    close it (`aclose()` or ``async with``) to release the doorbell.
+
+    """
+    def __init__(self, reader, timeout=None, batch_size=100):
+        self.reader = reader
+        self.timeout = timeout
+        self.batch_size = batch_size
+
+        self.doorbell = None
+        self.start = None
+        self.buffer = deque()
+        self._loop = None
+
+    def __aiter__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_, **__):
+        await self.aclose()
+
+    async def __anext__(self):
+        if self.doorbell is None:
+            # Listen before the first read to not miss any notification.
+            conn = self.reader.connection.connection
+            self.doorbell = Doorbell(
+                conn._gen_path('doorbell_directory')).open()
+
+        while not self.buffer:
+            if self.doorbell.closed:
+                raise StopAsyncIteration
+
+            entries = await self.reader.connection._submit(
+                fetch, self.reader.reader, self.start, self.batch_size)
+
+            if entries:
+                self.start = entries[-1].pk + 1
+                self.buffer.extend(entries)
+            elif not await self._wait():
+                self.close()
+                raise StopAsyncIteration
+
+        return self.buffer.popleft()
+
+    async def _wait(self):
+        loop = asyncio.get_running_loop()
+        rang = loop.create_future()
+
+        def _ring():
+            if not rang.done():
+                rang.set_result(True)
+
+        self.doorbell.arm()
+        loop.add_reader(self.doorbell.fileno(), _ring)
+        self._loop = loop
+        try:
+            return await asyncio.wait_for(rang, self.timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._remove_reader()
+            if not self.doorbell.closed:
+                self.doorbell.drain()
+
+    def _remove_reader(self):
+        if self._loop is not None:
+            self._loop.remove_reader(self.doorbell.fileno())
+            self._loop = None
+
+    async def aclose(self):
+        self.close()
+
+    def close(self):
+        if self.doorbell is not None:
+            try:
+                self._remove_reader()
+            finally:
+                self.doorbell.close()
@@ -0,0 +1,145 @@
+"""
+Incremental backups.
+
+The first backup into a directory is a compacted copy of the binlog (the
+base). Every later backup writes a delta file with the entries appended
+since the previous backup and the reader registries at that point, in the
+framed format of `binlog.replication`. `manifest.json` records the base,
+the deltas and the next pk to back up.
+
+Removed and purged entries are only dropped from the backup by taking a
+new base in an empty directory.
+
+Usage::
+
+    python -m binlog.backup backup mymodule:MyModel /binlog /backups
+    python -m binlog.backup restore mymodule:MyModel /backups /restored
+
+"""
+import argparse
+import json
+import os
+import shutil
+
+from .replication import Follower, Shipper, load_model
+
+
+MANIFEST = 'manifest.json'
+BASE = 'base'
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as fileobj:
+            return json.load(fileobj)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+    with open(path + '.tmp', 'w') as fileobj:
+        json.dump(manifest, fileobj, indent=2, sort_keys=True)
+        fileobj.flush()
+        os.fsync(fileobj.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def backup(connection, directory, batch_size=10000):
+    """
+    Back up `connection` into `directory`.
+
+    Return the name of the file or directory written.
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory)
+
+    if manifest is None:
+        base_path = os.path.join(directory, BASE)
+        if os.path.exists(base_path):
+            # Leftovers of an interrupted base backup.
+            shutil.rmtree(base_path)
+        connection.compact(base_path)
+
+        with connection.model.open(base_path) as base:
+            with base.data(write=False) as res:
+                position = base._get_next_event_idx(res)
+            readers = base.list_readers()
+
+        write_manifest(directory, {'base': BASE,
+                                   'deltas': [],
+                                   'position': position,
+                                   'readers': readers})
+        return BASE
+
+    name = 'delta-%06d.bin' % (len(manifest['deltas']) + 1)
+    with open(os.path.join(directory, name), 'wb') as fileobj:
+        shipper = Shipper(connection,
+                          fileobj,
+                          start=manifest['position'],
+                          batch_size=batch_size)
+        while shipper.ship():
+            pass
+        fileobj.flush()
+        os.fsync(fileobj.fileno())
+
+    manifest['deltas'].append({'name': name,
+                               'start': manifest['position'],
+                               'stop': shipper.position})
+    manifest['position'] = shipper.position
+    manifest['readers'] = sorted(shipper.registries)
+    write_manifest(directory, manifest)
+    return name
+
+
+def restore(model, directory, path):
+    """Rebuild in `path` the binlog backed up in `directory`."""
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError("No backup found in %s" % directory)
+
+    base_path = os.path.join(directory, manifest['base'])
+    for metaname in ('data_env_directory', 'readers_env_directory'):
+        subdirectory = model._meta[metaname]
+        shutil.copytree(os.path.join(base_path, subdirectory),
+                        os.path.join(path, subdirectory))
+
+    with model.open(path) as db:
+        for delta in manifest['deltas']:
+            with open(os.path.join(directory, delta['name']), 'rb') as fileobj:
+                Follower(db, fileobj).run()
+
+        readers = set(manifest['readers'])
+        for name in db.list_readers():
+            if name not in readers:
+                db.unregister_reader(name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m binlog.backup')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    backup_parser = commands.add_parser('backup')
+    backup_parser.add_argument('model', help="module:Model")
+    backup_parser.add_argument('path')
+    backup_parser.add_argument('directory')
+
+    restore_parser = commands.add_parser('restore')
+    restore_parser.add_argument('model', help="module:Model")
+    restore_parser.add_argument('directory')
+    restore_parser.add_argument('path')
+
+    args = parser.parse_args(argv)
+    model = load_model(args.model)
+
+    if args.command == 'backup':
+        with model.open(args.path) as db:
+            print(backup(db, args.directory))
+    else:
+        restore(model, args.directory, args.path)
+
+
+if __name__ == '__main__':
+    main()
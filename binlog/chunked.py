@@ -0,0 +1,275 @@
+"""
+Chunked layout of the reader registries.
+
+By default every segment of a registry is an LMDB record (right bound ->
+left bound). Models setting `__meta_registry_chunk_size__` pack up to that
+many segments per record instead, varint and delta encoded, keyed by the
+right bound of the last segment of the chunk. Fragmented registries then
+take a few pages instead of thousands of tiny records.
+
+`ChunkedCursor` exposes the chunks as if they were the per-segment
+records, so the code walking the registries works with either layout.
+
+"""
+from bisect import bisect_left
+import struct
+
+from .abstract import RawCursor
+
+PACK = struct.Struct('!Q')
+MAXINT = 2**64 - 1
+
+
+def _put_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_chunk(segments):
+    """Encode a sorted list of (L, R) segments."""
+    out = bytearray()
+    prev = 0
+    for L, R in segments:
+        _put_varint(out, L - prev)
+        _put_varint(out, R - L)
+        prev = R
+    return bytes(out)
+
+
+def decode_chunk(raw):
+    """Decode the (L, R) segments of a chunk."""
+    values = []
+    value = shift = 0
+    for byte in bytes(raw):
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+
+    segments = []
+    prev = 0
+    for i in range(0, len(values), 2):
+        L = prev + values[i]
+        prev = R = L + values[i + 1]
+        segments.append((L, R))
+    return segments
+
+
+class ChunkedCursor(RawCursor):
+    """
+    Raw cursor over the segments of a chunked registry database.
+
+    Changes are kept in the chunk loaded in memory and written when the
+    cursor leaves the chunk or is closed. Chunks growing over `chunk_size`
+    segments are split.
+
+    """
+    def __init__(self, cursor, chunk_size):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be greater than 0")
+
+        super().__init__(cursor)
+        self.chunk_size = chunk_size
+
+        self._key = None  # Right bound stored as key of the loaded chunk.
+        self._segments = []
+        self._rights = []
+        self._idx = None
+        self._dirty = False
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    @property
+    def positioned(self):
+        return self._idx is not None
+
+    def _load(self):
+        self._key = PACK.unpack(self.cursor.key())[0]
+        self._segments = decode_chunk(self.cursor.value())
+        self._rights = [R for _, R in self._segments]
+        self._dirty = False
+
+    def _unload(self):
+        self._key = None
+        self._segments = []
+        self._rights = []
+        self._idx = None
+        return False
+
+    def _flush(self):
+        if self._dirty:
+            if self._key is not None and \
+                    self.cursor.set_key(PACK.pack(self._key)):
+                self.cursor.delete()
+
+            segments = self._segments
+            for i in range(0, len(segments), self.chunk_size):
+                chunk = segments[i:i + self.chunk_size]
+                self.cursor.put(PACK.pack(chunk[-1][1]), encode_chunk(chunk))
+        self._dirty = False
+        self._unload()
+
+    def _in_chunk(self, right):
+        return bool(self._rights) and \
+            self._rights[0] <= right <= self._rights[-1]
+
+    def _locate(self, key):
+        """
+        Return whether a stored chunk ends at or after `key` and the key of
+        the chunk `key` belongs to (None if there are no chunks).
+
+        """
+        found = self.cursor.set_range(key)
+        if found or self.cursor.last():
+            return found, PACK.unpack(self.cursor.key())[0]
+        else:
+            return found, None
+
+    def _is_loaded(self, chunk_key):
+        return chunk_key == self._key and bool(self._dirty or self._segments)
+
+    def _set_range(self, right):
+        if self._in_chunk(right):
+            self._idx = bisect_left(self._rights, right)
+            return True
+
+        key = PACK.pack(right)
+        found, chunk_key = self._locate(key)
+        if self._is_loaded(chunk_key):
+            # Walking the chunk in memory, pending changes included.
+            idx = bisect_left(self._rights, right)
+            if idx < len(self._rights):
+                self._idx = idx
+                return True
+            elif not found:
+                self._idx = None
+                return False
+
+        self._flush()
+        if not self.cursor.set_range(key):
+            return False
+        self._load()
+        self._idx = bisect_left(self._rights, right)
+        return True
+
+    def _last_below(self, right):
+        self._flush()
+        if self.cursor.set_range(PACK.pack(right)):
+            self._load()
+            self._idx = bisect_left(self._rights, right) - 1
+            if self._idx >= 0:
+                return True
+            elif not self.cursor.prev():
+                return self._unload()
+        elif not self.cursor.last():
+            return self._unload()
+
+        self._load()
+        self._idx = len(self._segments) - 1
+        return True
+
+    def first(self):
+        self._flush()
+        if not self.cursor.first():
+            return False
+        self._load()
+        self._idx = 0
+        return True
+
+    def last(self):
+        self._flush()
+        if not self.cursor.last():
+            return False
+        self._load()
+        self._idx = len(self._segments) - 1
+        return True
+
+    def next(self):
+        if self._idx is None:
+            return self.first()
+        elif self._idx + 1 < len(self._segments):
+            self._idx += 1
+            return True
+        else:
+            right = self._rights[self._idx]
+            if right == MAXINT:
+                self._flush()
+                return False
+            return self._set_range(right + 1)
+
+    def prev(self):
+        if self._idx is None:
+            return self.last()
+        elif self._idx > 0:
+            self._idx -= 1
+            return True
+        else:
+            return self._last_below(self._rights[self._idx])
+
+    def set_range(self, key):
+        return self._set_range(PACK.unpack(key)[0])
+
+    def set_key(self, key):
+        right = PACK.unpack(key)[0]
+        if self._set_range(right) and self._rights[self._idx] == right:
+            return True
+        self._flush()
+        return False
+
+    def key(self):
+        if self._idx is None:
+            return b''
+        return PACK.pack(self._segments[self._idx][1])
+
+    def value(self):
+        if self._idx is None:
+            return b''
+        return PACK.pack(self._segments[self._idx][0])
+
+    def delete(self, dupdata=False):
+        if self._idx is None:
+            return False
+
+        right = self._rights[self._idx]
+        del self._segments[self._idx]
+        del self._rights[self._idx]
+        self._dirty = True
+
+        # Like LMDB, the cursor moves to the next segment.
+        if self._idx >= len(self._segments):
+            if right == MAXINT:
+                self._flush()
+            else:
+                self._set_range(right + 1)
+        return True
+
+    def put(self, key, value, overwrite=True, **kwargs):
+        right = PACK.unpack(key)[0]
+        left = PACK.unpack(value)[0]
+
+        if not self._in_chunk(right):
+            _, chunk_key = self._locate(key)
+            if not self._is_loaded(chunk_key):
+                self._flush()
+                if chunk_key is not None:
+                    self.cursor.set_key(PACK.pack(chunk_key))
+                    self._load()
+
+        idx = bisect_left(self._rights, right)
+        if idx < len(self._rights) and self._rights[idx] == right:
+            if not overwrite:
+                self._idx = idx
+                return False
+            self._segments[idx] = (left, right)
+        else:
+            self._segments.insert(idx, (left, right))
+            self._rights.insert(idx, right)
+        self._idx = idx
+        self._dirty = True
+        return True
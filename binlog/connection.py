@@ -1,40 +1,149 @@
 from collections import namedtuple
-from contextlib import contextmanager
+from contextlib import contextmanager, ExitStack
+from datetime import datetime, timezone
 from functools import reduce, wraps
 from itertools import islice
 from pathlib import Path
+import json
 import operator as op
 import os
+import shutil
 import threading
+import time
+import warnings
 
 import lmdb
 
-from .databases import Config, Checkpoints, Entries
+from .cursor import CursorProxy
+from .databases import Catalog, Clones, Config, Checkpoints, Deltas
+from .databases import Entries, Leases
+from .databases import Stats, Timestamps, Watermarks
 from .databases import Registry as RegistryDB
 from .exceptions import IntegrityError, ReaderDoesNotExist, BadUsageError
-from .reader import Reader
-from .registry import Registry
+from .exceptions import LongSnapshotWarning, FrameError
+from .frames import ENTRY, open_stream, write_frame, write_magic
+from .frames import iter_frames
+from .layout import LAYOUTS, TABLE, UnionCursor, registry_cursor
+from .lease import Lease, lease_key
+from .notify import Doorbell, ring
+from .reader import AutoCommit, Reader, iter_unacked
+from .registry import Registry, RegistryStats, S
+from .serializer import NumericSerializer
 from .util import MaskException
 
+try:
+    from .npregistry import NumpyRegistry
+except ImportError:  # pragma: no cover
+    NumpyRegistry = None
+
 
 Resources = namedtuple('Resources', ['env', 'txn', 'db'])
 
+#: Databases of the readers environment that are not readers. Like the
+#: internal keys, the names of the internal ones start with a dot, so they
+#: can't collide with the readers of existing binlogs.
+RESERVED_NAMES = frozenset(['hints', '.catalog', '.clones', '.deltas',
+                            '.leases', '.registries', '.stats',
+                            '.watermarks'])
+
+#: Prefix of the registries holding the acks saved by a cloned reader on top
+#: of its frozen registry.
+DELTA_PREFIX = '.delta.'
+
+#: Key of the readers environment main DB marking it as replaced.
+STALE_KEY = b'.stale'
+
+#: Key of the readers environment main DB with the next reader id of the
+#: table layout.
+NEXT_READER_ID_KEY = b'.next_reader_id'
+
+#: Key of the readers environment main DB counting the changes to the set
+#: of readers.
+GENERATION_KEY = b'.generation'
+
+#: Key of the readers environment main DB present once a reader was cloned.
+CLONES_KEY = Clones.NAME.encode('utf-8')
+
+#: Key of the readers environment main DB present once a reader was cloned.
+DELTAS_KEY = Deltas.NAME.encode('utf-8')
+
+INTERNAL_KEYS = frozenset([STALE_KEY, NEXT_READER_ID_KEY, GENERATION_KEY])
+
 
 class DBOpener:
-    def __init__(self, env, txn, **kwargs):
+    def __init__(self, env, txn, cache=None, since=None, **kwargs):
         self.env = env
         self.txn = txn
         self.kwargs = kwargs
-        self._dbs = {}
+        self.cache = {} if cache is None else cache
+        self.since = since
+        self.opened = {}
 
     def __getitem__(self, name):
-        if name not in self._dbs:
-            self._dbs[name] = self.env.open_db(
+        try:
+            serial, db = self.cache[name]
+        except KeyError:
+            pass
+        else:
+            # Handles of databases created after a read transaction began
+            # are not valid inside it.
+            if self.since is None or serial <= self.since:
+                return db
+
+        if name not in self.opened:
+            self.opened[name] = self.env.open_db(
                 key=name.encode('utf-8'),
                 txn=self.txn,
                 **self.kwargs)
 
-        return self._dbs[name]
+        return self.opened[name]
+
+    def discard(self, name):
+        """Forget the handle of the dropped database `name`."""
+        self.cache.pop(name, None)
+        self.opened.pop(name, None)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except (lmdb.NotFoundError, lmdb.ReadonlyError):
+            # Not created yet.
+            return default
+
+
+class SharedRead:
+    def __init__(self, res):
+        self.res = res
+        self.users = 0
+
+
+class Snapshot:
+    """
+    Read transactions pinned by `Connection.snapshot()`.
+
+    Pinned transactions prevent LMDB from reusing the pages freed in the
+    meantime, so a `LongSnapshotWarning` is emitted once the snapshot is
+    older than `warn_after` seconds.
+
+    """
+    def __init__(self, warn_after=None):
+        self.warn_after = warn_after
+        self.started = time.monotonic()
+        self.warned = False
+
+    @property
+    def age(self):
+        return time.monotonic() - self.started
+
+    def check(self):
+        if (not self.warned
+                and self.warn_after is not None
+                and self.age > self.warn_after):
+            self.warned = True
+            warnings.warn(
+                "Snapshot pinned for %.1f seconds" % self.age,
+                LongSnapshotWarning,
+                stacklevel=4)
 
 
 def same_thread(f):
@@ -64,19 +173,50 @@ def open_db(f):
 
 
 class Connection:
+    main_thread_only = True
+
     def __init__(self, model, path, kwargs):
         self.model = model
         self.path = path
         self.kwargs = kwargs
 
         self.closed = None
-        self._data_env = None
-        self._readers_env = None
+        self.data_env = None
+        self.readers_env = None
         self.refcount = 0
 
+        # DB handles live as long as the environment, they are cached once
+        # the write transaction opening them is committed.
+        self._data_dbs = None
+        self._readers_dbs = {}
+        self._readers_serial = 0
+
+        # (readers generation, reader names, set of reader names)
+        self._catalog = None
+
+        # Read transactions pinned by `snapshot()`, shared by the read
+        # operations of the block.
+        self._data_read = None
+        self._readers_read = None
+
+        # Number of read transactions in progress per environment.
+        self._reads = {'data_env': 0, 'readers_env': 0}
+
+        # Readers write transaction in progress, joined by nested write
+        # operations.
+        self._readers_write = None
+        self._snapshot = None
+
+        # Environments replaced by an online compaction while a read
+        # transaction was still using them.
+        self._stale_envs = []
+
+        # Last transaction id of each environment checked not to be stale.
+        self._fresh = {}
+
         self.pid = os.getpid()
         self.tid = threading.current_thread()
-        if self.tid != threading.main_thread():
+        if self.main_thread_only and self.tid != threading.main_thread():
             raise BadUsageError(
                 ("This version doesn't support using connections "
                  "outside the main thread."))
@@ -99,22 +239,48 @@ class Connection:
         environments.
 
         """
+        self._data_dbs = None
+        self._readers_dbs = {}
+        self._readers_serial = 0
+
         # Open DATA ENV
         self.data_env = lmdb.open(
             self._gen_path('data_env_directory'),
-            max_dbs=2 + len(self.model._indexes),
+            max_dbs=3 + len(self.model._indexes),
             **self.kwargs)
 
+        if not self.kwargs.get('readonly'):
+            # Opened in a write transaction so the handles are cached, even
+            # in processes that never write entries.
+            with self.data_env.begin(write=True) as txn:
+                self._data_dbs = self._open_data_dbs(self.data_env, txn)
+
         # Open READERS ENV
+        layout = self.model._meta['registry_layout']
+        if layout not in LAYOUTS:
+            raise ValueError("Unknown registry layout %r" % layout)
         self.readers_env = lmdb.open(
             self._gen_path('readers_env_directory'),
-            max_dbs=2**20,
+            max_dbs=len(RESERVED_NAMES) if layout == TABLE else 2**20,
             **self.kwargs)
 
+        if layout == TABLE and not self.kwargs.get('readonly'):
+            # Created upfront, so the handles are valid in every later read
+            # transaction.
+            with self.readers_env.begin(write=True) as txn:
+                for name in ('.catalog', '.registries'):
+                    db = self.readers_env.open_db(name.encode('utf-8'),
+                                                  txn=txn)
+                    self._readers_dbs[name] = (0, db)
+
     def close(self):
         if self.refcount == 1:
             self.closed = True
 
+            for env in self._stale_envs:
+                env.close()
+            self._stale_envs = []
+
             # DATA ENV
             self.data_env.close()
             self.data_env = None
@@ -173,28 +339,232 @@ class Connection:
     @same_thread
     @contextmanager
     def data(self, write=True):
-        env = self.data_env
-        with env.begin(write=write, buffers=True) as txn:
-            dbs = {}
-            dbs['config'] = self._get_db(env, txn, 'config_db_name')
-            dbs['entries'] = self._get_db(env, txn, 'entries_db_name')
-            for index_name in self.model._indexes:
-                index_db_name = self._get_index_name(index_name)
-                dbs[index_db_name] = self._get_idx(env, txn, index_db_name,
-                                                  dupsort=True)
-
-            yield Resources(env=env, txn=txn, db=dbs)
+        if not write:
+            with self._shared_read('_data_read', 'data_env',
+                                   self._open_data_dbs) as res:
+                yield res
+        else:
+            res = self._begin_write('data_env', self._open_data_dbs)
+            with res.txn:
+                yield res
+            # Reached only if the transaction was committed. Handles already
+            # opened by a read transaction in progress die with it.
+            if not self._reads['data_env']:
+                self._data_dbs = res.db
+
+    def _open_data_dbs(self, env, txn):
+        if self._data_dbs is not None:
+            return self._data_dbs
+
+        dbs = {}
+        dbs['config'] = self._get_db(env, txn, 'config_db_name')
+        dbs['entries'] = self._get_db(env, txn, 'entries_db_name')
+        if self.model._meta['timestamp_every']:
+            dbs['timestamps'] = self._get_db(env, txn, 'timestamps_db_name')
+        for index_name in self.model._indexes:
+            index_db_name = self._get_index_name(index_name)
+            dbs[index_db_name] = self._get_idx(env, txn, index_db_name,
+                                              dupsort=True)
+        return dbs
 
     @open_db
     @same_thread
     @contextmanager
     def readers(self, write=True):
-        env = self.readers_env
-        with env.begin(write=write, buffers=True) as txn:
-#            checkpoints_db = self._get_db(env, txn, 'checkpoints_db_name')
-            yield Resources(env=env,
-                            txn=txn,
-                            db=DBOpener(env, txn))
+        if not write:
+            with self._shared_read('_readers_read', 'readers_env',
+                                   self._open_readers_dbs) as res:
+                yield res
+        elif self._readers_write is not None:
+            # Committed (or aborted) by the outermost write operation.
+            yield self._readers_write
+        else:
+            res = self._begin_write(
+                'readers_env',
+                lambda env, txn: self._open_readers_dbs(env, txn, write=True))
+            self._readers_write = res
+            try:
+                with res.txn:
+                    yield res
+            finally:
+                self._readers_write = None
+            # Reached only if the transaction was committed. Handles already
+            # opened by a read transaction in progress die with it.
+            dbs = res.db
+            if dbs.opened and not self._reads['readers_env']:
+                self._readers_serial += 1
+                for name, db in dbs.opened.items():
+                    self._readers_dbs[name] = (self._readers_serial, db)
+
+    def _open_readers_dbs(self, env, txn, write=False):
+        return DBOpener(env, txn,
+                        cache=self._readers_dbs,
+                        since=None if write else self._readers_serial)
+
+    def _is_stale(self, res, write=False):
+        """Return True if an online compaction replaced this environment."""
+        # Only a commit can mark the environment as stale, so the marker is
+        # looked up once per transaction committed since the last check.
+        txnid = res.txn.id() - 1 if write else res.txn.id()
+        if self._fresh.get(res.env) == txnid:
+            return False
+
+        if res.env is self.data_env:
+            with Config.cursor(res) as cursor:
+                stale = cursor.get('stale', default=False)
+        else:
+            stale = res.txn.get(STALE_KEY) is not None
+
+        if not stale:
+            self._fresh[res.env] = txnid
+        return stale
+
+    def _reopen(self):
+        stale = [self.data_env, self.readers_env]
+        if not any(self._reads.values()):
+            for env in stale:
+                env.close()
+        else:
+            self._stale_envs.extend(stale)
+        self._fresh = {}
+        self._open_environments()
+
+    def _begin(self, env, write):
+        try:
+            return env.begin(write=write, buffers=True)
+        except lmdb.MapResizedError:
+            # Another process grew the map, adopt its size.
+            env.set_mapsize(0)
+            return env.begin(write=write, buffers=True)
+
+    def _begin_write(self, env_attr, open_dbs):
+        while True:
+            env = getattr(self, env_attr)
+            txn = self._begin(env, write=True)
+            try:
+                dbs = open_dbs(env, txn)
+                res = Resources(env=env, txn=txn, db=dbs)
+                stale = self._is_stale(res, write=True)
+            except:
+                txn.abort()
+                raise
+
+            if stale:
+                txn.abort()
+                self._reopen()
+            else:
+                return res
+
+    def _begin_read(self, env_attr, open_dbs):
+        while True:
+            env = getattr(self, env_attr)
+            txn = self._begin(env, write=False)
+            try:
+                dbs = open_dbs(env, txn)
+                res = Resources(env=env, txn=txn, db=dbs)
+                stale = self._is_stale(res)
+            except:
+                txn.abort()
+                raise
+
+            if stale and not any(self._reads.values()):
+                txn.abort()
+                self._reopen()
+            else:
+                return res
+
+    @contextmanager
+    def _shared_read(self, attr, env_attr, open_dbs):
+        """
+        Read transaction of a read operation.
+
+        Inside a `snapshot()` block every read operation shares the pinned
+        transaction, otherwise each one begins its own.
+
+        """
+        shared = getattr(self, attr)
+        if shared is not None:
+            self._snapshot.check()
+        else:
+            shared = SharedRead(self._begin_read(env_attr, open_dbs))
+            self._reads[env_attr] += 1
+            if self._snapshot is not None:
+                setattr(self, attr, shared)
+
+        shared.users += 1
+        try:
+            yield shared.res
+        finally:
+            shared.users -= 1
+            if shared.users == 0:
+                if getattr(self, attr) is shared:
+                    setattr(self, attr, None)
+                self._reads[env_attr] -= 1
+                self._end_read(shared.res)
+
+    @contextmanager
+    def _fresh_read(self, env_attr, open_dbs):
+        """Read transaction of its own, even inside a `snapshot()` block."""
+        res = self._begin_own_read(env_attr, open_dbs)
+        try:
+            yield res
+        finally:
+            self._end_own_read(env_attr, res)
+
+    def _begin_own_read(self, env_attr, open_dbs):
+        """Begin a read transaction not shared with the read operations."""
+        res = self._begin_read(env_attr, open_dbs)
+        self._reads[env_attr] += 1
+        return res
+
+    def _end_own_read(self, env_attr, res):
+        self._reads[env_attr] -= 1
+        self._end_read(res)
+
+    def _end_read(self, res):
+        try:
+            # Handles opened here are not cached: read-only transactions
+            # are reset instead of committed and their handles discarded.
+            res.txn.commit()
+        except lmdb.Error:
+            # An iterator left open when the connection was closed.
+            if not self.closed:
+                raise
+
+        if self._stale_envs and not any(self._reads.values()):
+            for env in self._stale_envs:
+                env.close()
+            self._stale_envs = []
+
+    @open_db
+    @same_thread
+    @contextmanager
+    def snapshot(self, warn_after=60):
+        """
+        Pin one read transaction per environment for the whole block.
+
+        Every read operation inside the block sees the same consistent view
+        of the database and does not pay the transaction setup.
+
+        """
+        if self._snapshot is not None:
+            yield self._snapshot
+            return
+
+        snapshot = Snapshot(warn_after=warn_after)
+        self._snapshot = snapshot
+        try:
+            with ExitStack() as stack:
+                for env in (self.data, self.readers):
+                    try:
+                        stack.enter_context(env(write=False))
+                    except lmdb.ReadonlyError:
+                        # The databases are not created yet.
+                        pass
+                yield snapshot
+        finally:
+            self._snapshot = None
+        snapshot.check()
 
     def _get_next_event_idx(self, res):
         with Config.cursor(res) as cursor:
@@ -204,6 +574,77 @@ class Connection:
         with Config.cursor(res) as cursor:
             return cursor.put('next_event_id', value, overwrite=True)
 
+    def _timestamp(self, res, first, last):
+        """
+        Record the time the entries between `first` and `last` were appended.
+
+        Only transactions crossing a multiple of `timestamp_every` are
+        sampled. Each sample maps the current time to the pk of the next
+        entry to be appended.
+
+        """
+        every = self.model._meta['timestamp_every']
+        if not every or first + (-first % every) > last:
+            return
+
+        with Timestamps.cursor(res) as cursor:
+            cursor.put(datetime.now(timezone.utc), last + 1, overwrite=False)
+
+    @open_db
+    @same_thread
+    def time_range(self, since, until=None):
+        """
+        Return the (start, stop) pk range of the entries appended between
+        `since` and `until`.
+
+        Naive datetimes are taken as UTC. `since` is rounded down to the
+        previous timestamp sample and `until` up to the next one, so the
+        range may hold a few entries appended outside the interval but never
+        misses one. Both boundaries are exact when every transaction is
+        sampled (`timestamp_every = 1`). `start` is None when no entry
+        precedes `since` and `stop` is None when `until` is not given or no
+        sample follows it yet.
+
+        """
+        every = self.model._meta['timestamp_every']
+        if not every:
+            raise BadUsageError("This model does not store timestamps.")
+
+        def to_utc(value):
+            if value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            return value
+
+        def previous_sample(cursor, timestamp):
+            if cursor.set_range(timestamp):
+                if cursor.item()[0] == timestamp or cursor.prev():
+                    return cursor.item()[1]
+            elif cursor.last():
+                return cursor.item()[1]
+            return None
+
+        def next_sample(cursor, timestamp):
+            if every == 1:
+                # Every transaction is sampled: the entries after the
+                # previous sample were appended after `until`.
+                return previous_sample(cursor, timestamp) or 0
+            if cursor.set_range(timestamp):
+                return cursor.item()[1]
+            return None
+
+        start = stop = None
+        try:
+            with self.data(write=False) as res:
+                with Timestamps.cursor(res) as cursor:
+                    start = previous_sample(cursor, to_utc(since))
+                    if until is not None:
+                        stop = next_sample(cursor, to_utc(until))
+        except lmdb.ReadonlyError:
+            if until is not None and every == 1:
+                stop = 0
+
+        return start, stop
+
     def _index(self, res, entry):
         for index_name, index in self.model._indexes.items():
             db_name = self._get_index_name(index_name)
@@ -235,6 +676,7 @@ class Connection:
             for index_name, index in self.model._indexes.items():
                 db_name = self._get_index_name(index_name)
                 res.txn.drop(res.db[db_name], delete=True)
+        self._data_dbs = None
 
     @open_db
     @same_thread
@@ -275,6 +717,278 @@ class Connection:
             with self.data(write=False) as res:
                 res.env.copy(data_path, compact=True)
 
+    def _copy_data(self, path):
+        os.makedirs(path)
+        with self.data(write=False) as res:
+            res.env.copy(path, compact=True)
+
+    def _catch_up(self, res, copy, copy_res):
+        """
+        Bring the compacted copy of the data environment up to date.
+
+        Return the generation number of the copy.
+
+        """
+        entries = res.db['entries']
+        copy_entries = copy_res.db['entries']
+        position = copy._get_next_event_idx(copy_res)
+
+        # Entries created meanwhile.
+        with res.txn.cursor(entries) as cursor:
+            if cursor.set_range(Entries.K.db_value(position)):
+                copy._append_raw(
+                    copy_res,
+                    ((Entries.K.python_value(raw_key), raw_value)
+                     for raw_key, raw_value in cursor.iternext()))
+        copy._update_next_event_idx(copy_res, self._get_next_event_idx(res))
+
+        # Entries removed meanwhile. Only walked when the counts differ.
+        if (res.txn.stat(entries)['entries']
+                != copy_res.txn.stat(copy_entries)['entries']):
+            with copy_res.txn.cursor(copy_entries) as cursor:
+                removed = [(bytes(raw_key), bytes(raw_value))
+                           for raw_key, raw_value in cursor.iternext()
+                           if res.txn.get(raw_key, db=entries) is None]
+            for raw_key, raw_value in removed:
+                entry = self.model(**Entries.V.python_value(raw_value))
+                entry.pk = Entries.K.python_value(raw_key)
+                copy_res.txn.delete(raw_key, db=copy_entries)
+                copy._unindex(copy_res, entry)
+
+        # Timestamps sampled meanwhile.
+        if self.model._meta['timestamp_every']:
+            samples = []
+            with res.txn.cursor(res.db['timestamps']) as cursor:
+                for raw_time, raw_pk in cursor.iterprev():
+                    if Timestamps.V.python_value(raw_pk) <= position:
+                        break
+                    samples.append((bytes(raw_time), bytes(raw_pk)))
+            with copy_res.txn.cursor(copy_res.db['timestamps']) as cursor:
+                cursor.putmulti(reversed(samples))
+
+        with Config.cursor(res) as cursor:
+            generation = cursor.get('generation', default=0) + 1
+        with Config.cursor(copy_res) as cursor:
+            cursor.put('generation', generation)
+
+        return generation
+
+    @open_db
+    @same_thread
+    def compact_online(self):
+        """
+        Compact the environments in place while writers keep running.
+
+        A compacted copy of the data environment is written first without
+        blocking anybody. Then the writers are blocked while the copy
+        catches up with the entries created and removed in the meantime and
+        the directories are swapped. The readers environment is copied and
+        swapped afterwards, blocking only the acknowledgements.
+
+        The replaced environments are marked as stale, so the connections
+        of other processes reopen the binlog on their next transaction.
+
+        Return the new generation number.
+
+        """
+        # This MUST be imported every time because can be invalidated by
+        # `reset_connections`.
+        from .connectionmanager import PROCESS_CONNECTIONS
+
+        if self._data_read is not None or self._readers_read is not None:
+            raise BadUsageError("Cannot compact inside a read transaction.")
+
+        workdir = os.path.join(str(self.path), '.compact-%d' % os.getpid())
+        shutil.rmtree(workdir, ignore_errors=True)
+
+        data_dir = self.model._meta['data_env_directory']
+        readers_dir = self.model._meta['readers_env_directory']
+        compacted = {data_dir: os.path.join(workdir, data_dir),
+                     readers_dir: os.path.join(workdir, 'readers.compact')}
+
+        self._copy_data(compacted[data_dir])
+
+        copy = PROCESS_CONNECTIONS.open(self.model,
+                                        workdir,
+                                        type(self),
+                                        self.kwargs)
+
+        def swap(name):
+            live = os.path.join(str(self.path), name)
+            os.rename(live, os.path.join(workdir, name + '.old'))
+            os.rename(compacted[name], live)
+
+        try:
+            with self.data(write=True) as res:
+                with copy.data(write=True) as copy_res:
+                    generation = self._catch_up(res, copy, copy_res)
+                copy.close()
+                swap(data_dir)
+                with Config.cursor(res) as cursor:
+                    cursor.put('stale', True)
+        finally:
+            if not copy.closed:
+                copy.close()
+
+        # The registries only refer to pks, which the compaction keeps, so
+        # the readers environment is swapped without blocking the writers.
+        with self.readers(write=True) as readers_res:
+            os.makedirs(compacted[readers_dir])
+            readers_res.env.copy(compacted[readers_dir], compact=True)
+            swap(readers_dir)
+            readers_res.txn.put(STALE_KEY, b'')
+
+        self._reopen()
+        shutil.rmtree(workdir)
+
+        return generation
+
+    @open_db
+    @same_thread
+    def export(self, dest, start=None, stop=None, format='frames'):
+        """
+        Write the entries with `start <= pk < stop` to `dest`.
+
+        `dest` is a path or a binary file object. The `frames` format copies
+        the stored values straight from the database, without decoding them,
+        and can be loaded back with `import_()`. The `jsonl` format writes
+        one JSON object per line with the pk and the entry.
+
+        Return the number of exported entries.
+
+        """
+        if format == 'frames':
+            def write(fileobj, pk, raw_value):
+                write_frame(fileobj, ENTRY, pk, raw_value)
+        elif format == 'jsonl':
+            def write(fileobj, pk, raw_value):
+                line = json.dumps(
+                    {'pk': pk, 'entry': Entries.V.python_value(raw_value)},
+                    default=str,
+                    sort_keys=True)
+                fileobj.write(line.encode('utf-8') + b'\n')
+        else:
+            raise ValueError("Unknown export format %r" % format)
+
+        exported = 0
+        with open_stream(dest, 'wb') as fileobj:
+            if format == 'frames':
+                write_magic(fileobj)
+
+            try:
+                with self.data(write=False) as res:
+                    with res.txn.cursor(res.db['entries']) as cursor:
+                        if start is None:
+                            found = cursor.first()
+                        else:
+                            found = cursor.set_range(
+                                Entries.K.db_value(start))
+
+                        if found:
+                            for raw_key, raw_value in cursor.iternext():
+                                pk = Entries.K.python_value(raw_key)
+                                if stop is not None and pk >= stop:
+                                    break
+                                write(fileobj, pk, raw_value)
+                                exported += 1
+            except lmdb.ReadonlyError:
+                pass
+
+        return exported
+
+    def _append_raw(self, res, items):
+        """
+        Append the `(pk, raw value)` pairs of `items` keeping their pks.
+
+        Pks must be increasing and greater than any pk used so far. Indexes
+        are built at the end from the sorted pairs of values.
+
+        Return the number of appended entries.
+
+        """
+        next_idx = self._get_next_event_idx(res)
+        pending = {index_name: [] for index_name in self.model._indexes}
+        last = None
+
+        def get_raw():
+            nonlocal last
+            for pk, payload in items:
+                if pk < next_idx or (last is not None and pk <= last):
+                    raise IntegrityError(
+                        "Entry %d is not after the last pk" % pk)
+                last = pk
+
+                raw_pk = Entries.K.db_value(pk)
+                if pending:
+                    entry = Entries.V.python_value(payload)
+                    for index_name, index in self.model._indexes.items():
+                        key = entry.get(index_name)
+                        if index.mandatory and key is None:
+                            raise ValueError(
+                                "value %s is mandatory" % index_name)
+                        elif key is not None:
+                            pending[index_name].append(
+                                (index.K.db_value(key), raw_pk))
+                yield raw_pk, payload
+
+        with res.txn.cursor(res.db['entries']) as cursor:
+            consumed, added = cursor.putmulti(get_raw(),
+                                              dupdata=False,
+                                              overwrite=False,
+                                              append=True)
+        if consumed != added:
+            raise IntegrityError("Some key already exists")
+        elif not added:
+            return 0
+
+        self._update_next_event_idx(res, last + 1)
+
+        for index_name, pairs in pending.items():
+            pairs.sort()
+            db = res.db[self._get_index_name(index_name)]
+            with res.txn.cursor(db) as cursor:
+                cursor.putmulti(pairs, dupdata=True)
+
+        return added
+
+    @open_db
+    @same_thread
+    def import_(self, src):
+        """
+        Append the entries of a `frames` stream written by `export()`.
+
+        Entries keep their original pks, so the registries of the readers
+        remain valid. Pks must be greater than any pk used so far in this
+        binlog.
+
+        Return the number of imported entries.
+
+        """
+        def get_items(fileobj):
+            for kind, pk, payload in iter_frames(fileobj):
+                if kind != ENTRY:
+                    raise FrameError("Unexpected frame %r" % kind)
+                yield pk, payload
+
+        with open_stream(src, 'rb') as fileobj:
+            with self.data(write=True) as res:
+                added = self._append_raw(res, get_items(fileobj))
+
+        if added:
+            self._ring()
+        return added
+
+    @open_db
+    @same_thread
+    @contextmanager
+    def doorbell(self):
+        """Listen for new entries created by any process."""
+        with Doorbell(self._gen_path('doorbell_directory')) as doorbell:
+            yield doorbell
+
+    def _ring(self):
+        ring(self._gen_path('doorbell_directory'))
+
     @open_db
     @same_thread
     def create(self, **kwargs):
@@ -294,10 +1008,13 @@ class Connection:
                 entry.pk = next_idx
                 entry.saved = True
                 self._index(res, entry)
-                return entry
+                self._timestamp(res, next_idx, next_idx)
             else:
                 raise IntegrityError("Key already exists")
 
+        self._ring()
+        return entry
+
     @open_db
     @same_thread
     def bulk_create(self, entries):
@@ -320,14 +1037,58 @@ class Connection:
 
             if consumed != added:
                 raise IntegrityError("Some key already exists")
-            else:
-                return added
+            elif added:
+                self._timestamp(res, next_idx, next_idx + added - 1)
+
+        if added:
+            self._ring()
+        return added
+
+    def _reader_catalog(self):
+        """
+        Return the names of the readers as a tuple and as a set.
+
+        The names are cached until the readers generation changes, that is
+        until any process registers, clones or unregisters a reader.
+
+        """
+        if self._readers_write is not None:
+            context = self.readers(write=True)
+        else:
+            # Not the transaction pinned by a snapshot, it would miss the
+            # readers registered after it began.
+            context = self._fresh_read('readers_env',
+                                       self._open_readers_dbs)
+        with context as res:
+            generation = self._readers_generation(res)
+            if self._catalog is None or self._catalog[0] != generation:
+                names = tuple(self._list_readers(res))
+                self._catalog = (generation, names, frozenset(names))
+            return self._catalog[1:]
+
+    def _readers_generation(self, res):
+        raw = res.txn.get(GENERATION_KEY)
+        return 0 if raw is None else NumericSerializer.python_value(raw)
+
+    def _bump_readers_generation(self, res):
+        res.txn.put(GENERATION_KEY, NumericSerializer.db_value(
+            self._readers_generation(res) + 1))
 
     @open_db
     @same_thread
     @MaskException(lmdb.ReadonlyError, ReaderDoesNotExist)
-    def reader(self, name=None):
-        if name is not None and name not in self.list_readers():
+    def reader(self, name=None, autocommit_acks=None,
+               autocommit_seconds=None, autocommit_bytes=None):
+        """
+        Return the reader `name` (or an anonymous reader).
+
+        If any `autocommit_*` threshold is given the reader commits by itself
+        after that many acks, seconds or bytes of entries read since the
+        previous commit. Pending acks are also committed when `follow()`
+        catches up and when the interpreter exits.
+
+        """
+        if name is not None and name not in self._reader_catalog()[1]:
             raise ReaderDoesNotExist("%s reader does not exists" % name)
 
         from binlog.registry import MemoryCachedDBRegistry
@@ -336,23 +1097,34 @@ class Connection:
         registry = MemoryCachedDBRegistry(
             name=name,
             connection=self,
-            direction=Direction.F) if name in self.list_readers() else None
+            direction=Direction.F) if name is not None else None
 
-        return Reader(self, name, registry)
+        if (autocommit_acks, autocommit_seconds, autocommit_bytes) == \
+                (None, None, None):
+            autocommit = None
+        else:
+            autocommit = AutoCommit(acks=autocommit_acks,
+                                    seconds=autocommit_seconds,
+                                    nbytes=autocommit_bytes)
+
+        return Reader(self, name, registry, autocommit=autocommit)
 
     @open_db
     @same_thread
     def register_reader(self, name, content=None):
-        if name in self.list_readers():
+        path = name.split('.')
+        if name in self._reader_catalog()[1]:
             return False
         else:
-            path = name.split('.')
 
             with self.readers(write=True) as res:
-                with RegistryDB.named(name).cursor(res) as cursor:
-                    if content is not None:
-                        raise NotImplementedError("XXX")
-                    result = True
+                if content is not None:
+                    raise NotImplementedError("XXX")
+                self._create_registry(res, name)
+                self._bump_readers_generation(res)
+                result = True
+                with Stats.cursor(res) as cursor:
+                    cursor.put(name, (0, 0, None, None))
 
             parents = path[:-1]
             if not parents:
@@ -364,100 +1136,542 @@ class Connection:
     @open_db
     @same_thread
     def clone_reader(self, src, dst):
-        readers = self.list_readers()
+        readers = self._reader_catalog()[1]
         if src not in readers:
             raise ReaderDoesNotExist("%s reader does not exists." % src)
         elif dst in readers:
             raise RuntimeError("%s reader already exists." % dst)
         else:
             with self.readers(write=True) as res:
-                with RegistryDB.named(src).cursor(res) as scursor:
-                    with RegistryDB.named(dst).cursor(res) as dcursor:
-                        dcursor.putmulti(scursor.iternext())
+                self._create_registry(res, dst)
+                self._bump_readers_generation(res)
+
+                layers = self._registry_layers(res, src)
+                if len(layers) == 1:
+                    # The registry of `src` is frozen and shared with its
+                    # clones, the next acks of `src` go to a delta.
+                    base = src
+                    delta = DELTA_PREFIX + src
+                    self._create_registry(res, delta)
+                    with Deltas.cursor(res) as cursor:
+                        cursor.put(src, delta)
+                else:
+                    # Only the acks saved on top of the base are copied.
+                    own, base = layers
+                    self._merge_registries(res, [own], dst)
+                with Clones.cursor(res) as cursor:
+                    cursor.put(dst, base)
+
+                self._update_watermark(res, dst)
+                with Stats.cursor(res) as cursor:
+                    cursor.put(dst, tuple(self._registry_stats(res, src)))
+
+    @open_db
+    @same_thread
+    def compact_clones(self):
+        """
+        Copy the registries shared by cloned readers.
+
+        A clone and its source save their acks on top of the registry of the
+        source, frozen when it was cloned, so a commit never copies it.
+        Reading two registries is slower: maintenance tasks can call this to
+        merge them. Return the number of registries copied.
+
+        """
+        with self.readers(write=True) as res:
+            if res.txn.get(CLONES_KEY) is None:
+                return 0
+            with Clones.cursor(res) as cursor:
+                clones = list(cursor.iternext())
+            for name, base in clones:
+                self._merge_registries(res, [base], name)
+                with Clones.cursor(res) as cursor:
+                    cursor.delete(name)
+            for base in set(base for _, base in clones):
+                self._fold_delta(res, base)
+            return len(clones)
 
     @open_db
     @same_thread
     @MaskException(lmdb.ReadonlyError, ReaderDoesNotExist)
     def unregister_reader(self, name):
-        if name not in self.list_readers():
+        if name not in self._reader_catalog()[1]:
             raise ReaderDoesNotExist("%s reader does not exists" % name)
         else:
             with self.readers(write=True) as res:
-                res.txn.drop(res.db[name])
-                return True
+                layers = self._registry_layers(res, name)
+                own, *base = self._registry_layers(res, name)
+                if base and own == name:
+                    # A clone: its source gets its delta back once the
+                    # last clone is gone.
+                    with Clones.cursor(res) as cursor:
+                        cursor.delete(name)
+                    if not self._clones_of(res, base[0]):
+                        self._fold_delta(res, base[0])
+                elif base:
+                    # A source: its clones get a copy of the frozen
+                    # registry.
+                    for clone in self._clones_of(res, name):
+                        self._merge_registries(res, [name], clone)
+                        with Clones.cursor(res) as cursor:
+                            cursor.delete(clone)
+                    self._drop_registry(res, own)
+                    with Deltas.cursor(res) as cursor:
+                        cursor.delete(name)
+
+                self._drop_registry(res, name)
+                self._bump_readers_generation(res)
+                with Watermarks.cursor(res) as cursor:
+                    cursor.delete(name)
+                with Stats.cursor(res) as cursor:
+                    cursor.delete(name)
+            return True
+
+    @property
+    def _table_layout(self):
+        return self.model._meta['registry_layout'] == TABLE
+
+    def _create_registry(self, res, name):
+        if self._table_layout:
+            raw = res.txn.get(NEXT_READER_ID_KEY)
+            if raw is None:
+                reader_id = 0
+            else:
+                reader_id = NumericSerializer.python_value(raw)
+            res.txn.put(NEXT_READER_ID_KEY,
+                        NumericSerializer.db_value(reader_id + 1))
+            with Catalog.cursor(res) as cursor:
+                cursor.put(name, reader_id)
+            # Opening the database creates it.
+            res.db['.registries']
+        else:
+            res.db[name]
+
+    def _drop_registry(self, res, name):
+        if self._table_layout:
+            db, reader_id = self._registry_location(res, name)
+            with registry_cursor(res.txn, db, reader_id=reader_id) as cursor:
+                cursor.drop()
+            with Catalog.cursor(res) as cursor:
+                cursor.delete(name)
+        else:
+            res.txn.drop(res.db[name])
+            res.db.discard(name)
+
+    def _registry_layers(self, res, name):
+        """
+        Return the registries holding the acks of `name`.
+
+        The first one is where the acks of `name` are saved. A cloned reader
+        and the clones of a reader also read the registry of the source,
+        frozen when it was cloned.
+
+        """
+        if res.txn.get(CLONES_KEY) is not None:
+            with Clones.cursor(res) as cursor:
+                base = cursor.get(name)
+            if base is not None:
+                return [name, base]
+        if res.txn.get(DELTAS_KEY) is not None:
+            with Deltas.cursor(res) as cursor:
+                delta = cursor.get(name)
+            if delta is not None:
+                return [delta, name]
+        return [name]
+
+    def _clones_of(self, res, name):
+        """Return the clones sharing the frozen registry of `name`."""
+        if res.txn.get(CLONES_KEY) is None:
+            return []
+        with Clones.cursor(res) as cursor:
+            return [dst for dst, src in cursor.iternext() if src == name]
+
+    def _merge_registries(self, res, names, target):
+        """Save in the registry `target` the segments of `names`."""
+        with self._layers_cursor(res, names + [target]) as union:
+            segments = list(union.iternext())
+
+        with self._registry(res, target, layers=[target]) as cursor:
+            for raw_R, raw_L in segments:
+                R, L = RegistryDB.K.python_value(raw_R), \
+                    RegistryDB.V.python_value(raw_L)
+                # The union holds every segment of `target` in [L, R].
+                found = cursor.set_range(L)
+                while found:
+                    c_R, c_L = cursor.item()
+                    if c_R > R:
+                        break
+                    cursor.delete2()
+                    found = bool(cursor.cursor.key())
+                cursor.put(R, L)
+
+    def _fold_delta(self, res, name):
+        """Merge the delta of `name` once its registry is not shared."""
+        layers = self._registry_layers(res, name)
+        if len(layers) == 2 and layers[1] == name:
+            delta = layers[0]
+            self._merge_registries(res, [delta], name)
+            self._drop_registry(res, delta)
+            with Deltas.cursor(res) as cursor:
+                cursor.delete(name)
+
+    def _registry_location(self, res, name):
+        """
+        Return the database holding the registry `name` and the reader id
+        prefixing its keys (None in the databases layout).
+
+        """
+        db_name, reader_id = self._registry_db_name(res, name)
+        return res.db[db_name], reader_id
+
+    def _registry_db_name(self, res, name):
+        """Like `_registry_location()` returning the name of the database."""
+        if self._table_layout:
+            with Catalog.cursor(res) as cursor:
+                reader_id = cursor.get(name)
+            if reader_id is None:
+                raise ReaderDoesNotExist("%s reader does not exists" % name)
+            return '.registries', reader_id
+        else:
+            return name, None
+
+    def _layers_cursor(self, res, layers):
+        """Return a raw cursor over the (R, L) records of `layers`."""
+        cursors = []
+        try:
+            for layer in layers:
+                db, reader_id = self._registry_location(res, layer)
+                cursors.append(registry_cursor(
+                    res.txn, db,
+                    self.model._meta['registry_chunk_size'],
+                    reader_id=reader_id))
+        except:
+            for cursor in cursors:
+                cursor.close()
+            raise
+
+        if len(cursors) == 1:
+            return cursors[0]
+        else:
+            return UnionCursor(cursors)
+
+    def _registry_cursor(self, res, name):
+        """Return a raw cursor over the (R, L) records of `name`."""
+        return self._layers_cursor(res, self._registry_layers(res, name))
+
+    def _registry_proxy(self, res, name, layers=None):
+        if layers is None:
+            layers = self._registry_layers(res, name)
+        cursor = self._layers_cursor(res, layers)
+        db_name = self._registry_db_name(res, layers[0])[0]
+        return CursorProxy(RegistryDB.named(name), res, cursor, db_name)
+
+    @contextmanager
+    def _registry(self, res, name, layers=None):
+        proxy = self._registry_proxy(res, name, layers=layers)
+        with proxy.cursor:
+            yield proxy
+
+    def _update_watermark(self, res, name):
+        with self._registry(res, name) as cursor:
+            if cursor.first():
+                right, left = cursor.item()
+            else:
+                right = left = None
+
+        if left != S.MIN:
+            watermark = S.MIN
+        else:
+            watermark = min(right + 1, S.MAX)
+
+        with Watermarks.cursor(res) as cursor:
+            cursor.put(name, watermark)
+
+    @open_db
+    @same_thread
+    def watermark(self, name):
+        """
+        Return the low-watermark of the reader `name`.
+
+        Every entry below the watermark is acknowledged and committed.
+
+        """
+        try:
+            with self.readers(write=False) as res:
+                with Watermarks.cursor(res) as cursor:
+                    return cursor.get(name, default=S.MIN)
+        except lmdb.ReadonlyError:
+            return S.MIN
 
     @open_db
     @same_thread
     def save_registry(self, name, added):
         with self.readers(write=True) as res:
-            with RegistryDB.named(name).cursor(res) as cursor:
+            # Registries shared by clones are never modified, the acks are
+            # saved on top of them.
+            layers = self._registry_layers(res, name)
+
+            with Stats.cursor(res) as cursor:
+                stats = cursor.get(name)
+            if stats is not None:
+                stats = RegistryStats(*stats)
+
+            with self._registry(res, name, layers=layers[:1]) as cursor, \
+                    ExitStack() as stack:
+                if len(layers) == 1:
+                    view = cursor
+                else:
+                    # The counters are kept for the union of the layers.
+                    base = stack.enter_context(
+                        self._layers_cursor(res, layers[1:]))
+                    view = CursorProxy(RegistryDB.named(name), res,
+                                       UnionCursor([cursor.cursor, base]),
+                                       cursor.db_name)
+
                 for s in added.acked:
+                    if view is not cursor:
+                        counts = self._touching(view, s)
+
                     s_L = max([s.MIN, s.L - 1])
                     s_R = min([s.MAX, s.R + 1])
 
-                    if cursor.set_range(s_L):
-                        f_R, f_L = cursor.item()
-                        if f_L <= s_L:
-                            first = (f_L, f_R)
-                        else:
-                            first = None
-                    else:
-                        first = None
+                    # Replace the stored segments overlapping or touching
+                    # `s` with their union.
+                    L, R = s.L, s.R
+                    merged = overlap = 0
+                    found = cursor.set_range(s_L)
+                    while found:
+                        c_R, c_L = cursor.item()
+                        if c_L > s_R:
+                            break
+                        merged += 1
+                        overlap += max(0, min(c_R, s.R) - max(c_L, s.L) + 1)
+                        L, R = min(L, c_L), max(R, c_R)
+                        cursor.delete2()
+                        found = bool(cursor.cursor.key())
+                    cursor.put(R, L)
+
+                    if view is not cursor:
+                        merged, overlap = counts
+                    if stats is not None:
+                        stats = stats.merge(s.L, s.R,
+                                            merged=merged,
+                                            overlap=overlap)
+
+            self._update_watermark(res, name)
+            with Stats.cursor(res) as cursor:
+                if stats is None:
+                    # Registries saved before the counters existed.
+                    stats = self._registry_stats(res, name, cached=False)
+                cursor.put(name, tuple(stats))
+            return True
+
+    @staticmethod
+    def _touching(cursor, s):
+        """
+        Return the number of segments of `cursor` overlapping or touching
+        `s` and the number of positions of `s` they hold.
 
-                    if cursor.set_range(s_R):
-                        l_R, l_L = cursor.item()
-                        if l_L <= s_R:
-                            last = (l_L, l_R)
-                        else:
-                            last = None
-                    else:
-                        last = None
+        """
+        merged = overlap = 0
+        found = cursor.set_range(max([s.MIN, s.L - 1]))
+        while found:
+            c_R, c_L = cursor.item()
+            if c_L > min([s.MAX, s.R + 1]):
+                break
+            merged += 1
+            overlap += max(0, min(c_R, s.R) - max(c_L, s.L) + 1)
+            found = cursor.next()
+        return merged, overlap
+
+    def _registry_stats(self, res, name, cached=True):
+        if cached:
+            with Stats.cursor(res) as cursor:
+                stats = cursor.get(name)
+            if stats is not None:
+                return RegistryStats(*stats)
+
+        with self._registry(res, name) as cursor:
+            return RegistryStats.from_segments(
+                (L, R) for R, L in cursor.iternext())
+
+    @open_db
+    @same_thread
+    def registry_stats(self, name):
+        """
+        Return the `RegistryStats` of the committed registry of `name`.
+
+        The counters are maintained by every commit, reading them doesn't
+        walk the registry.
+
+        """
+        if name not in self._reader_catalog()[1]:
+            raise ReaderDoesNotExist("%s reader does not exists" % name)
+
+        with self.readers(write=False) as res:
+            return self._registry_stats(res, name)
+
+    @open_db
+    @same_thread
+    def lag(self, name):
+        """
+        Return the number of entries created but not acknowledged by the
+        reader `name` (removed entries included).
 
-                    if first is None and last is None:
-                        cursor.put(s.R, s.L)
+        """
+        stats = self.registry_stats(name)
+        try:
+            with self.data(write=False) as res:
+                next_idx = self._get_next_event_idx(res)
+        except lmdb.ReadonlyError:
+            next_idx = 0
+        return max(0, next_idx - stats.acked)
+
+    def _leases(self, res, name):
+        prefix = lease_key(name, 0)[:-20]
+        leases = []
+        with Leases.cursor(res) as cursor:
+            if cursor.set_range(prefix):
+                for key, lease in cursor.iternext():
+                    if not key.startswith(prefix):
+                        break
+                    elif lease.name == name:
+                        leases.append(lease)
+        return leases
+
+    @open_db
+    @same_thread
+    def leases(self, name):
+        """Return the active leases of the reader `name`."""
+        now = time.time()
+        try:
+            with self.readers(write=False) as res:
+                return [l for l in self._leases(res, name)
+                        if not l.expired(now)]
+        except lmdb.ReadonlyError:
+            return []
+
+    @open_db
+    @same_thread
+    def claim(self, name, owner, size=1000, ttl=60):
+        """
+        Lease to `owner` up to `size` pending entries of the reader `name`.
+
+        The claimed entries are the first ones neither acknowledged nor
+        leased by other owners. The lease expires after `ttl` seconds, then
+        the entries not acknowledged can be claimed again.
+
+        Return the `Lease` or None if there is nothing to claim.
+
+        """
+        if size < 1:
+            raise ValueError("size must be greater than 0")
+        elif name not in self._reader_catalog()[1]:
+            raise ReaderDoesNotExist("%s reader does not exists" % name)
+
+        # The write transaction serializes the claims of every process.
+        with self.readers(write=True) as rres:
+            now = time.time()
+            leases = []
+            with Leases.cursor(rres) as cursor:
+                for lease in self._leases(rres, name):
+                    if lease.expired(now):
+                        cursor.delete(lease.key)
                     else:
-                        if last is None:
-                            cursor.get(f_R)
-                            while cursor.delete2():
-                                pass
-                            cursor.put(s.R, f_L)
-                        elif first is None:
-                            while cursor.first():
-                                c_R, c_L = cursor.item()
-                                cursor.delete2()
-                                if (c_L, c_R) == (l_L, l_R):
+                        leases.append(lease)
+
+            pks = []
+            try:
+                with self.data(write=False) as dres:
+                    entries = dres.txn.cursor(dres.db['entries'])
+                    registry = self._registry_cursor(rres, name)
+
+                    start, restart = None, True
+                    while restart:
+                        restart = False
+                        for raw_key, _ in iter_unacked(entries, registry,
+                                                       start=start):
+                            pk = NumericSerializer.python_value(raw_key)
+                            leased = [l for l in leases if pk in l]
+                            if not leased:
+                                pks.append(pk)
+                                if len(pks) >= size:
                                     break
-                            cursor.put(l_R, s.L)
-                        else:
-                            # Both present
-                            if first == last:
-                                # This means is already in the segment, so
-                                # already acked. Nothing to do here.
-                                pass
+                            elif not pks:
+                                # Skip the entries leased by others.
+                                start = max(l.R for l in leased) + 1
+                                restart = True
+                                break
                             else:
-                                cursor.get(f_R)
-                                while cursor.delete2():
-                                    c_R, c_L = cursor.item()
-                                    if (c_L, c_R) == (l_L, l_R):
-                                        cursor.delete2()
-                                        break
-                                cursor.put(l_R, f_L)
-                return True
+                                # Leases are contiguous ranges.
+                                break
+            except lmdb.ReadonlyError:
+                pass
+
+            if not pks:
+                return None
+            else:
+                lease = Lease(name=name, L=pks[0], R=pks[-1], owner=owner,
+                              expires=now + ttl)
+                with Leases.cursor(rres) as cursor:
+                    cursor.put(lease.key, lease)
+                return lease
+
+    @open_db
+    @same_thread
+    def renew(self, lease, ttl=60):
+        """
+        Extend `lease` for `ttl` more seconds.
+
+        Return the renewed `Lease` or None if the lease was lost.
+
+        """
+        with self.readers(write=True) as res:
+            with Leases.cursor(res) as cursor:
+                current = cursor.get(lease.key)
+                if current is None or current.owner != lease.owner:
+                    return None
+                else:
+                    renewed = current._replace(expires=time.time() + ttl)
+                    cursor.put(renewed.key, renewed)
+                    return renewed
+
+    @open_db
+    @same_thread
+    def release(self, lease):
+        """Release `lease` if it is still owned by its owner."""
+        with self.readers(write=True) as res:
+            with Leases.cursor(res) as cursor:
+                current = cursor.get(lease.key)
+                if current is None or current.owner != lease.owner:
+                    return False
+                else:
+                    return cursor.delete(lease.key)
 
     @open_db
     @same_thread
     def list_readers(self):
+        return list(self._reader_catalog()[0])
+
+    def _list_readers(self, res):
+        if self._table_layout:
+            with Catalog.cursor(res) as cursor:
+                return [name for name in cursor.iternext(values=False)
+                        if name not in RESERVED_NAMES
+                        and not name.startswith(DELTA_PREFIX)]
+
         readers = list()
-        with self.readers(write=True) as res:
-            with res.txn.cursor() as cursor:
-                for raw in cursor.iternext(values=False):
-                    try:
-                        name = bytes(raw).decode("utf-8")
-                    except:
-                        continue
-                    else:
-                        if name != "hints":
-                            readers.append(name)
+        with res.txn.cursor() as cursor:
+            for raw in cursor.iternext(values=False):
+                try:
+                    name = bytes(raw).decode("utf-8")
+                except:
+                    continue
+                else:
+                    if (name not in RESERVED_NAMES
+                            and not name.startswith(DELTA_PREFIX)
+                            and bytes(raw) not in INTERNAL_KEYS):
+                        readers.append(name)
         return readers
 
     @open_db
@@ -486,18 +1700,36 @@ class Connection:
             raise ValueError("chunk_size must be greater than 0")
 
         registries = []
+        watermarks = []
 
         for name in self.list_readers():
             try:
-                registries.append(self.reader(name).registry)
+                if NumpyRegistry is None:
+                    registries.append(self.reader(name).registry)
+                else:
+                    registries.append(NumpyRegistry.from_db(self, name))
+                watermarks.append(self.watermark(name))
             except ReaderDoesNotExist:
                 pass
 
         removed = not_found = 0
         if registries:
+            # Every entry below the lowest watermark is acknowledged by every
+            # reader, no need to intersect the registries there.
+            watermark = min(watermarks)
+            removed += self._purge_below(watermark, chunk_size)
+
             with self.data(write=False) as resr:
                 with Entries.cursor(resr) as rcursor:
-                    common_acked = iter(reduce(op.and_, registries, rcursor))
+                    if NumpyRegistry is not None:
+                        # Vectorized intersection, the entries are only
+                        # walked inside the common segments.
+                        common = reduce(op.and_, registries)
+                        common_acked = common.walk(rcursor, watermark)
+                    else:
+                        common_acked = iter(
+                            reduce(op.and_, registries, rcursor))
+                        common_acked.seek(watermark)
                     idx = chunk_size
                     while idx == chunk_size:
                         idx = 0
@@ -508,7 +1740,47 @@ class Connection:
                                     value = cursor.pop(pk)
                                     if value is not None:
                                         removed += 1
-                                        self._unindex(res, self.model(**value))
+                                        entry = self.model(**value)
+                                        entry.pk = pk
+                                        self._unindex(res, entry)
                                     else:
                                         not_found += 1
         return removed, not_found
+
+    def _purge_below(self, watermark, chunk_size):
+        removed = 0
+        idx = chunk_size
+        while idx == chunk_size:
+            idx = 0
+            with self.data(write=True) as res:
+                with Entries.cursor(res) as cursor:
+                    while idx < chunk_size and cursor.first():
+                        pk, value = cursor.item()
+                        if pk >= watermark:
+                            break
+                        cursor.delete2()
+                        entry = self.model(**value)
+                        entry.pk = pk
+                        self._unindex(res, entry)
+                        idx += 1
+            removed += idx
+        return removed
+
+
+class ReadonlyConnection(Connection):
+    """
+    Connection opening both environments with `readonly=True`.
+
+    It never takes the writer lock, so any number of processes can attach
+    to a live binlog without contending with the writers. Write operations
+    raise `BadUsageError`.
+
+    Database handles opened by read transactions die with them, so every
+    read operation opens again the databases it uses.
+
+    """
+    def __init__(self, model, path, kwargs):
+        super().__init__(model, path, dict(kwargs, readonly=True))
+
+    def _begin_write(self, env_attr, open_dbs):
+        raise BadUsageError("Cannot write using a read-only connection.")
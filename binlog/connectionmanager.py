@@ -9,11 +9,14 @@ class ConnectionManager:
         self.connections = dict()
 
     def open(self, model, path, connection_class, kwargs):
+        # The class is part of the params: a read-only connection can't be
+        # handed out as a writable one, nor the other way around.
+        params = (connection_class, frozenset(kwargs.items()))
         if path not in self.connections:
             self.connections[path] = OpenConnection(
                 connection_class(model=model, path=path, kwargs=kwargs),
-                frozenset(kwargs.items()))
-        elif frozenset(kwargs.items()) != self.connections[path].params:
+                params)
+        elif params != self.connections[path].params:
             raise ValueError(
                 "Cannot open twice a database with different params")
         else:
@@ -1,6 +1,7 @@
 from .abstract import Database
 from .index import NumericIndex
 
+from .serializer import DatetimeSerializer
 from .serializer import NumericSerializer
 from .serializer import ObjectSerializer
 from .serializer import TextSerializer
@@ -33,3 +34,44 @@ class Registry(Database):
 class Hints(Database):
     K = TextSerializer
     V = NumericSerializer
+
+
+class Leases(Database):
+    NAME = '.leases'
+    K = TextSerializer
+    V = ObjectSerializer
+
+
+class Watermarks(Database):
+    NAME = '.watermarks'
+    K = TextSerializer
+    V = NumericSerializer
+
+
+class Catalog(Database):
+    NAME = '.catalog'
+    K = TextSerializer
+    V = NumericSerializer
+
+
+class Stats(Database):
+    NAME = '.stats'
+    K = TextSerializer
+    V = ObjectSerializer
+
+
+class Clones(Database):
+    NAME = '.clones'
+    K = TextSerializer
+    V = TextSerializer
+
+
+class Deltas(Database):
+    NAME = '.deltas'
+    K = TextSerializer
+    V = TextSerializer
+
+
+class Timestamps(Database):
+    K = DatetimeSerializer
+    V = NumericSerializer
@@ -8,3 +8,11 @@ class ReaderDoesNotExist(Exception):
 
 class BadUsageError(RuntimeError):
     pass
+
+
+class LongSnapshotWarning(UserWarning):
+    pass
+
+
+class FrameError(ValueError):
+    pass
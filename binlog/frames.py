@@ -0,0 +1,89 @@
+"""
+Framed binary format used to move raw entries between binlogs.
+
+A stream starts with `MAGIC` followed by any number of frames. Every frame
+is a `HEADER` (kind, key, payload length) followed by the payload. Entry
+frames carry the pk as key and the stored value untouched as payload, so
+entries are never unpickled on the way.
+
+"""
+from contextlib import contextmanager
+import struct
+
+from .exceptions import FrameError
+
+
+MAGIC = b'BINLOG\x00\x01'
+HEADER = struct.Struct('!cQI')
+
+#: Frame kinds.
+ENTRY = b'E'
+REGISTRY = b'R'
+UNREGISTER = b'U'
+BATCH = b'B'
+
+
+@contextmanager
+def open_stream(path_or_fileobj, mode):
+    """Yield a binary file object, opening `path_or_fileobj` if needed."""
+    if hasattr(path_or_fileobj, 'read') or hasattr(path_or_fileobj, 'write'):
+        yield path_or_fileobj
+    else:
+        with open(str(path_or_fileobj), mode) as fileobj:
+            yield fileobj
+
+
+def write_magic(fileobj):
+    fileobj.write(MAGIC)
+
+
+def write_frame(fileobj, kind, key, payload=b''):
+    fileobj.write(HEADER.pack(kind, key, len(payload)))
+    fileobj.write(payload)
+
+
+def _read(fileobj, size):
+    data = fileobj.read(size)
+    while data and len(data) < size:
+        chunk = fileobj.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def read_magic(fileobj):
+    """Consume the magic header. Return False if the stream is empty."""
+    magic = _read(fileobj, len(MAGIC))
+    if not magic:
+        return False
+    elif magic != MAGIC:
+        raise FrameError("Not a binlog frame stream.")
+    else:
+        return True
+
+
+def read_frame(fileobj):
+    """Return the next (kind, key, payload) or None at the end of stream."""
+    header = _read(fileobj, HEADER.size)
+    if not header:
+        return None
+    elif len(header) != HEADER.size:
+        raise FrameError("Truncated frame header.")
+
+    kind, key, length = HEADER.unpack(header)
+    payload = _read(fileobj, length)
+    if len(payload) != length:
+        raise FrameError("Truncated frame payload.")
+
+    return kind, key, payload
+
+
+def iter_frames(fileobj):
+    if not read_magic(fileobj):
+        return
+    while True:
+        frame = read_frame(fileobj)
+        if frame is None:
+            break
+        yield frame
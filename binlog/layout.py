@@ -0,0 +1,242 @@
+"""
+Storage layouts of the reader registries.
+
+``'databases'`` (the default) stores every registry in its own named
+database of the readers environment. ``'table'`` stores every registry in
+the single `registries` database, with keys prefixed by a reader id
+allocated in the `catalog` database. Listing, cloning and dropping readers
+are then range operations and the readers environment doesn't need a huge
+`max_dbs`.
+
+Select it with `__meta_registry_layout__ = 'table'` in the model.
+
+"""
+import struct
+
+from .abstract import RawCursor
+from .chunked import ChunkedCursor, MAXINT, PACK
+
+
+DATABASES = 'databases'
+TABLE = 'table'
+LAYOUTS = (DATABASES, TABLE)
+
+PREFIX = struct.Struct('!Q')
+
+
+class PrefixedCursor(RawCursor):
+    """
+    Raw cursor over the records of one reader in the registries table,
+    hiding the reader id prefix of the keys.
+
+    """
+    def __init__(self, cursor, reader_id):
+        super().__init__(cursor)
+        self.prefix = PREFIX.pack(reader_id)
+        self.upper = PREFIX.pack(reader_id + 1)
+        self._valid = False
+
+    @property
+    def positioned(self):
+        return self._valid
+
+    def _check(self, found):
+        self._valid = bool(found) and \
+            bytes(self.cursor.key()[:PREFIX.size]) == self.prefix
+        return self._valid
+
+    def first(self):
+        return self._check(self.cursor.set_range(self.prefix))
+
+    def last(self):
+        if self.cursor.set_range(self.upper):
+            return self._check(self.cursor.prev())
+        else:
+            return self._check(self.cursor.last())
+
+    def next(self):
+        if not self._valid:
+            return self.first()
+        return self._check(self.cursor.next())
+
+    def prev(self):
+        if not self._valid:
+            return self.last()
+        return self._check(self.cursor.prev())
+
+    def set_range(self, key):
+        return self._check(self.cursor.set_range(self.prefix + bytes(key)))
+
+    def set_key(self, key):
+        return self._check(self.cursor.set_key(self.prefix + bytes(key)))
+
+    def key(self):
+        if not self._valid:
+            return b''
+        return self.cursor.key()[PREFIX.size:]
+
+    def value(self):
+        if not self._valid:
+            return b''
+        return self.cursor.value()
+
+    def delete(self, dupdata=False):
+        if not self._valid:
+            return False
+        self.cursor.delete()
+        # Like LMDB, the cursor moves to the next record.
+        self._check(self.cursor.key())
+        return True
+
+    def put(self, key, value, **kwargs):
+        result = self.cursor.put(self.prefix + bytes(key), value, **kwargs)
+        self._check(True)
+        return result
+
+    def drop(self):
+        """Delete every record of the reader."""
+        if self.first():
+            while self._valid:
+                self.delete()
+
+
+class UnionCursor(RawCursor):
+    """
+    Read-only raw cursor over the union of several registries.
+
+    Segments of different registries overlapping or touching each other
+    are seen as a single segment. The positions of the wrapped cursors are
+    not kept between calls.
+
+    """
+    def __init__(self, cursors):
+        super().__init__(cursors[0])
+        self.cursors = cursors
+        self._segment = None  # (L, R) of the current segment.
+
+    def close(self):
+        for cursor in self.cursors:
+            cursor.close()
+
+    @property
+    def positioned(self):
+        return self._segment is not None
+
+    @staticmethod
+    def _item(cursor):
+        return (PACK.unpack(bytes(cursor.value()))[0],
+                PACK.unpack(bytes(cursor.key()))[0])
+
+    def _coalesce(self, L, R):
+        """Extend (L, R) with every segment overlapping or touching it."""
+        changed = True
+        while changed:
+            changed = False
+            for cursor in self.cursors:
+                found = cursor.set_range(PACK.pack(max(L, 1) - 1))
+                while found:
+                    c_L, c_R = self._item(cursor)
+                    if c_L > R + 1:
+                        break
+                    if c_L < L or c_R > R:
+                        L, R = min(L, c_L), max(R, c_R)
+                        changed = True
+                    found = cursor.next()
+        self._segment = (L, R)
+        return True
+
+    def _unset(self):
+        self._segment = None
+        return False
+
+    def _set_range(self, right):
+        first = None
+        for cursor in self.cursors:
+            if cursor.set_range(PACK.pack(right)):
+                segment = self._item(cursor)
+                if first is None or segment < first:
+                    first = segment
+        if first is None:
+            return self._unset()
+        return self._coalesce(*first)
+
+    def _last_below(self, left=None):
+        last = None
+        for cursor in self.cursors:
+            if left is None:
+                found = cursor.last()
+            elif cursor.set_range(PACK.pack(left)):
+                found = cursor.prev()
+            else:
+                found = cursor.last()
+            if found:
+                segment = self._item(cursor)
+                if last is None or segment[1] > last[1]:
+                    last = segment
+        if last is None:
+            return self._unset()
+        return self._coalesce(*last)
+
+    def first(self):
+        return self._set_range(0)
+
+    def last(self):
+        return self._last_below()
+
+    def next(self):
+        if self._segment is None:
+            return self.first()
+        right = self._segment[1]
+        if right == MAXINT:
+            return self._unset()
+        return self._set_range(right + 1)
+
+    def prev(self):
+        if self._segment is None:
+            return self.last()
+        left = self._segment[0]
+        if left == 0:
+            return self._unset()
+        return self._last_below(left)
+
+    def set_range(self, key):
+        return self._set_range(PACK.unpack(bytes(key))[0])
+
+    def set_key(self, key):
+        right = PACK.unpack(bytes(key))[0]
+        if self._set_range(right) and self._segment[1] == right:
+            return True
+        return self._unset()
+
+    def key(self):
+        if self._segment is None:
+            return b''
+        return PACK.pack(self._segment[1])
+
+    def value(self):
+        if self._segment is None:
+            return b''
+        return PACK.pack(self._segment[0])
+
+    def delete(self, dupdata=False):
+        raise TypeError("The union of registries is read-only")
+
+    def put(self, key, value, **kwargs):
+        raise TypeError("The union of registries is read-only")
+
+
+def registry_cursor(txn, db, chunk_size=None, reader_id=None):
+    """
+    Return a raw cursor over the (right, left) records of a registry.
+
+    `db` is the registry database, or the registries table if `reader_id`
+    is given.
+
+    """
+    cursor = txn.cursor(db)
+    if reader_id is not None:
+        cursor = PrefixedCursor(cursor, reader_id)
+    if chunk_size is None:
+        return cursor
+    else:
+        return ChunkedCursor(cursor, chunk_size)
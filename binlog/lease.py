@@ -0,0 +1,25 @@
+from collections import namedtuple
+import time
+
+
+def lease_key(name, L):
+    return '%s:%020d' % (name, L)
+
+
+class Lease(namedtuple('Lease', ('name', 'L', 'R', 'owner', 'expires'))):
+    """
+    Time-limited ownership of the pending entries of a reader between `L`
+    and `R` (both included).
+
+    """
+    @property
+    def key(self):
+        return lease_key(self.name, self.L)
+
+    def __contains__(self, value):
+        return self.L <= value <= self.R
+
+    def expired(self, now=None):
+        if now is None:
+            now = time.time()
+        return self.expires <= now
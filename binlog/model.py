@@ -1,6 +1,6 @@
 import re
 
-from .connection import Connection
+from .connection import Connection, ReadonlyConnection
 from .exceptions import BadUsageError
 from .index import Index
 from .serializer import NumericSerializer, ObjectSerializer
@@ -13,11 +13,16 @@ class ModelMeta(type):
             'config_db_name': 'Config',
             'entries_db_name': 'Entries',
             'checkpoints_db_name': 'Checkpoints',
+            'timestamps_db_name': 'Timestamps',
+            'timestamp_every': None,
+            'registry_chunk_size': None,
+            'registry_layout': 'databases',
             'index_db_format': ('{model._meta[entries_db_name]}'
                                 '__idx__'
                                 '{index_name}'),
             'readers_env_directory': 'readers',
             'data_env_directory': 'data',
+            'doorbell_directory': 'doorbell',
             'connection_class': Connection}
         for attr, value in namespace.copy().items():
             # Replace any __meta_*__ by an entry in the _meta dict.
@@ -59,6 +64,19 @@ class Model(dict, metaclass=ModelMeta):
             cls._meta['connection_class'],
             kwargs)
 
+    @classmethod
+    def open_readonly(cls, path, **kwargs):
+        """Open `path` without taking the writer lock."""
+        # This MUST be imported every time because can be invalidated by
+        # `reset_connections`.
+        from .connectionmanager import PROCESS_CONNECTIONS
+
+        return PROCESS_CONNECTIONS.open(
+            cls,
+            path,
+            ReadonlyConnection,
+            kwargs)
+
     def mark_as_saved(self, pk):
         self.pk = pk
         self.saved = True
@@ -0,0 +1,198 @@
+"""
+Cross-process notification of new entries.
+
+Every listener owns a named pipe (FIFO) inside the doorbell directory of the
+binlog. Writers ring the doorbell after committing new entries, writing one
+byte to the pipes of the listeners armed for a notification, so listeners can
+block in `select()` instead of polling the database.
+
+A listener is armed while its pipe is named after it. Ringing renames the
+pipe with the `.idle` suffix before writing, so busy listeners cost nothing
+to the writers until they wait again. Listeners are armed again before they
+go back to the database, so no entry created in between is missed.
+
+"""
+import errno
+import os
+import select
+import time
+import uuid
+
+
+IDLE_SUFFIX = '.idle'
+
+# Directory listings by directory, with the mtime they were taken at.
+_listings = {}
+
+
+def _listeners(directory):
+    """Return the names of the pipes found in `directory`."""
+    st = os.stat(directory)
+    cached = _listings.get(directory)
+    if cached is not None and cached[0] == st.st_mtime_ns:
+        return cached[1]
+
+    names = os.listdir(directory)
+    # A change within the mtime granularity would go unnoticed, so recent
+    # listings are not trusted.
+    if time.time() - st.st_mtime > 1:
+        _listings[directory] = (st.st_mtime_ns, names)
+    return names
+
+
+def _remove_abandoned(path):
+    """Remove the pipe `path` if its listener is dead."""
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+    except FileNotFoundError:
+        pass
+    except OSError as exc:
+        if exc.errno != errno.ENXIO:
+            raise
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+    else:
+        os.close(fd)
+
+
+def ring(directory):
+    """
+    Wake up every listener armed in `directory`.
+
+    Pipes without a reader belong to dead listeners and are removed.
+
+    """
+    try:
+        names = _listeners(directory)
+    except FileNotFoundError:
+        return 0
+
+    rung = 0
+    for name in names:
+        if '.' in name:
+            # Listener still being set up or not armed.
+            continue
+
+        path = os.path.join(directory, name)
+        idle_path = path + IDLE_SUFFIX
+        try:
+            # Disarm first, only one writer rings the listener.
+            os.rename(path, idle_path)
+            fd = os.open(idle_path, os.O_WRONLY | os.O_NONBLOCK)
+        except FileNotFoundError:
+            continue
+        except OSError as exc:
+            if exc.errno == errno.ENXIO:
+                try:
+                    os.unlink(idle_path)
+                except FileNotFoundError:
+                    pass
+            continue
+
+        try:
+            os.write(fd, b'\0')
+        except BlockingIOError:
+            # The pipe is full, a wake up is already pending.
+            pass
+        finally:
+            os.close(fd)
+        rung += 1
+
+    return rung
+
+
+class Doorbell:
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = None
+        self._rfd = None
+        self._wfd = None
+
+    @property
+    def closed(self):
+        return self._rfd is None
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Idle pipes are never rung, remove the ones of dead listeners.
+        for name in os.listdir(self.directory):
+            if name.endswith(IDLE_SUFFIX):
+                _remove_abandoned(os.path.join(self.directory, name))
+
+        name = '%d-%s' % (os.getpid(), uuid.uuid4().hex)
+        tmppath = os.path.join(self.directory, '.' + name)
+        os.mkfifo(tmppath)
+        try:
+            self._rfd = os.open(tmppath, os.O_RDONLY | os.O_NONBLOCK)
+            # Keep a writer of our own so the pipe never reports EOF when the
+            # writers of other processes close their end.
+            self._wfd = os.open(tmppath, os.O_WRONLY | os.O_NONBLOCK)
+            self.path = os.path.join(self.directory, name)
+            os.rename(tmppath, self.path)
+        except:
+            self.close()
+            try:
+                os.unlink(tmppath)
+            except FileNotFoundError:
+                pass
+            raise
+
+        return self
+
+    def close(self):
+        for fd in (self._rfd, self._wfd):
+            if fd is not None:
+                os.close(fd)
+        self._rfd = self._wfd = None
+
+        if self.path is not None:
+            for path in (self.path, self.path + IDLE_SUFFIX):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            self.path = None
+
+    def fileno(self):
+        return self._rfd
+
+    def arm(self):
+        """Ask the writers for a notification of the next entries."""
+        try:
+            os.rename(self.path + IDLE_SUFFIX, self.path)
+        except FileNotFoundError:
+            # Already armed.
+            pass
+
+    def drain(self):
+        """Consume every pending notification and arm the doorbell."""
+        try:
+            while os.read(self._rfd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        self.arm()
+
+    def wait(self, timeout=None):
+        """
+        Block until the doorbell rings or `timeout` seconds elapse.
+
+        Return True if the doorbell rang.
+
+        """
+        self.arm()
+        ready, _, _ = select.select([self._rfd], [], [], timeout)
+        if ready:
+            self.drain()
+            return True
+        else:
+            return False
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *_, **__):
+        self.close()
@@ -0,0 +1,140 @@
+"""
+Registry backed by NumPy arrays.
+
+The bounds of the segments are stored in two sorted `uint64` arrays, so
+union, intersection, complement and batched membership tests are
+vectorized. `Connection.purge()` uses it, when numpy is installed, to
+intersect the registries of every reader.
+
+Requires numpy (``pip install binlog[numpy]``).
+
+"""
+import numpy as np
+
+from .registry import Registry, S
+
+
+ONE = np.uint64(1)
+MIN = np.uint64(S.MIN)
+MAX = np.uint64(S.MAX)
+
+
+def _array(values):
+    return np.asarray(values, dtype=np.uint64)
+
+
+class NumpyRegistry:
+    def __init__(self, L=(), R=()):
+        self.L = _array(L)
+        self.R = _array(R)
+
+    @classmethod
+    def from_registry(cls, registry):
+        return cls([s.L for s in registry.acked],
+                   [s.R for s in registry.acked])
+
+    @classmethod
+    def from_db(cls, connection, name):
+        """Load the committed registry of the reader `name`."""
+        with connection.readers(write=False) as res:
+            with connection._registry_cursor(res, name) as cursor:
+                # Keys are the right bounds and values the left bounds, both
+                # big-endian uint64.
+                rights = []
+                lefts = []
+                for raw_right, raw_left in cursor.iternext():
+                    rights.append(raw_right)
+                    lefts.append(raw_left)
+                R = np.frombuffer(b''.join(rights), dtype='>u8')
+                L = np.frombuffer(b''.join(lefts), dtype='>u8')
+        return cls(L.astype(np.uint64), R.astype(np.uint64))
+
+    def to_registry(self):
+        return Registry(self.acked)
+
+    @property
+    def acked(self):
+        return [S(int(l), int(r)) for l, r in zip(self.L, self.R)]
+
+    def __repr__(self):  # pragma: no cover
+        return repr(self.acked)
+
+    def __len__(self):
+        return len(self.L)
+
+    def __eq__(self, other):
+        return (np.array_equal(self.L, other.L)
+                and np.array_equal(self.R, other.R))
+
+    def count(self, stop=None):
+        """Return the number of acknowledged pks lower than `stop`."""
+        L, R = self.L, self.R
+        if stop is not None:
+            if stop <= 0:
+                return 0
+            last = np.uint64(stop - 1)
+            keep = L <= last
+            L, R = L[keep], np.minimum(R[keep], last)
+        # The total can exceed the uint64 range (a registry acknowledging
+        # every pk holds 2**64 of them), so it is summed as Python ints.
+        return int(np.sum((R - L).astype(object))) + len(L)
+
+    def walk(self, iterseek, start=S.MIN):
+        """
+        Iterate over the acknowledged pks yielded by `iterseek`, seeking it
+        to every segment from `start`.
+
+        """
+        i = int(np.searchsorted(self.R, np.uint64(start)))
+        for L, R in zip(self.L[i:].tolist(), self.R[i:].tolist()):
+            iterseek.seek(max(L, start))
+            for pk in iterseek:
+                if pk > R:
+                    break
+                yield pk
+
+    def contains_many(self, pks):
+        """Return a boolean array telling which of `pks` are acknowledged."""
+        pks = _array(pks)
+        i = np.searchsorted(self.L, pks, side='right') - 1
+        found = i >= 0
+        found[found] = pks[found] <= self.R[i[found]]
+        return found
+
+    def __contains__(self, pk):
+        return bool(self.contains_many([pk])[0])
+
+    def __or__(self, other):
+        L = np.concatenate((self.L, other.L))
+        R = np.concatenate((self.R, other.R))
+        if not len(L):
+            return NumpyRegistry()
+
+        order = np.argsort(L, kind='mergesort')
+        L, R = L[order], R[order]
+        reach = np.maximum.accumulate(R)
+
+        # A segment starts a new one unless it overlaps or touches the
+        # previous ones. Differences are only used where they don't wrap.
+        after = L[1:] > reach[:-1]
+        starts = np.flatnonzero(after & (L[1:] - reach[:-1] > ONE)) + 1
+        starts = np.concatenate(([0], starts))
+        ends = np.concatenate((starts[1:] - 1, [len(L) - 1]))
+
+        return NumpyRegistry(L[starts], reach[ends])
+
+    def __invert__(self):
+        if not len(self.L):
+            return NumpyRegistry([MIN], [MAX])
+
+        with np.errstate(over='ignore'):
+            L = np.concatenate(([MIN], self.R + ONE))
+            R = np.concatenate((self.L - ONE, [MAX]))
+
+        keep = np.ones(len(L), dtype=bool)
+        keep[0] = self.L[0] != MIN
+        keep[-1] = self.R[-1] != MAX
+        return NumpyRegistry(L[keep], R[keep])
+
+    def __and__(self, other):
+        return ~(~self | ~other)
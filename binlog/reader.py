@@ -1,23 +1,217 @@
-from contextlib import ExitStack
+from contextlib import ExitStack, contextmanager
 from itertools import takewhile, islice
+import atexit
 import json
+import os
+import queue
+import threading
+import time
+import uuid
+import weakref
 
 import lmdb
 
 from .abstract import Direction
+from .layout import UnionCursor, registry_cursor
 from .databases import Entries, Hints
 from .serializer import NumericSerializer, ObjectSerializer
 from .util import MaskException, cmp
-from .registry import RegistryIterSeek, Registry
+from .registry import RegistryIterSeek, Registry, S
+
+
+def iter_unacked(entries, registry, acked=None, start=None):
+    """
+    Yield the raw (key, value) items of the non acknowledged entries.
+
+    `entries` and `registry` are raw lmdb cursors of the Entries database and
+    of a reader registry database (or None). The entries in the `acked`
+    in-memory registry are skipped too.
+
+    """
+    if start is None:
+        found = entries.first()
+    else:
+        found = entries.set_range(NumericSerializer.db_value(start))
+
+    while found:
+        raw_key = entries.key()
+        pk = NumericSerializer.python_value(raw_key)
+        if acked is not None and pk in acked:
+            found = entries.next()
+            continue
+        elif registry is not None and registry.set_range(raw_key):
+            left = NumericSerializer.python_value(registry.value())
+            if left <= pk:
+                # Skip the whole acknowledged segment.
+                right = NumericSerializer.python_value(registry.key())
+                if right == S.MAX:
+                    return
+                found = entries.set_range(
+                    NumericSerializer.db_value(right + 1))
+                continue
+
+        yield raw_key, entries.value()
+        found = entries.next()
+
+
+class Prefetcher(threading.Thread):
+    """
+    Read and decode the non acknowledged entries of a reader ahead of time.
+
+    The thread uses its own read transactions, so the connection (bound to
+    the consumer thread) is never touched from here.
+
+    """
+    def __init__(self, reader, entries_db, registries, acked, depth,
+                 batch_size):
+        super().__init__(daemon=True)
+        self.reader = reader
+        self.entries_db = entries_db
+        # (database name, reader id) of every layer of the registry.
+        self.registries = registries
+        self.acked = acked
+        self.batch_size = batch_size
+
+        self.queue = queue.Queue(maxsize=depth)
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            for batch in self.batches():
+                if not self._put(batch):
+                    return
+        except BaseException as exc:
+            self._put(exc)
+        else:
+            self._put(None)
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            else:
+                return True
+        return False
+
+    def batches(self):
+        conn = self.reader.connection
+        with conn.data_env.begin(write=False) as dtxn, \
+                conn.readers_env.begin(write=False) as rtxn:
+            try:
+                entries_db = conn.data_env.open_db(
+                    self.entries_db.encode('utf-8'), txn=dtxn, create=False)
+            except (lmdb.NotFoundError, lmdb.ReadonlyError):
+                # The databases are not created yet.
+                return
+            entries = dtxn.cursor(entries_db)
+            cursors = []
+            for db_name, reader_id in self.registries:
+                registry_db = conn.readers_env.open_db(
+                    db_name.encode('utf-8'), txn=rtxn, create=False)
+                cursors.append(registry_cursor(
+                    rtxn, registry_db,
+                    conn.model._meta['registry_chunk_size'],
+                    reader_id=reader_id))
+            if not cursors:
+                registry = None
+            elif len(cursors) == 1:
+                registry = cursors[0]
+            else:
+                registry = UnionCursor(cursors)
+
+            batch = []
+            for raw_key, raw_value in iter_unacked(entries, registry,
+                                                   self.acked):
+                entry = self.reader._to_model(
+                    NumericSerializer.python_value(raw_key),
+                    ObjectSerializer.python_value(raw_value))
+                batch.append((entry, len(raw_value)))
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+                    if self.stopped.is_set():
+                        return
+
+            if batch:
+                yield batch
+
+
+class AutoCommit:
+    """
+    Commit policy of a reader.
+
+    The reader commits after `acks` acknowledgements, `seconds` seconds or
+    `nbytes` bytes of entries read since the previous commit, whichever
+    comes first. The policy is checked after every ack, so commits happen
+    at batch boundaries of the consumer. There is no timer: `seconds` is
+    only checked on the next ack, an idle reader keeps its acks until
+    then, `flush()` or `close()`.
+
+    """
+    def __init__(self, acks=None, seconds=None, nbytes=None):
+        if all(v is None for v in (acks, seconds, nbytes)):
+            raise ValueError("acks, seconds or nbytes must be given")
+        for value in (acks, seconds, nbytes):
+            if value is not None and value <= 0:
+                raise ValueError("Thresholds must be greater than 0")
+
+        self.acks = acks
+        self.seconds = seconds
+        self.nbytes = nbytes
+        self.reset()
+
+    def reset(self):
+        self.pending_acks = 0
+        self.pending_bytes = 0
+        self.since = time.monotonic()
+
+    def due(self):
+        if not self.pending_acks:
+            return False
+        elif self.acks is not None and self.pending_acks >= self.acks:
+            return True
+        elif self.nbytes is not None and self.pending_bytes >= self.nbytes:
+            return True
+        elif (self.seconds is not None
+              and time.monotonic() - self.since >= self.seconds):
+            return True
+        else:
+            return False
+
+
+# Readers with an auto-commit policy, flushed when the interpreter exits.
+AUTOCOMMIT_READERS = weakref.WeakSet()
+
+
+@atexit.register
+def flush_autocommit_readers():
+    for reader in list(AUTOCOMMIT_READERS):
+        reader.flush()
 
 
 class Reader:
-    def __init__(self, connection, name, registry):
+    def __init__(self, connection, name, registry, autocommit=None):
         self.connection = connection
         self.name = name
         self.registry = registry
         self._parent = None
 
+        self.owner = '%d-%s' % (os.getpid(), uuid.uuid4().hex)
+        self.leases = []
+
+        # Registry walks of the iterations in progress, each one keeping a
+        # readers transaction until it ends or the reader commits.
+        self._walks = weakref.WeakSet()
+
+        self.autocommit = autocommit
+        if autocommit is not None:
+            if registry is None:
+                raise RuntimeError(
+                    "Cannot auto-commit an anonymous reader.")
+            AUTOCOMMIT_READERS.add(self)
+
         self.closed = False
 
     @property
@@ -45,14 +239,100 @@ class Reader:
 
     def close(self):
         self.commit()
+
+        # Entries of the leases still held are claimed by other workers.
+        leases, self.leases = self.leases, []
+        for lease in leases:
+            self.connection.release(lease)
+
         self.closed = True
+        AUTOCOMMIT_READERS.discard(self)
+
+    def flush(self):
+        """Commit the acks pending in the auto-commit policy, if any."""
+        if (self.closed
+                or self.autocommit is None
+                or not self.autocommit.pending_acks
+                or self.connection.closed
+                or self.connection.pid != os.getpid()
+                or self.connection.tid != threading.current_thread()):
+            return False
+        self.commit()
+        return True
 
     def commit(self):
-        if self.registry:
+        """
+        Commit the acks of this reader and of its ancestors.
+
+        Every level is saved in a single readers transaction; ancestors
+        without pending acks or leases are skipped. Leases are released
+        once every entry they cover is acknowledged.
+
+        """
+        readers = [self]
+        parent = self.parent
+        while parent is not None:
+            if parent.leases or (parent.registry is not None
+                                 and parent.registry.acked):
+                readers.append(parent)
+            parent = parent.parent
+
+        if len(readers) > 1:
+            with self.connection.readers(write=True):
+                released = [reader._save() for reader in readers]
+        else:
+            released = [self._save()]
+
+        for reader, leases in zip(readers, released):
+            reader._committed(leases)
+
+    def _save(self):
+        """Save the acks and release the finished leases."""
+        if self.autocommit is not None:
+            self.autocommit.reset()
+
+        released = [lease for lease in self.leases if self._finished(lease)]
+
+        if self.registry is not None and self.registry.acked:
             self.connection.save_registry(self.name, self.registry)
 
-        if self.parent is not None:
-            self.parent.commit()
+        for lease in released:
+            self.connection.release(lease)
+        return released
+
+    def _committed(self, released):
+        self.leases = [lease for lease in self.leases
+                       if lease not in released]
+        self._release_walks()
+
+        # Already persisted, only the acks after this commit are saved the
+        # next time. Read transactions in progress don't see the commit,
+        # they still need the acks in memory.
+        if (self.registry is not None and self.registry.acked
+                and self.connection._readers_read is None):
+            del self.registry.acked[:]
+
+    def _finished(self, lease):
+        """Return True if every entry of `lease` is acknowledged."""
+        it = self._iter_from(lease.L)
+        try:
+            for entry in it:
+                return entry.pk > lease.R
+            return True
+        finally:
+            it.close()
+
+    @contextmanager
+    def snapshot(self, warn_after=60):
+        """
+        Run every operation of the block against the same read snapshot.
+
+        A `LongSnapshotWarning` is emitted if the snapshot is pinned for more
+        than `warn_after` seconds.
+
+        """
+        with self.connection.snapshot(warn_after=warn_after):
+            yield self
 
     def __enter__(self):
         return self
@@ -68,13 +348,51 @@ class Reader:
             raise RuntimeError("Cannot ACK events on anonymous reader.")
 
         if isinstance(entry, int):
-            return self.registry.add(entry)
+            result = self.registry.add(entry)
         elif not isinstance(entry, Model):
             raise TypeError("ACK accepts either pk or model instance")
         elif not entry.saved:
             raise ValueError("Entry must be saved first")
         else:
-            return self.registry.add(entry.pk)
+            result = self.registry.add(entry.pk)
+
+        if self.autocommit is not None:
+            self.autocommit.pending_acks += 1
+            if self.autocommit.due():
+                self.commit()
+
+        return result
+
+    def claim(self, size=1000, ttl=60):
+        """
+        Claim the next `size` pending entries for this reader instance.
+
+        Workers sharing the reader name receive disjoint entries. The claimed
+        entries are leased during `ttl` seconds; the lease is released on
+        `commit()`. Entries of expired leases not acknowledged are delivered
+        again to the next claim.
+
+        """
+        if self.registry is None:
+            raise RuntimeError("Cannot claim events on anonymous reader.")
+
+        lease = self.connection.claim(self.name, self.owner,
+                                      size=size, ttl=ttl)
+        if lease is None:
+            return []
+        else:
+            self.leases.append(lease)
+
+        entries = []
+        it = self._iter_from(lease.L)
+        try:
+            for entry in it:
+                if entry.pk > lease.R:
+                    break
+                entries.append(entry)
+        finally:
+            it.close()
+        return entries
 
     def recursive_ack(self, entry):
         if self.parent is None:
@@ -86,8 +404,8 @@ class Reader:
     def ack_from_filter(self, recursive=False, limit=None, **filters):
         with MaskException(lmdb.Error, RuntimeError):
             with MaskException(lmdb.ReadonlyError, RuntimeError):
-                with self.connection.data(write=False) as res:
-                    it = self.__iterseek__(direction=Direction.F)
+                with self.connection.data(write=False) as res, \
+                        self._walk(Direction.F) as it:
                     with ExitStack() as index_filter:
                         for key, value in filters.items():
                             index = self.connection.model._indexes.get(key)
@@ -181,6 +499,10 @@ class Reader:
                         if self.registry is None or key not in self.registry:
                             yield (key, value)
 
+    def _count_bytes(self, nbytes):
+        if self.autocommit is not None:
+            self.autocommit.pending_bytes += nbytes
+
     def _to_model(self, key, value):
         entry = self.connection.model(**value)
         entry.pk = key
@@ -192,32 +514,168 @@ class Reader:
         if self.name is None:
             return RegistryIterSeek(~Registry(), direction=direction)
         else:
-            return MemoryCachedDBRegistry(
+            walk = MemoryCachedDBRegistry(
                 connection=self.connection,
                 name=self.name,
                 direction=direction,
                 inverted=True,
-                registry=self.registry.memory.registry)
+                registry=self.registry.memory.registry,
+                walk=True)
+            self._walks.add(walk)
+            return walk
+
+    @contextmanager
+    def _walk(self, direction):
+        """Registry walk of an iteration, released when it ends."""
+        walk = self.__iterseek__(direction=direction)
+        try:
+            yield walk
+        finally:
+            if self.name is not None:
+                self._walks.discard(walk)
+                walk.release()
+
+    def _release_walks(self):
+        # The walks would not see the acks just committed and cleared from
+        # memory, the next lookups begin a new transaction.
+        for walk in list(self._walks):
+            walk.release()
         # if self.registry is None:
         # else:
         #     return RegistryIterSeek(~self.registry, direction=direction)
 
-    def __iter__(self):
-        with MaskException(lmdb.ReadonlyError, StopIteration):
-            with self.connection.data(write=False) as res:
+    def _watermark(self):
+        if self.name is None:
+            return S.MIN
+        else:
+            return self.connection.watermark(self.name)
+
+    def _iter_from(self, start=None):
+        try:
+            start = max(start or S.MIN, self._watermark())
+            with self.connection.data(write=False) as res, \
+                    self._walk(Direction.F) as walk:
                 with Entries.cursor(res) as cursor:
-                    it = cursor & self.__iterseek__(direction=Direction.F)
+                    it = cursor & walk
+                    if start != S.MIN:
+                        it.seek(start)
                     for pk in it:
                         try:
                             yield self[pk]
                         except IndexError:
                             pass
+        except lmdb.ReadonlyError:
+            # The databases are not created yet.
+            return
+
+    def __iter__(self):
+        return self._iter_from()
+
+    def prefetch(self, depth=4, batch_size=100):
+        """
+        Iterate over the non acknowledged entries decoding them ahead.
+
+        A helper thread reads and unpickles batches of `batch_size` entries
+        while the consumer processes the previous ones. At most `depth`
+        batches are kept waiting in memory.
+
+        """
+        if depth < 1 or batch_size < 1:
+            raise ValueError("depth and batch_size must be greater than 0")
+
+        # Names, not handles: the handles opened by a read transaction die
+        # with it, the thread opens the databases in its own transactions.
+        entries_db = self.connection.model._meta['entries_db_name']
+        try:
+            if self.name is None:
+                registries = []
+                acked = Registry()
+            else:
+                conn = self.connection
+                with conn.readers(write=False) as res:
+                    registries = [
+                        conn._registry_db_name(res, layer)
+                        for layer in conn._registry_layers(res, self.name)]
+                acked = Registry(list(self.registry.acked))
+        except lmdb.ReadonlyError:
+            # The databases are not created yet.
+            return
+
+        prefetcher = Prefetcher(self, entries_db, registries, acked,
+                                depth=depth, batch_size=batch_size)
+        prefetcher.start()
+        try:
+            while True:
+                batch = prefetcher.queue.get()
+                if batch is None:
+                    return
+                elif isinstance(batch, BaseException):
+                    raise batch
+                else:
+                    for entry, nbytes in batch:
+                        # Counted when handed over, the prefetcher thread
+                        # never touches the reader state.
+                        self._count_bytes(nbytes)
+                        yield entry
+        finally:
+            prefetcher.stopped.set()
+            prefetcher.join()
+
+    def since(self, timestamp):
+        """
+        Iterate over the non acknowledged entries appended since `timestamp`.
+
+        Requires the model to sample append times (`timestamp_every`). The
+        start is rounded down to the previous sample.
+
+        """
+        start, _ = self.connection.time_range(timestamp)
+        return self._iter_from(start)
+
+    def between(self, since, until):
+        """
+        Iterate over the non acknowledged entries appended between `since`
+        and `until`.
+
+        The start is rounded down to the previous sample and the end up to
+        the next one, so no entry appended in between is missed.
+
+        """
+        start, stop = self.connection.time_range(since, until)
+        for entry in self._iter_from(start):
+            if stop is not None and entry.pk >= stop:
+                break
+            yield entry
+
+    def follow(self, timeout=None):
+        """
+        Iterate over the non acknowledged entries waiting for new ones.
+
+        Instead of polling, the reader sleeps until any process creates new
+        entries. If `timeout` is given, the iteration stops after `timeout`
+        seconds without new entries.
+
+        """
+        with self.connection.doorbell() as doorbell:
+            start = None
+            while True:
+                for entry in self._iter_from(start):
+                    start = entry.pk + 1
+                    yield entry
+
+                # Caught up: the acks pending in the auto-commit policy
+                # are not kept while sleeping.
+                self.flush()
+
+                if not doorbell.wait(timeout):
+                    return
 
     def __reversed__(self):
         with MaskException(lmdb.ReadonlyError, StopIteration):
-            with self.connection.data(write=False) as res:
+            with self.connection.data(write=False) as res, \
+                    self._walk(Direction.B) as walk:
                 with Entries.cursor(res, direction=Direction.B) as cursor:
-                    it = cursor & self.__iterseek__(direction=Direction.B)
+                    it = cursor & walk
                     for pk in it:
                         try:
                             yield self[pk]
@@ -227,9 +685,11 @@ class Reader:
     def filter(self, **filters):
         with MaskException(lmdb.Error, StopIteration):
             with MaskException(lmdb.ReadonlyError, StopIteration):
-                with self.connection.data(write=False) as res:
+                watermark = self._watermark()
+                with self.connection.data(write=False) as res, \
+                        self._walk(Direction.F) as walk:
                     with Entries.cursor(res) as cursor:
-                        it = cursor & self.__iterseek__(direction=Direction.F)
+                        it = cursor & walk
                         non_index_filter = {}
                         with ExitStack() as index_filter:
                             for key, value in filters.items():
@@ -247,6 +707,9 @@ class Reader:
                                     else:
                                         it &= index_cursor
 
+                            if watermark != S.MIN:
+                                it.seek(watermark)
+
                             for pk in it:
                                 try:
                                     entry = self[pk]
@@ -268,11 +731,7 @@ class Reader:
                         for idx, raw_item in enumerate(cursor.iterprev(), 1):
                             if key + idx == 0:
                                 raw_key, raw_value = raw_item
-                                entry = self.connection.model(
-                                    **ObjectSerializer.python_value(raw_value))
-                                entry.saved = True
-                                entry.pk = NumericSerializer.python_value(
-                                    raw_key)
+                                pk = NumericSerializer.python_value(raw_key)
                                 break
                         else:
                             raise IndexError
@@ -280,12 +739,11 @@ class Reader:
                         raw_value = cursor.get(NumericSerializer.db_value(key))
                         if raw_value is None:
                             raise IndexError
-                        else:
-                            entry = self.connection.model(
-                                **ObjectSerializer.python_value(raw_value))
-                            entry.saved = True
-                            entry.pk = key 
-                    return entry
+                        pk = key
+
+                    self._count_bytes(len(raw_value))
+                    return self._to_model(
+                        pk, ObjectSerializer.python_value(raw_value))
         elif isinstance(key, slice):
             def to_num(v):
                 return 0 if v is None else v
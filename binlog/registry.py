@@ -1,5 +1,6 @@
-from bisect import insort, bisect_left
+from bisect import bisect_left
 from collections import namedtuple
+from contextlib import contextmanager
 from itertools import count, cycle
 import lmdb
 
@@ -32,9 +33,37 @@ class S(namedtuple('Segment', ('L', 'R'))):
         return iter(range(self.R, self.L - 1, -1))
 
 
+class RegistryStats(namedtuple('RegistryStats',
+                               ('segments', 'acked', 'first', 'last'))):
+    """
+    Counters of a committed registry: number of segments, number of
+    acknowledged pks and the lowest and highest acknowledged pk (None if
+    nothing is acknowledged).
+
+    """
+    @classmethod
+    def from_segments(cls, segments):
+        stats = cls(0, 0, None, None)
+        for L, R in segments:
+            stats = stats.merge(L, R)
+        return stats
+
+    def merge(self, L, R, merged=0, overlap=0):
+        """
+        Return the stats after saving the segment (L, R), that merged
+        `merged` segments sharing `overlap` pks with it.
+
+        """
+        return RegistryStats(
+            self.segments + 1 - merged,
+            self.acked + (R - L + 1) - overlap,
+            L if self.first is None else min(self.first, L),
+            R if self.last is None else max(self.last, R))
+
+
 class MemoryCachedDBRegistry(IterSeek):
     def __init__(self, connection, name, direction=Direction.F, inverted=False,
-                 registry=None):
+                 registry=None, walk=False):
 
         self.inverted = inverted
 
@@ -43,10 +72,12 @@ class MemoryCachedDBRegistry(IterSeek):
 
         if self.inverted:
             self.memory = RegistryIterSeek(~registry, direction=direction)
-            self.db = ~DBRegistry(name, connection, direction=direction)
+            self.db = ~DBRegistry(name, connection, direction=direction,
+                                  walk=walk)
         else:
             self.memory = RegistryIterSeek(registry, direction=direction)
-            self.db = DBRegistry(name, connection, direction=direction)
+            self.db = DBRegistry(name, connection, direction=direction,
+                                 walk=walk)
 
         self.seeked = True
         self.direction = direction
@@ -67,6 +98,9 @@ class MemoryCachedDBRegistry(IterSeek):
     def add(self):
         return self.memory.registry.add
 
+    def release(self):
+        self.db.release()
+
     def seek(self, pos):
         self.memory.seek(pos)
         self.db.seek(pos)
@@ -102,7 +136,7 @@ def console(conn, name):
 
 
 class BaseDBRegistry(IterSeek):
-    def __init__(self, name, connection, direction=Direction.F):
+    def __init__(self, name, connection, direction=Direction.F, walk=False):
         self.name = name
         self.conn = connection
         self.direction = direction
@@ -110,16 +144,89 @@ class BaseDBRegistry(IterSeek):
         self._iter = None
 
         self.curr_s = None  # Current segment
+        self._cached_cursor = None
+
+        # A walk keeps its own readers transaction and cursor for all its
+        # lookups until `release()`.
+        self.walk = walk
+        self._walk = None
+
+    def __del__(self):
+        self.release()
+
+    def release(self):
+        """End the readers transaction kept by a walk, if any."""
+        walk, self._walk = self._walk, None
+        if walk is not None:
+            res, proxy = walk
+            proxy.cursor.close()
+            self.conn._end_own_read('readers_env', res)
 
     @MaskException(lmdb.ReadonlyError, ReaderDoesNotExist)
     def __len__(self):
+        return self.conn.registry_stats(self.name).segments
+
+    def _walk_cursor(self):
+        if self._walk is None:
+            conn = self.conn
+            res = conn._begin_own_read('readers_env', conn._open_readers_dbs)
+            try:
+                proxy = conn._registry_proxy(res, self.name)
+            except:
+                conn._end_own_read('readers_env', res)
+                raise
+            self._walk = (res, proxy)
+        return self._walk[1]
+
+    @contextmanager
+    def _cursor(self):
+        """
+        Yield a cursor over the registry database.
+
+        Walks and snapshots keep the cursor of their transaction, so the
+        lookups don't open a new transaction or cursor per segment.
+
+        """
+        if self.conn._readers_read is None and self.walk:
+            yield self._walk_cursor()
+            return
+
         with self.conn.readers(write=False) as res:
-            with RegistryDB.named(self.name).cursor(res) as cursor:
-                found = cursor.first()
-                if not found:
-                    return 0
-                else:
-                    return sum(1 for _ in cursor.iternext())
+            if self.conn._readers_read is None:
+                self._cached_cursor = None
+                proxy = self.conn._registry_proxy(res, self.name)
+                with proxy.cursor:
+                    yield proxy
+                return
+
+            cached = self._cached_cursor
+            if cached is None or cached[0] is not res.txn:
+                cursor = self.conn._registry_proxy(res, self.name)
+                cached = self._cached_cursor = (res.txn, cursor)
+            yield cached[1]
+
+    @staticmethod
+    def _set_range(cursor, pos):
+        """
+        Same as `cursor.set_range(pos)` stepping from the current position
+        when the wanted segment is the next or previous one.
+
+        """
+        raw = cursor.cursor
+        current = bytes(raw.key())
+        if current:
+            target = RegistryDB.K.db_value(pos)
+            # Keys are fixed-width big-endian, bytes order is numeric order.
+            if current < target:
+                if not raw.next():
+                    return False
+                elif bytes(raw.key()) >= target:
+                    return True
+            elif not raw.prev():
+                return raw.first()
+            elif bytes(raw.key()) < target:
+                return raw.next()
+        return cursor.set_range(pos)
 
     def _get_segment_by_pos(self, pos):
         raise NotImplementedError("Must be implemented in subclass.")
@@ -181,48 +288,48 @@ class IDBRegistry(BaseDBRegistry):
         Return the next segment given `pos` and self.direction.
 
         """
-        with self.conn.readers(write=False) as res:
-            with RegistryDB.named(self.name).cursor(res) as cursor:
-                found = cursor.set_range(pos)
-                if not found:
-                    # Past the end of the database
+        with self._cursor() as cursor:
+            found = self._set_range(cursor, pos)
+            if not found:
+                # Past the end of the database
+                if self.direction is Direction.F:
+                    return S(pos, S.MAX)
+                else:
+                    if cursor.last():
+                        end, start = cursor.item()
+                        return S(end + 1, pos)
+                    else:
+                        # Empty
+                        return S(S.MIN, S.MAX)
+            else:
+                end, start = cursor.item()
+                if start <= pos <= end:
+                    # `pos` is in the segment
                     if self.direction is Direction.F:
-                        return S(pos, S.MAX)
+                        if cursor.next():
+                            s2_end, s2_start = cursor.item()
+                            return S(end + 1, s2_start - 1)
+                        else:
+                            return S(end + 1, S.MAX)
                     else:
-                        if cursor.last():
-                            end, start = cursor.item()
-                            return S(end + 1, pos)
+                        if cursor.prev():
+                            s2_end, s2_start = cursor.item()
+                            return S(s2_end + 1, start - 1)
                         else:
-                            # Empty
-                            return S(S.MIN, S.MAX)
+                            return S(S.MIN, start - 1)
                 else:
-                    end, start = cursor.item()
-                    if start <= pos <= end:
-                        # `pos` is in the segment
-                        if self.direction is Direction.F:
-                            if cursor.next():
-                                s2_end, s2_start = cursor.item()
-                                return S(end + 1, s2_start - 1)
-                            else:
-                                return S(end + 1, S.MAX)
-                        else:
-                            if cursor.prev():
-                                s2_end, s2_start = cursor.item()
-                                return S(s2_end + 1, start - 1)
-                            else:
-                                return S(S.MIN, start - 1)
+                    if self.direction is Direction.F:
+                        return S(pos, start - 1)
                     else:
-                        if self.direction is Direction.F:
-                            return S(pos, start - 1)
+                        if cursor.prev():
+                            end, start = cursor.item()
+                            return S(end + 1, pos)
                         else:
-                            if cursor.prev():
-                                end, start = cursor.item()
-                                return S(end + 1, pos)
-                            else:
-                                return S(S.MIN, pos)
+                            return S(S.MIN, pos)
 
     def __invert__(self):
-        return DBRegistry(self.name, self.conn, direction=self.direction)
+        return DBRegistry(self.name, self.conn, direction=self.direction,
+                          walk=self.walk)
 
 
 class DBRegistry(BaseDBRegistry):
@@ -232,39 +339,39 @@ class DBRegistry(BaseDBRegistry):
         Return the next segment given `pos` and self.direction.
 
         """
-        with self.conn.readers(write=False) as res:
-            with RegistryDB.named(self.name).cursor(res) as cursor:
-                found = cursor.set_range(pos)
-                if not found:
-                    # Past the end of the database
-                    if self.direction is Direction.F:
-                        return None
+        with self._cursor() as cursor:
+            found = self._set_range(cursor, pos)
+            if not found:
+                # Past the end of the database
+                if self.direction is Direction.F:
+                    return None
+                else:
+                    if cursor.last():
+                        end, start = cursor.item()
+                        return S(start, end)
                     else:
-                        if cursor.last():
-                            end, start = cursor.item()
-                            return S(start, end)
-                        else:
-                            # Empty
-                            return None
+                        # Empty
+                        return None
+            else:
+                end, start = cursor.item()
+                if start <= pos <= end:
+                    # `pos` is in the segment
+                    return S(start, end)
                 else:
-                    end, start = cursor.item()
-                    if start <= pos <= end:
-                        # `pos` is in the segment
+                    if self.direction is Direction.F:
+                        # Because set_range position the cursor in the next
+                        # segment.
                         return S(start, end)
                     else:
-                        if self.direction is Direction.F:
-                            # Because set_range position the cursor in the next
-                            # segment.
+                        if cursor.prev():
+                            end, start = cursor.item()
                             return S(start, end)
                         else:
-                            if cursor.prev():
-                                end, start = cursor.item()
-                                return S(start, end)
-                            else:
-                                return None
+                            return None
 
     def __invert__(self):
-        return IDBRegistry(self.name, self.conn, direction=self.direction)
+        return IDBRegistry(self.name, self.conn, direction=self.direction,
+                           walk=self.walk)
 
 
 class RegistryIterSeek(IterSeek):
@@ -383,32 +490,30 @@ class Registry:
     def add(self, idx):
         if not isinstance(idx, int):
             raise TypeError("idx must be int")
-        elif not self.acked:
-            self.acked.append(S(idx, idx))
-            return True
-        elif idx in self:
+
+        acked = self.acked
+
+        # Segments before `i` start at or before idx.
+        i = bisect_left(acked, (idx + 1, ))
+        prev = acked[i - 1] if i > 0 else None
+        next_ = acked[i] if i < len(acked) else None
+
+        if prev is not None and prev.R >= idx:
             return False
-        else:
-            for i, segment in enumerate(self.acked):
-                left, right = segment.L, segment.R
 
-                if right == idx - 1:
-                    try:
-                        if self.acked[i + 1].L == idx + 1:
-                            right = self.acked[i + 1].R
-                            del self.acked[i + 1]
-                            self.acked[i] = S(left, right)
-                            return True
-                    except IndexError:
-                        pass
-                    self.acked[i] = S(left, idx)
-                    return True
-                elif left == idx + 1:
-                    self.acked[i] = S(idx, right)
-                    return True
-            else:
-                insort(self.acked, S(idx, idx))
-                return True
+        joins_prev = prev is not None and prev.R == idx - 1
+        joins_next = next_ is not None and next_.L == idx + 1
+
+        if joins_prev and joins_next:
+            acked[i - 1] = S(prev.L, next_.R)
+            del acked[i]
+        elif joins_prev:
+            acked[i - 1] = S(prev.L, idx)
+        elif joins_next:
+            acked[i] = S(idx, next_.R)
+        else:
+            acked.insert(i, S(idx, idx))
+        return True
 
     def __repr__(self):  # pragma: no cover
         return repr(self.acked)
@@ -0,0 +1,287 @@
+"""
+Log shipping between binlogs.
+
+A `Shipper` tails the entries and the reader registries of a primary
+binlog and writes the changes as framed batches to a binary file object
+(a pipe, or a socket through `socket.makefile()`). A `Follower` reads
+the batches and applies them to its own binlog, keeping the pks of the
+primary so the registries remain valid.
+
+Removed and purged entries are not shipped; the follower keeps them.
+
+Usage::
+
+    python -m binlog.replication ship mymodule:MyModel /primary \\
+        | python -m binlog.replication follow mymodule:MyModel /replica
+
+"""
+from importlib import import_module
+import argparse
+import socket
+import sys
+import time
+
+import lmdb
+
+from .databases import Entries
+from .exceptions import FrameError
+from .frames import ENTRY, REGISTRY, UNREGISTER, BATCH
+from .frames import read_frame, read_magic, write_frame, write_magic
+from .registry import Registry, S
+from .serializer import ObjectSerializer
+
+
+class Shipper:
+    def __init__(self, connection, fileobj, start=None, batch_size=1000):
+        self.connection = connection
+        self.fileobj = fileobj
+        self.position = 0 if start is None else start
+        self.batch_size = batch_size
+
+        # `RegistryStats` of the readers shipped, and the readers
+        # generation they were read at.
+        self.registries = {}
+        self.generation = None
+        self.started = False
+
+    def _read_entries(self):
+        entries = []
+        try:
+            with self.connection.data(write=False) as res:
+                with res.txn.cursor(res.db['entries']) as cursor:
+                    found = cursor.set_range(
+                        Entries.K.db_value(self.position))
+                    if found:
+                        for raw_key, raw_value in cursor.iternext():
+                            entries.append(
+                                (Entries.K.python_value(raw_key),
+                                 bytes(raw_value)))
+                            if len(entries) >= self.batch_size:
+                                break
+        except lmdb.ReadonlyError:
+            pass
+        return entries
+
+    def _read_registries(self):
+        """
+        Return the readers generation, the `RegistryStats` of every reader
+        and the segments of the registries changed since the previous batch.
+
+        Registries only grow, so one is unchanged if its counters are. A new
+        readers generation (readers registered, cloned or unregistered) can
+        reuse a name, then every registry is read again.
+
+        """
+        conn = self.connection
+        registries = {}
+        changed = {}
+        with conn.readers(write=False) as res:
+            generation = conn._readers_generation(res)
+            for name in conn.list_readers():
+                stats = registries[name] = conn._registry_stats(res, name)
+                if (generation == self.generation
+                        and self.registries.get(name) == stats):
+                    continue
+                with conn._registry(res, name) as cursor:
+                    changed[name] = tuple((L, R)
+                                          for R, L in cursor.iternext())
+        return generation, registries, changed
+
+    def ship(self):
+        """
+        Write a batch with the changes since the previous one.
+
+        Return the number of changes shipped.
+
+        """
+        with self.connection.snapshot(warn_after=None):
+            entries = self._read_entries()
+            generation, registries, changed = self._read_registries()
+
+        changed = sorted(changed.items())
+        removed = sorted(set(self.registries) - set(registries))
+
+        if not (entries or changed or removed):
+            return 0
+
+        if not self.started:
+            write_magic(self.fileobj)
+            self.started = True
+
+        for pk, payload in entries:
+            write_frame(self.fileobj, ENTRY, pk, payload)
+        for item in changed:
+            write_frame(self.fileobj,
+                        REGISTRY,
+                        0,
+                        ObjectSerializer.db_value(item))
+        for name in removed:
+            write_frame(self.fileobj, UNREGISTER, 0, name.encode('utf-8'))
+
+        if entries:
+            self.position = entries[-1][0] + 1
+        write_frame(self.fileobj, BATCH, self.position)
+        self.fileobj.flush()
+
+        self.registries = registries
+        self.generation = generation
+        return len(entries) + len(changed) + len(removed)
+
+    def run(self, idle_timeout=None, poll=1):
+        """
+        Ship batches as soon as entries are created.
+
+        Registry changes do not ring the doorbell, they are checked every
+        `poll` seconds. Return after `idle_timeout` seconds without changes.
+
+        """
+        with self.connection.doorbell() as doorbell:
+            idle_since = time.monotonic()
+            while True:
+                if self.ship():
+                    idle_since = time.monotonic()
+                elif (idle_timeout is not None
+                      and time.monotonic() - idle_since >= idle_timeout):
+                    break
+                else:
+                    doorbell.wait(poll)
+
+
+class Follower:
+    def __init__(self, connection, fileobj):
+        self.connection = connection
+        self.fileobj = fileobj
+        self.started = False
+
+    def apply(self):
+        """
+        Apply the next batch to the connection.
+
+        Entries already present are skipped, so a shipper can restart from
+        an earlier position. Return False at the end of the stream.
+
+        """
+        if not self.started:
+            if not read_magic(self.fileobj):
+                return False
+            self.started = True
+
+        entries = []
+        registries = []
+        removed = []
+        while True:
+            frame = read_frame(self.fileobj)
+            if frame is None:
+                if entries or registries or removed:
+                    raise FrameError("Truncated batch.")
+                return False
+
+            kind, key, payload = frame
+            if kind == ENTRY:
+                entries.append((key, payload))
+            elif kind == REGISTRY:
+                registries.append(ObjectSerializer.python_value(payload))
+            elif kind == UNREGISTER:
+                removed.append(payload.decode('utf-8'))
+            elif kind == BATCH:
+                break
+            else:
+                raise FrameError("Unexpected frame %r" % kind)
+
+        conn = self.connection
+        with conn.data(write=True) as res:
+            next_idx = conn._get_next_event_idx(res)
+            added = conn._append_raw(
+                res, ((pk, v) for pk, v in entries if pk >= next_idx))
+        if added:
+            conn._ring()
+
+        # A shipped registry replaces the local one: the reader may have
+        # been unregistered and registered again since the previous batch.
+        with conn.readers(write=True):
+            for name, segments in registries:
+                if name in conn.list_readers():
+                    conn.unregister_reader(name)
+                conn.register_reader(name)
+                conn.save_registry(name,
+                                   Registry([S(L, R) for L, R in segments]))
+
+            readers = conn.list_readers()
+            for name in removed:
+                if name in readers:
+                    conn.unregister_reader(name)
+
+        return True
+
+    def run(self):
+        """Apply batches until the end of the stream."""
+        while self.apply():
+            pass
+
+
+def load_model(path):
+    module_name, _, class_name = path.partition(':')
+    return getattr(import_module(module_name), class_name)
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(':')
+    return host or 'localhost', int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m binlog.replication')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    ship = commands.add_parser('ship', help="Ship a binlog to stdout.")
+    ship.add_argument('--start', type=int, default=None)
+    ship.add_argument('--batch-size', type=int, default=1000)
+    ship.add_argument('--idle-timeout', type=float, default=None)
+    ship.add_argument('--connect', metavar='HOST:PORT', default=None)
+
+    follow = commands.add_parser('follow', help="Apply batches from stdin.")
+    follow.add_argument('--listen', metavar='HOST:PORT', default=None)
+
+    for command in (ship, follow):
+        command.add_argument('model', help="module:Model")
+        command.add_argument('path')
+
+    args = parser.parse_args(argv)
+    model = load_model(args.model)
+
+    sock = None
+    if args.command == 'ship':
+        if args.connect is not None:
+            sock = socket.create_connection(parse_address(args.connect))
+            fileobj = sock.makefile('wb')
+        else:
+            fileobj = sys.stdout.buffer
+
+        with model.open(args.path) as db:
+            shipper = Shipper(db, fileobj,
+                              start=args.start,
+                              batch_size=args.batch_size)
+            shipper.run(idle_timeout=args.idle_timeout)
+    else:
+        if args.listen is not None:
+            server = socket.socket()
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind(parse_address(args.listen))
+            server.listen(1)
+            sock, _ = server.accept()
+            server.close()
+            fileobj = sock.makefile('rb')
+        else:
+            fileobj = sys.stdin.buffer
+
+        with model.open(args.path) as db:
+            Follower(db, fileobj).run()
+
+    if sock is not None:
+        fileobj.close()
+        sock.close()
+
+
+if __name__ == '__main__':
+    main()
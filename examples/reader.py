@@ -1,33 +1,13 @@
-from itertools import cycle
-import atexit
-import os
-import signal
-import time
+from binlog.model import Model
 
-from binlog.reader import TDSReader
+with Model.open('test') as db:
+    db.register_reader('example')
 
-r = TDSReader('test', checkpoint='status')
+    with db.reader('example') as reader:
+        # Block until new entries are available instead of polling.
+        for n, entry in enumerate(reader.follow(), 1):
+            print('.', end='', flush=True)
+            reader.ack(entry)  # Acknowledge the reception of the entry.
 
-def save_status():
-    """
-    Save a checkpoint with the current status.
-    
-    Only the acknowledged entries will be included in the checkpoint.
-
-    """
-    r.save()
-
-    
-atexit.register(save_status)
-
-for i in cycle(range(1, 20001)):
-    if i == 20000:  # Make a checkpoint each 20k reads.
-        save_status()
-
-    n = r.next_record()  # Read the next log entry.
-
-    if n is None:
-        time.sleep(1)
-    else:
-        print('.', end='', flush=True)
-        r.ack(n)  # Acknowledge the reception of the entry.
+            if n % 20000 == 0:  # Make a checkpoint each 20k reads.
+                reader.commit()
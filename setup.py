@@ -27,4 +27,7 @@ setup(name='binlog',
       zip_safe=False,
       install_requires=[
           'lmdb==0.92'
-      ])
+      ],
+      extras_require={
+          'numpy': ['numpy']
+      })
@@ -1,12 +1,18 @@
 from bisect import bisect_left, bisect_right
 from collections import deque
 from contextlib import contextmanager
+import sys
 import tempfile
 
 import lmdb
 import pytest
 
 
+# binlog.aio requires Python 3.7 or newer.
+collect_ignore = []
+if sys.version_info < (3, 7):
+    collect_ignore.append('test_70_aio.py')
+
 
 @pytest.fixture
 def testenv():
@@ -0,0 +1,95 @@
+import os
+
+
+def test_ring_without_listeners(tmpdir):
+    from binlog.notify import ring
+
+    assert ring(str(tmpdir.join('doorbell'))) == 0
+
+
+def test_doorbell_wait_timeout(tmpdir):
+    from binlog.notify import Doorbell
+
+    with Doorbell(str(tmpdir)) as doorbell:
+        assert not doorbell.wait(0)
+
+
+def test_ring_wakes_up_listener(tmpdir):
+    from binlog.notify import Doorbell, ring
+
+    with Doorbell(str(tmpdir)) as doorbell:
+        assert ring(str(tmpdir)) == 1
+        assert doorbell.wait(0)
+        assert not doorbell.wait(0)
+
+
+def test_ring_wakes_up_every_listener(tmpdir):
+    from binlog.notify import Doorbell, ring
+
+    with Doorbell(str(tmpdir)) as d1, Doorbell(str(tmpdir)) as d2:
+        assert ring(str(tmpdir)) == 2
+        assert d1.wait(0)
+        assert d2.wait(0)
+
+
+def test_doorbell_close_removes_pipe(tmpdir):
+    from binlog.notify import Doorbell
+
+    with Doorbell(str(tmpdir)) as doorbell:
+        path = doorbell.path
+        assert os.path.exists(path)
+
+    assert doorbell.closed
+    assert not os.path.exists(path)
+
+
+def test_ring_removes_abandoned_pipes(tmpdir):
+    from binlog.notify import ring
+
+    path = str(tmpdir.join('1234-dead'))
+    os.mkfifo(path)
+
+    assert ring(str(tmpdir)) == 0
+    assert not os.path.exists(path)
+
+
+def test_ring_skips_listeners_not_waiting(tmpdir):
+    from binlog.notify import Doorbell, ring
+
+    with Doorbell(str(tmpdir)) as doorbell:
+        assert ring(str(tmpdir)) == 1
+        # Not waiting since the first notification.
+        assert ring(str(tmpdir)) == 0
+
+        assert doorbell.wait(0)
+        assert ring(str(tmpdir)) == 1
+        assert doorbell.wait(0)
+
+
+def test_doorbell_removes_abandoned_idle_pipes(tmpdir):
+    from binlog.notify import Doorbell
+
+    path = str(tmpdir.join('1234-dead.idle'))
+    os.mkfifo(path)
+
+    with Doorbell(str(tmpdir)):
+        assert not os.path.exists(path)
+
+
+def test_ring_caches_the_listing(tmpdir, monkeypatch):
+    from binlog import notify
+
+    directory = str(tmpdir)
+    os.utime(directory, (0, 0))
+    listed = []
+    listdir = os.listdir
+    monkeypatch.setattr(os, 'listdir',
+                        lambda path: listed.append(path) or listdir(path))
+
+    for _ in range(3):
+        assert notify.ring(directory) == 0
+    assert listed == [directory]
+
+    with notify.Doorbell(directory) as doorbell:
+        assert notify.ring(directory) == 1
+        assert doorbell.wait(0)
@@ -125,6 +125,27 @@ def test_registry_is_always_sorted(data):
     assert list(r.acked) == sorted(r.acked)  # sorted always returns list
 
 
+@given(data=st.lists(st.integers(min_value=0, max_value=100)))
+def test_registry_add_merges_neighbors(data):
+    from binlog.registry import Registry
+
+    r = Registry()
+
+    added = set()
+    for i in data:
+        assert r.add(i) == (i not in added)
+        added.add(i)
+
+    expected = []
+    for i in sorted(added):
+        if expected and expected[-1][1] == i - 1:
+            expected[-1] = (expected[-1][0], i)
+        else:
+            expected.append((i, i))
+
+    assert r.acked == expected
+
+
 @given(data=st.lists(st.integers(min_value=0, max_value=100)),
        point=st.integers(min_value=0, max_value=100))
 def test_registry_contains(data, point):
@@ -11,7 +11,9 @@ from binlog.exceptions import BadUsageError
 
 io_methods = ["data", "readers", "create", "bulk_create", "reader",
               "register_reader", "unregister_reader", "save_registry", "list_readers",
-              "remove", "purge"]
+              "remove", "purge", "doorbell", "claim", "leases",
+              "watermark", "snapshot", "time_range", "export",
+              "import_", "compact_online"]
 
 def test_model_open_returns_connection(tmpdir):
     from binlog.connection import Connection
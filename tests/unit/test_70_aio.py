@@ -0,0 +1,175 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from binlog.model import Model
+
+
+@pytest.fixture
+def run():
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+def test_async_create(tmpdir, run):
+    from binlog.aio import AsyncConnection
+
+    async def main():
+        async with await AsyncConnection.open(Model, str(tmpdir)) as db:
+            entry = await db.create(idx=0)
+            assert entry.saved
+            assert entry.pk == 0
+
+    run(main())
+
+
+def test_async_concurrent_creates_keep_order(tmpdir, run):
+    from binlog.aio import AsyncConnection
+
+    async def main():
+        async with await AsyncConnection.open(Model, str(tmpdir)) as db:
+            entries = await asyncio.gather(
+                *[db.create(idx=i) for i in range(100)])
+            assert [e.pk for e in entries] == list(range(100))
+            assert [e['idx'] for e in entries] == list(range(100))
+
+    run(main())
+
+    with Model.open(tmpdir) as db:
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader] == list(range(100))
+
+
+def test_async_create_runs_outside_the_event_loop_thread(tmpdir, run):
+    from binlog.aio import AsyncConnection
+
+    async def main():
+        async with await AsyncConnection.open(Model, str(tmpdir)) as db:
+            tid = await db.run(lambda conn: threading.current_thread())
+            assert tid is not threading.current_thread()
+
+    run(main())
+
+
+def test_async_errors_are_propagated(tmpdir, run):
+    from binlog.aio import AsyncConnection
+    from binlog.exceptions import ReaderDoesNotExist
+
+    async def main():
+        async with await AsyncConnection.open(Model, str(tmpdir)) as db:
+            with pytest.raises(ReaderDoesNotExist):
+                await db.reader('nonexistingreader')
+
+    run(main())
+
+
+def test_async_reader_follow_ack_and_commit(tmpdir, run):
+    from binlog.aio import AsyncConnection
+
+    async def main():
+        async with await AsyncConnection.open(Model, str(tmpdir)) as db:
+            await db.bulk_create([Model(idx=i) for i in range(10)])
+            await db.register_reader('myreader')
+
+            async with await db.reader('myreader') as reader:
+                async for entry in reader.follow(timeout=0):
+                    if entry['idx'] < 5:
+                        assert await reader.ack(entry)
+                await reader.commit()
+
+    run(main())
+
+    with Model.open(tmpdir) as db:
+        with db.reader('myreader') as reader:
+            assert [e['idx'] for e in reader] == list(range(5, 10))
+
+
+def test_async_follow_wakes_up_on_create(tmpdir, run):
+    from binlog.aio import AsyncConnection
+
+    async def main():
+        async with await AsyncConnection.open(Model, str(tmpdir)) as db:
+            await db.register_reader('myreader')
+            reader = await db.reader('myreader')
+
+            async def consume():
+                received = []
+                async for entry in reader.follow(timeout=5):
+                    received.append(entry['idx'])
+                    if len(received) == 3:
+                        return received
+
+            consumer = asyncio.ensure_future(consume())
+            for i in range(3):
+                await asyncio.sleep(0.05)
+                await db.create(idx=i)
+
+            assert await consumer == [0, 1, 2]
+
+    run(main())
+
+
+def test_async_and_sync_connections_to_the_same_binlog(tmpdir, run):
+    from binlog.aio import AsyncConnection
+
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+
+        async def main():
+            async with await AsyncConnection.open(Model, tmpdir) as adb:
+                entry = await adb.create(idx=1)
+                assert await adb.list_readers() == []
+                return entry
+
+        entry = run(main())
+        assert entry.pk == 1
+
+        db.create(idx=2)
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader] == [0, 1, 2]
+
+
+def test_async_invalid_create_fails_alone(tmpdir, run):
+    from binlog.aio import AsyncConnection
+    from binlog.index import NumericIndex
+
+    class IndexedModel(Model):
+        idx = NumericIndex(mandatory=True)
+
+    async def main():
+        async with await AsyncConnection.open(IndexedModel,
+                                              str(tmpdir)) as db:
+            results = await asyncio.gather(db.create(idx=0),
+                                           db.create(other=1),
+                                           db.create(idx=2),
+                                           return_exceptions=True)
+            assert isinstance(results[1], ValueError)
+            return [e['idx'] for e in (results[0], results[2])]
+
+    assert run(main()) == [0, 2]
+
+    with IndexedModel.open(tmpdir) as db:
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader] == [0, 2]
+
+
+def test_async_follow_stopped_early_releases_the_doorbell(tmpdir, run):
+    from binlog.aio import AsyncConnection
+
+    async def main():
+        async with await AsyncConnection.open(Model, str(tmpdir)) as db:
+            await db.bulk_create([Model(idx=i) for i in range(10)])
+            reader = await db.reader()
+
+            async with reader.follow(timeout=5) as follower:
+                async for entry in follower:
+                    break
+            assert follower.doorbell.closed
+
+            directory = db.connection._gen_path('doorbell_directory')
+            assert os.listdir(directory) == []
+
+    run(main())
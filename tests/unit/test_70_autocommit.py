@@ -0,0 +1,119 @@
+from unittest.mock import patch
+
+import pytest
+
+from binlog.model import Model
+from binlog.reader import AutoCommit, flush_autocommit_readers
+
+
+def test_autocommit_needs_a_threshold():
+    with pytest.raises(ValueError):
+        AutoCommit()
+
+    with pytest.raises(ValueError):
+        AutoCommit(acks=0)
+
+
+def test_autocommit_every_n_acks(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+
+        reader = db.reader('myreader', autocommit_acks=3)
+        reader.ack(0)
+        reader.ack(1)
+        assert db.reader('myreader').registry.acked == []
+
+        reader.ack(2)
+        assert [e.pk for e in db.reader('myreader')] == list(range(3, 10))
+        assert reader.autocommit.pending_acks == 0
+
+
+def test_autocommit_after_some_seconds(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+
+        with patch('binlog.reader.time.monotonic', return_value=100):
+            reader = db.reader('myreader', autocommit_seconds=5)
+            reader.ack(0)
+        assert [e.pk for e in db.reader('myreader')] == list(range(10))
+
+        with patch('binlog.reader.time.monotonic', return_value=105):
+            reader.ack(1)
+        assert [e.pk for e in db.reader('myreader')] == list(range(2, 10))
+
+
+def test_autocommit_after_some_bytes(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+
+        reader = db.reader('myreader', autocommit_bytes=1)
+
+        # Nothing was read yet.
+        reader.ack(0)
+        assert [e.pk for e in db.reader('myreader')] == list(range(10))
+
+        it = iter(reader)
+        entry = next(it)
+        it.close()
+        reader.ack(entry)
+        assert [e.pk for e in db.reader('myreader')] == list(range(2, 10))
+
+
+@pytest.mark.parametrize('read', [
+    lambda reader: reader[-1],
+    lambda reader: next(reader.prefetch(batch_size=1)),
+])
+def test_every_read_counts_bytes(tmpdir, read):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+
+        reader = db.reader('myreader', autocommit_bytes=1)
+        read(reader)
+        assert reader.autocommit.pending_bytes > 0
+        reader.ack(0)
+        assert [e.pk for e in db.reader('myreader')] == list(range(1, 10))
+
+
+def test_autocommit_on_anonymous_reader_fails(tmpdir):
+    with Model.open(tmpdir) as db:
+        with pytest.raises(RuntimeError):
+            db.reader(autocommit_acks=1)
+
+
+def test_follow_flushes_when_caught_up(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(5)])
+        db.register_reader('myreader')
+
+        reader = db.reader('myreader', autocommit_acks=100)
+        for entry in reader.follow(timeout=0):
+            reader.ack(entry)
+
+        assert list(db.reader('myreader')) == []
+
+
+def test_pending_acks_are_flushed_at_exit(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(5)])
+        db.register_reader('myreader')
+
+        reader = db.reader('myreader', autocommit_acks=100)
+        reader.ack(0)
+
+        flush_autocommit_readers()
+
+        assert [e.pk for e in db.reader('myreader')] == list(range(1, 5))
+        assert not reader.flush()
+
+
+def test_closed_readers_are_not_flushed(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        reader = db.reader('myreader', autocommit_acks=100)
+        reader.close()
+
+    assert not reader.flush()
@@ -0,0 +1,101 @@
+import json
+import os
+
+from binlog.backup import backup, restore
+from binlog.index import TextIndex
+from binlog.model import Model
+
+
+class IndexedModel(Model):
+    name = TextIndex(mandatory=False)
+
+
+def test_first_backup_is_a_base_copy(tmpdir):
+    backups = str(tmpdir.join('backups'))
+    with Model.open(str(tmpdir.mkdir('db'))) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+
+        assert backup(db, backups) == 'base'
+
+    with open(os.path.join(backups, 'manifest.json')) as fileobj:
+        manifest = json.load(fileobj)
+    assert manifest == {'base': 'base',
+                        'deltas': [],
+                        'position': 10,
+                        'readers': ['myreader']}
+
+
+def test_deltas_contain_only_new_entries(tmpdir):
+    backups = str(tmpdir.join('backups'))
+    with Model.open(str(tmpdir.mkdir('db'))) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        backup(db, backups)
+
+        db.bulk_create([Model(idx=i) for i in range(10, 15)])
+        assert backup(db, backups) == 'delta-000001.bin'
+        assert backup(db, backups) == 'delta-000002.bin'
+
+    with open(os.path.join(backups, 'manifest.json')) as fileobj:
+        manifest = json.load(fileobj)
+    assert manifest['deltas'] == [
+        {'name': 'delta-000001.bin', 'start': 10, 'stop': 15},
+        {'name': 'delta-000002.bin', 'start': 15, 'stop': 15}]
+    assert manifest['position'] == 15
+
+
+def test_restore(tmpdir):
+    backups = str(tmpdir.join('backups'))
+    with IndexedModel.open(str(tmpdir.mkdir('db'))) as db:
+        db.bulk_create([IndexedModel(name=str(i % 2)) for i in range(10)])
+        db.register_reader('myreader')
+        db.register_reader('removed')
+        backup(db, backups)
+
+        db.bulk_create([IndexedModel(name=str(i % 2)) for i in range(10, 15)])
+        with db.reader('myreader') as reader:
+            for i in range(12):
+                reader.ack(i)
+        backup(db, backups)
+
+        db.unregister_reader('removed')
+        db.create(name='x')
+        backup(db, backups)
+
+        entries = list(db.reader())
+        pending = list(db.reader('myreader'))
+
+    restored = str(tmpdir.join('restored'))
+    restore(IndexedModel, backups, restored)
+
+    with IndexedModel.open(restored) as db:
+        assert list(db.reader()) == entries
+        assert db.list_readers() == ['myreader']
+        assert list(db.reader('myreader')) == pending
+        assert [e.pk for e in db.reader().filter(name='x')] == [15]
+        assert db.create(name='y').pk == 16
+
+
+def test_restore_reregistered_reader(tmpdir):
+    backups = str(tmpdir.join('backups'))
+    with Model.open(str(tmpdir.mkdir('db'))) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            for i in range(5):
+                reader.ack(i)
+        backup(db, backups)
+
+        db.unregister_reader('myreader')
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            reader.ack(7)
+        backup(db, backups)
+
+        pending = [e.pk for e in db.reader('myreader')]
+
+    restored = str(tmpdir.join('restored'))
+    restore(Model, backups, restored)
+
+    with Model.open(restored) as db:
+        assert [e.pk for e in db.reader('myreader')] == pending
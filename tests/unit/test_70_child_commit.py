@@ -0,0 +1,88 @@
+from unittest.mock import patch
+
+import pytest
+
+from binlog.connection import Connection
+from binlog.model import Model
+
+
+NAMES = ['a', 'a.b', 'a.b.c', 'a.b.c.d']
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    calls = []
+    original = Connection._begin_write
+
+    def _begin_write(self, env_attr, open_dbs):
+        calls.append(env_attr)
+        return original(self, env_attr, open_dbs)
+
+    monkeypatch.setattr(Connection, '_begin_write', _begin_write)
+    return calls
+
+
+def test_ancestors_are_committed_in_one_transaction(tmpdir, writes):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        for name in NAMES:
+            db.register_reader(name)
+
+        reader = db.reader('a.b.c.d')
+        for pk in (0, 1, 5):
+            reader.recursive_ack(pk)
+
+        del writes[:]
+        reader.commit()
+        assert writes == ['readers_env']
+
+        for name in NAMES:
+            assert db.registry_stats(name) == (2, 3, 0, 5)
+            assert db.reader(name).registry.acked == []
+
+
+def test_ancestors_without_acks_are_skipped(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('a.b.c')
+
+        saved = []
+        save_registry = Connection.save_registry
+
+        def spy(self, name, added):
+            saved.append(name)
+            return save_registry(self, name, added)
+
+        with patch.object(Connection, 'save_registry', spy):
+            with db.reader('a.b.c') as reader:
+                reader.ack(0)
+                reader.parent.ack(1)
+
+        assert saved == ['a.b.c', 'a.b']
+        assert db.registry_stats('a').acked == 0
+
+
+def test_failed_commit_saves_no_level(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('a.b')
+
+        save_registry = Connection.save_registry
+
+        def failing(self, name, added):
+            if name == 'a':
+                raise RuntimeError("boom")
+            return save_registry(self, name, added)
+
+        reader = db.reader('a.b')
+        reader.recursive_ack(3)
+        with patch.object(Connection, 'save_registry', failing):
+            with pytest.raises(RuntimeError):
+                reader.commit()
+
+        assert db.registry_stats('a.b').acked == 0
+        assert reader.registry.acked == [(3, 3)]
+
+        reader.commit()
+        assert db.registry_stats('a.b').acked == 1
+        assert db.registry_stats('a').acked == 1
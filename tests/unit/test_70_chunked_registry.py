@@ -0,0 +1,107 @@
+from hypothesis import given, settings
+from hypothesis import strategies as st
+import pytest
+
+from binlog.chunked import decode_chunk, encode_chunk
+from binlog.model import Model
+from binlog.registry import Registry, S
+
+
+class ChunkedModel(Model):
+    __meta_registry_chunk_size__ = 3
+
+
+def segments_of(pks):
+    registry = Registry()
+    for pk in sorted(pks):
+        registry.add(pk)
+    return [tuple(s) for s in registry.acked]
+
+
+def raw_records(db, name):
+    with db.readers(write=False) as res:
+        with res.txn.cursor(res.db[name]) as cursor:
+            return [(bytes(k), bytes(v)) for k, v in cursor.iternext()]
+
+
+@given(pks=st.sets(st.integers(min_value=0, max_value=2**64 - 1)))
+def test_encode_decode_chunk(pks):
+    segments = segments_of(pks)
+    assert decode_chunk(encode_chunk(segments)) == segments
+
+
+@settings(max_examples=50, deadline=None)
+@given(commits=st.lists(st.sets(st.integers(min_value=0, max_value=60)),
+                        max_size=6))
+def test_chunked_registry_behaves_like_records(tmpdir_factory, commits):
+    path = tmpdir_factory.mktemp('chunked')
+    with ChunkedModel.open(path) as db:
+        db.bulk_create([ChunkedModel(idx=i) for i in range(62)])
+        db.register_reader('myreader')
+
+        acked = set()
+        with db.reader('myreader') as reader:
+            for pks in commits:
+                for pk in pks:
+                    reader.ack(pk)
+                reader.commit()
+                acked |= pks
+
+        pending = [pk for pk in range(62) if pk not in acked]
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reader] == pending
+            for pk in range(62):
+                assert (pk in reader.registry) == (pk in acked)
+
+        stats = db.registry_stats('myreader')
+        assert stats.acked == len(acked)
+        assert stats.segments == len(segments_of(acked))
+
+        # Chunks hold up to 3 segments.
+        records = raw_records(db, 'myreader')
+        assert len(records) >= -(-stats.segments // 3)
+        assert sum(len(decode_chunk(v)) for _, v in records) \
+            == stats.segments
+
+
+def test_chunked_registry_clone_and_prefetch(tmpdir):
+    with ChunkedModel.open(tmpdir) as db:
+        db.bulk_create([ChunkedModel(idx=i) for i in range(30)])
+        db.register_reader('src')
+        with db.reader('src') as reader:
+            for pk in range(0, 30, 2):
+                reader.ack(pk)
+
+        db.clone_reader('src', 'dst')
+        with db.reader('dst') as reader:
+            assert [e.pk for e in reader.prefetch(batch_size=4)] \
+                == list(range(1, 30, 2))
+
+        assert db.registry_stats('dst') == db.registry_stats('src')
+
+
+def test_chunked_registry_claim(tmpdir):
+    with ChunkedModel.open(tmpdir) as db:
+        db.bulk_create([ChunkedModel(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            for pk in (0, 1, 3):
+                reader.ack(pk)
+
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reader.claim(size=2)] == [2, 4]
+
+
+def test_chunked_registry_numpy(tmpdir):
+    pytest.importorskip('numpy')
+    from binlog.npregistry import NumpyRegistry
+
+    with ChunkedModel.open(tmpdir) as db:
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            for pk in (0, 1, 3, 7, 9, 11, 20):
+                reader.ack(pk)
+
+        registry = NumpyRegistry.from_db(db, 'myreader')
+        assert registry.acked == [S(0, 1), S(3, 3), S(7, 7), S(9, 9),
+                                  S(11, 11), S(20, 20)]
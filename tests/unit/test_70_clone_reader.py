@@ -0,0 +1,199 @@
+from hypothesis import given, settings
+from hypothesis import strategies as st
+import pytest
+
+from binlog.databases import Clones
+from binlog.model import Model
+
+
+class TableModel(Model):
+    __meta_registry_layout__ = 'table'
+
+
+class ChunkedModel(Model):
+    __meta_registry_chunk_size__ = 2
+
+
+MODELS = [Model, TableModel, ChunkedModel]
+
+
+def own_segments(db, name):
+    with db.readers(write=False) as res:
+        with db._registry(res, name, layers=[name]) as cursor:
+            return list(cursor.iternext())
+
+
+def pending_clones(db):
+    with db.readers(write=False) as res:
+        if res.txn.get(b'.clones') is None:
+            return {}
+        with Clones.cursor(res) as cursor:
+            return dict(cursor.iternext())
+
+
+def layers(db, name):
+    with db.readers(write=False) as res:
+        return db._registry_layers(res, name)
+
+
+def pending(db, name):
+    with db.reader(name) as reader:
+        return [e.pk for e in reader]
+
+
+@pytest.fixture(params=MODELS)
+def db(request, tmpdir):
+    model = request.param
+    with model.open(tmpdir) as db:
+        db.bulk_create([model(idx=i) for i in range(20)])
+        db.register_reader('src')
+        reader = db.reader('src')
+        for pk in range(0, 20, 2):
+            reader.ack(pk)
+        reader.commit()
+        yield db
+
+
+def test_clone_does_not_copy_the_registry(db):
+    db.clone_reader('src', 'dst')
+
+    assert own_segments(db, 'dst') == []
+    assert pending_clones(db) == {'dst': 'src'}
+    assert db.registry_stats('dst') == db.registry_stats('src')
+    assert db.watermark('dst') == db.watermark('src') == 1
+
+    reader = db.reader('dst')
+    assert [e.pk for e in reader] == list(range(1, 20, 2))
+    assert 4 in reader.registry
+
+
+@pytest.mark.parametrize('committer', ['src', 'dst'])
+def test_commits_do_not_copy_the_registry(db, committer):
+    frozen = own_segments(db, 'src')
+    db.clone_reader('src', 'dst')
+    assert layers(db, 'src') == ['.delta.src', 'src']
+    assert layers(db, 'dst') == ['dst', 'src']
+
+    with db.reader(committer) as reader:
+        reader.ack(1)
+
+    assert pending_clones(db) == {'dst': 'src'}
+    assert own_segments(db, 'src') == frozen
+    assert own_segments(db, layers(db, committer)[0]) == [(1, 1)]
+
+    other = 'dst' if committer == 'src' else 'src'
+    assert pending(db, committer) == list(range(3, 20, 2))
+    assert pending(db, other) == list(range(1, 20, 2))
+    assert db.registry_stats(committer).segments == 9
+    assert db.registry_stats(committer).acked == 11
+    assert db.registry_stats(other).segments == 10
+    assert db.watermark(committer) == 3
+
+
+def test_clone_of_a_clone(db):
+    db.clone_reader('src', 'dst')
+    db.clone_reader('dst', 'dst2')
+    assert pending_clones(db) == {'dst': 'src', 'dst2': 'src'}
+
+    with db.reader('src') as reader:
+        reader.ack(1)
+    with db.reader('dst') as reader:
+        reader.ack(3)
+
+    assert pending(db, 'dst2') == list(range(1, 20, 2))
+
+    # Only the acks saved on top of the frozen registry are copied.
+    db.clone_reader('dst', 'dst3')
+    db.clone_reader('src', 'dst4')
+    assert own_segments(db, 'dst3') == [(3, 3)]
+    assert own_segments(db, 'dst4') == [(1, 1)]
+    assert pending(db, 'dst3') == [1] + list(range(5, 20, 2))
+    assert pending(db, 'dst4') == list(range(3, 20, 2))
+
+
+def test_unregister_the_source_of_a_clone(db):
+    db.clone_reader('src', 'dst')
+    db.unregister_reader('src')
+
+    assert pending_clones(db) == {}
+    assert pending(db, 'dst') == list(range(1, 20, 2))
+
+
+def test_unregister_a_clone(db):
+    db.clone_reader('src', 'dst')
+    with db.reader('src') as reader:
+        reader.ack(1)
+    db.unregister_reader('dst')
+
+    # The source saves its acks in its own registry again.
+    assert pending_clones(db) == {}
+    assert layers(db, 'src') == ['src']
+    assert db.list_readers() == ['src']
+    assert pending(db, 'src') == list(range(3, 20, 2))
+    assert len(own_segments(db, 'src')) == db.registry_stats('src').segments
+
+
+def test_compact_clones(db):
+    assert db.compact_clones() == 0
+
+    db.clone_reader('src', 'dst1')
+    db.clone_reader('src', 'dst2')
+    with db.reader('src') as reader:
+        reader.ack(1)
+    with db.reader('dst1') as reader:
+        reader.ack(19)
+    assert db.compact_clones() == 2
+
+    assert pending_clones(db) == {}
+    for name in ('src', 'dst1', 'dst2'):
+        assert layers(db, name) == [name]
+        stats = db.registry_stats(name)
+        assert len(own_segments(db, name)) == stats.segments
+    assert pending(db, 'src') == list(range(3, 20, 2))
+    assert pending(db, 'dst1') == list(range(1, 19, 2))
+    assert pending(db, 'dst2') == list(range(1, 20, 2))
+
+
+def test_readonly_connection_reads_a_clone(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(5)])
+        db.register_reader('src')
+        with db.reader('src') as reader:
+            reader.ack(0)
+        db.clone_reader('src', 'dst')
+
+    with Model.open_readonly(tmpdir) as db:
+        assert [e.pk for e in db.reader('dst')] == [1, 2, 3, 4]
+
+
+def test_prefetch_reads_both_registries(db):
+    db.clone_reader('src', 'dst')
+    with db.reader('dst') as reader:
+        reader.ack(1)
+
+    assert [e.pk for e in db.reader('dst').prefetch(batch_size=3)] == \
+        list(range(3, 20, 2))
+
+
+@settings(max_examples=25, deadline=None)
+@given(base=st.sets(st.integers(min_value=0, max_value=30)),
+       src=st.sets(st.integers(min_value=0, max_value=30)),
+       dst=st.sets(st.integers(min_value=0, max_value=30)))
+def test_layers_read_like_a_single_registry(tmpdir_factory, base, src, dst):
+    with ChunkedModel.open(str(tmpdir_factory.mktemp('db'))) as db:
+        db.bulk_create([ChunkedModel(idx=i) for i in range(31)])
+        db.register_reader('src')
+        for pks, name in ((base, 'src'), (src, 'src'), (dst, 'dst')):
+            with db.reader(name) as reader:
+                for pk in pks:
+                    reader.ack(pk)
+            if name == 'src' and 'dst' not in db.list_readers():
+                db.clone_reader('src', 'dst')
+
+        for name, acked in (('src', base | src), ('dst', base | dst)):
+            expected = [pk for pk in range(31) if pk not in acked]
+            assert pending(db, name) == expected
+            stats = db.registry_stats(name)
+            assert stats.acked == len(acked)
+            with db.readers(write=False) as res:
+                assert stats == db._registry_stats(res, name, cached=False)
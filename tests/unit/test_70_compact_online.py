@@ -0,0 +1,162 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import binlog
+from binlog.connection import Connection
+from binlog.databases import Config
+from binlog.index import TextIndex
+from binlog.model import Model
+
+
+class IndexedModel(Model):
+    name = TextIndex(mandatory=False)
+
+
+def data_size(path):
+    return os.path.getsize(os.path.join(str(path), 'data', 'data.mdb'))
+
+
+def test_compact_online_shrinks_the_data(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(blob='x' * 4096) for _ in range(500)])
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            for i in range(490):
+                reader.ack(i)
+        db.purge()
+
+        before = data_size(tmpdir)
+        assert db.compact_online() == 1
+        assert data_size(tmpdir) < before
+
+        assert [e.pk for e in db.reader()] == list(range(490, 500))
+        assert [e.pk for e in db.reader('myreader')] == list(range(490, 500))
+        assert db.create(blob='').pk == 500
+
+        assert db.compact_online() == 2
+        assert not [p for p in os.listdir(str(tmpdir)) if p.startswith('.')]
+
+
+def test_compact_online_catches_up(tmpdir, monkeypatch):
+    with IndexedModel.open(tmpdir) as db:
+        db.bulk_create([IndexedModel(name=str(i % 3)) for i in range(30)])
+        db.register_reader('myreader')
+
+        copy_data = Connection._copy_data
+
+        def _copy_data(self, path):
+            copy_data(self, path)
+            # Changes made while the copy was written.
+            self.bulk_create([IndexedModel(name='new') for i in range(5)])
+            with self.reader('myreader') as reader:
+                for i in range(5):
+                    reader.ack(i)
+            self.remove(self.reader()[3])
+
+        monkeypatch.setattr(Connection, '_copy_data', _copy_data)
+
+        db.compact_online()
+
+        pks = [pk for pk in range(35) if pk != 3]
+        assert [e.pk for e in db.reader()] == pks
+        assert [e.pk for e in db.reader().filter(name='0')] == [
+            pk for pk in range(0, 30, 3) if pk != 3]
+        assert [e.pk for e in db.reader().filter(name='new')] == list(
+            range(30, 35))
+        assert [e.pk for e in db.reader('myreader')] == pks[4:]
+
+
+def test_readers_are_copied_without_blocking_the_writers(tmpdir,
+                                                         monkeypatch):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+
+        makedirs = os.makedirs
+        blocked = []
+
+        def _makedirs(path, *args, **kwargs):
+            if not path.endswith('readers.compact'):
+                return makedirs(path, *args, **kwargs)
+            env = db.data_env
+
+            def write():
+                with env.begin(write=True):
+                    pass
+
+            writer = threading.Thread(target=write)
+            writer.start()
+            writer.join(1)
+            blocked.append(writer.is_alive())
+            makedirs(path, *args, **kwargs)
+
+        monkeypatch.setattr(os, 'makedirs', _makedirs)
+        db.compact_online()
+        assert blocked == [False]
+
+
+def test_staleness_is_checked_once_per_commit(tmpdir, monkeypatch):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            list(reader)
+
+        lookups = []
+        cursor = Config.cursor
+
+        def _cursor(res, *args, **kwargs):
+            lookups.append(res.env)
+            return cursor(res, *args, **kwargs)
+
+        monkeypatch.setattr(Config, 'cursor', _cursor)
+        for _ in range(3):
+            assert db.reader()[0].pk == 0
+        assert lookups == []
+
+        db.create(idx=1)
+        lookups.clear()
+        assert db.reader()[1].pk == 1
+        assert lookups == [db.data_env]
+
+
+WRITER = """
+import os, sys, time
+from binlog.model import Model
+
+path = sys.argv[1]
+with Model.open(path) as db:
+    db.create(idx='before')
+    open(os.path.join(path, 'ready'), 'w').close()
+    while not os.path.exists(os.path.join(path, 'go')):
+        time.sleep(0.05)
+    db.create(idx='after')
+    db.register_reader('other')
+"""
+
+
+def test_other_processes_reopen_after_compaction(tmpdir):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(binlog.__file__))
+
+    with Model.open(tmpdir) as db:
+        db.create(idx='first')
+        writer = subprocess.Popen([sys.executable, '-c', WRITER, str(tmpdir)],
+                                  env=env)
+        try:
+            deadline = time.time() + 30
+            while not tmpdir.join('ready').exists():
+                assert time.time() < deadline
+                time.sleep(0.05)
+
+            db.compact_online()
+            tmpdir.join('go').write('')
+            assert writer.wait(timeout=30) == 0
+        finally:
+            writer.kill()
+
+        assert [e['idx'] for e in db.reader()] == ['first', 'before', 'after']
+        assert db.list_readers() == ['other']
@@ -0,0 +1,130 @@
+import pytest
+
+from binlog.index import NumericIndex
+from binlog.model import Model
+
+
+def test_data_handles_are_cached_at_open(tmpdir):
+    with Model.open(tmpdir) as db:
+        dbs = db._data_dbs
+        assert dbs is not None
+
+        with db.data(write=False) as res:
+            assert res.db is dbs
+        db.create(idx=0)
+        assert db._data_dbs is dbs
+
+
+def test_data_handles_survive_an_abort(tmpdir):
+    class IndexedModel(Model):
+        idx = NumericIndex(mandatory=True)
+
+    with IndexedModel.open(tmpdir) as db:
+        dbs = db._data_dbs
+        with pytest.raises(ValueError):
+            db.create(other=0)
+        assert db._data_dbs is dbs
+
+        db.create(idx=0)
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader.filter(idx=0)] == [0]
+
+
+def test_consumers_do_not_reopen_the_data_databases(tmpdir, monkeypatch):
+    from binlog.connection import Connection
+
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+
+    with Model.open(tmpdir) as db:
+        opened = []
+        get_db = Connection._get_db
+
+        def _get_db(self, *args, **kwargs):
+            opened.append(args)
+            return get_db(self, *args, **kwargs)
+
+        monkeypatch.setattr(Connection, '_get_db', _get_db)
+        reader = db.reader()
+        assert [reader[pk].pk for pk in range(10)] == list(range(10))
+        assert opened == []
+
+
+def test_readers_handles_are_cached(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        assert 'myreader' in db._readers_dbs
+
+        db.unregister_reader('myreader')
+        assert 'myreader' not in db._readers_dbs
+
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            assert list(reader) == []
+
+
+def test_nested_reads_share_the_snapshot_transaction(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+        db.register_reader('myreader')
+
+        with db.snapshot():
+            with db.data(write=False) as outer:
+                with db.data(write=False) as inner:
+                    assert outer.txn is inner.txn
+                with db.data(write=True) as write:
+                    assert write.txn is not outer.txn
+
+            with db.readers(write=False) as outer:
+                with db.readers(write=False) as inner:
+                    assert outer.txn is inner.txn
+        assert db._data_read is None
+        assert db._readers_read is None
+
+
+def test_reads_outside_of_a_snapshot_are_not_shared(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+
+        with db.data(write=False) as outer:
+            with db.data(write=False) as inner:
+                assert outer.txn is not inner.txn
+        assert db._reads == {'data_env': 0, 'readers_env': 0}
+
+
+def test_paused_iterator_does_not_pin_later_reads(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+        reader = db.reader()
+
+        it = iter(reader)
+        next(it)
+        entry = db.create(idx=1)
+
+        assert reader[entry.pk]['idx'] == 1
+        assert [e['idx'] for e in reader] == [0, 1]
+
+
+def test_paused_iterator_of_a_closed_connection(tmpdir):
+    db = Model.open(tmpdir)
+    db.create(idx=0)
+    it = iter(db.reader())
+    next(it)
+    db.close()
+
+    it.close()
+
+
+def test_interleaved_iterations(tmpdir):
+    with Model.open(tmpdir) as db:
+        entries = [Model(idx=i) for i in range(10)]
+        db.bulk_create(entries)
+
+        with db.reader() as reader:
+            it1 = iter(reader)
+            it2 = iter(reader)
+            assert next(it1) == entries[0]
+            assert next(it2) == entries[0]
+            assert list(it1) == entries[1:]
+            assert list(it2) == entries[1:]
+            assert db._data_read is None
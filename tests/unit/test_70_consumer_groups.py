@@ -0,0 +1,198 @@
+import pytest
+
+from binlog.exceptions import ReaderDoesNotExist
+from binlog.model import Model
+
+
+def test_claim_anonymous_reader(tmpdir):
+    with Model.open(tmpdir) as db:
+        with db.reader() as reader:
+            with pytest.raises(RuntimeError):
+                reader.claim()
+
+
+def test_claim_non_existing_reader(tmpdir):
+    with Model.open(tmpdir) as db:
+        with pytest.raises(ReaderDoesNotExist):
+            db.claim('nonexistingreader', 'owner')
+
+
+def test_claim_empty_binlog(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            assert reader.claim() == []
+            assert not db.leases('myreader')
+
+
+def test_workers_claim_disjoint_entries(tmpdir):
+    with Model.open(tmpdir) as db:
+        entries = [Model(idx=i) for i in range(10)]
+        db.bulk_create(entries)
+        db.register_reader('myreader')
+
+        worker1 = db.reader('myreader')
+        worker2 = db.reader('myreader')
+
+        assert worker1.claim(size=4) == entries[:4]
+        assert worker2.claim(size=4) == entries[4:8]
+        assert worker1.claim(size=4) == entries[8:]
+        assert worker2.claim(size=4) == []
+
+        assert len(db.leases('myreader')) == 3
+
+
+def test_commit_persists_acks_and_releases_leases(tmpdir):
+    with Model.open(tmpdir) as db:
+        entries = [Model(idx=i) for i in range(10)]
+        db.bulk_create(entries)
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as worker1:
+            for entry in worker1.claim(size=5):
+                worker1.ack(entry)
+
+        assert not db.leases('myreader')
+
+        with db.reader('myreader') as worker2:
+            assert worker2.claim(size=10) == entries[5:]
+
+
+def test_released_entries_not_acked_are_claimed_again(tmpdir):
+    with Model.open(tmpdir) as db:
+        entries = [Model(idx=i) for i in range(10)]
+        db.bulk_create(entries)
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as worker1:
+            claimed = worker1.claim(size=5)
+            worker1.ack(claimed[0])
+            worker1.ack(claimed[1])
+
+        with db.reader('myreader') as worker2:
+            assert worker2.claim(size=5) == entries[2:7]
+
+
+def test_expired_leases_are_delivered_again(tmpdir):
+    with Model.open(tmpdir) as db:
+        entries = [Model(idx=i) for i in range(10)]
+        db.bulk_create(entries)
+        db.register_reader('myreader')
+
+        crashed = db.reader('myreader')
+        assert crashed.claim(size=5, ttl=0) == entries[:5]
+
+        worker = db.reader('myreader')
+        assert worker.claim(size=5) == entries[:5]
+
+        # The crashed worker lost its lease.
+        assert not db.release(crashed.leases[0])
+
+
+def test_acks_of_every_worker_are_merged(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+
+        worker1 = db.reader('myreader')
+        worker2 = db.reader('myreader')
+        for worker in (worker1, worker2):
+            for entry in worker.claim(size=3):
+                worker.ack(entry)
+        worker2.commit()
+        worker1.commit()
+
+        with db.reader('myreader') as reader:
+            assert [e['idx'] for e in reader] == list(range(6, 10))
+
+
+def test_renew_lease(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+
+        lease = db.claim('myreader', 'owner', size=5, ttl=0)
+        renewed = db.renew(lease, ttl=60)
+        assert renewed.expires > lease.expires
+        assert db.leases('myreader') == [renewed]
+
+        assert db.renew(lease._replace(owner='other')) is None
+
+
+def test_leases_are_not_readers(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+        db.claim('myreader', 'owner')
+
+        assert db.list_readers() == ['myreader']
+
+
+@pytest.mark.parametrize('name', ['leases', 'stats', 'clones', 'catalog',
+                                  'registries', 'watermarks'])
+def test_readers_named_like_internal_databases(tmpdir, name):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader(name)
+        with db.reader(name) as reader:
+            reader.ack(0)
+
+        db.register_reader('other')
+        db.clone_reader(name, 'clone')
+        db.claim('other', 'owner')
+
+        assert sorted(db.list_readers()) == sorted([name, 'other', 'clone'])
+        assert [e.pk for e in db.reader(name)] == list(range(1, 10))
+        assert db.registry_stats(name).acked == 1
+
+
+def test_missing_databases_get_the_default(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        with db.readers(write=False) as res:
+            assert res.db.get('nonexisting', default=None) is None
+
+
+def test_commit_keeps_the_leases_in_progress(tmpdir):
+    with Model.open(tmpdir) as db:
+        entries = [Model(idx=i) for i in range(10)]
+        db.bulk_create(entries)
+        db.register_reader('myreader')
+
+        worker1 = db.reader('myreader')
+        claimed = worker1.claim(size=5)
+        worker1.ack(claimed[0])
+        worker1.commit()
+        assert len(db.leases('myreader')) == 1
+
+        worker2 = db.reader('myreader')
+        assert worker2.claim(size=5) == entries[5:]
+
+        for entry in claimed[1:]:
+            worker1.ack(entry)
+        worker1.commit()
+        assert worker1.leases == []
+        assert db.leases('myreader') == worker2.leases
+
+
+def test_failed_commit_keeps_the_leases(tmpdir):
+    from unittest.mock import patch
+    from binlog.connection import Connection
+
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader.child')
+
+        worker = db.reader('myreader.child')
+        for entry in worker.claim(size=3):
+            worker.recursive_ack(entry)
+
+        def failing(self, name, added):
+            raise RuntimeError("boom")
+
+        with patch.object(Connection, 'save_registry', failing):
+            with pytest.raises(RuntimeError):
+                worker.commit()
+
+        assert len(worker.leases) == 1
+        assert len(db.leases('myreader.child')) == 1
@@ -0,0 +1,81 @@
+from datetime import datetime
+import io
+import json
+import pickle
+
+import pytest
+
+from binlog.exceptions import FrameError
+from binlog.frames import ENTRY, iter_frames
+from binlog.model import Model
+
+
+def test_export_frames(tmpdir):
+    path = str(tmpdir.join('export.bin'))
+    with Model.open(str(tmpdir.mkdir('db'))) as db:
+        entries = [Model(idx=i) for i in range(20)]
+        db.bulk_create(entries)
+
+        assert db.export(path) == 20
+
+    with open(path, 'rb') as fileobj:
+        frames = list(iter_frames(fileobj))
+
+    assert [f[0] for f in frames] == [ENTRY] * 20
+    assert [f[1] for f in frames] == list(range(20))
+    assert [pickle.loads(f[2]) for f in frames] == entries
+
+
+def test_export_range(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(20)])
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            reader.ack(7)
+        assert db.remove(db.reader()[7])
+
+        out = io.BytesIO()
+        assert db.export(out, 5, 10) == 4
+        out.seek(0)
+        assert [f[1] for f in iter_frames(out)] == [5, 6, 8, 9]
+
+
+def test_export_empty(tmpdir):
+    with Model.open(tmpdir) as db:
+        out = io.BytesIO()
+        assert db.export(out) == 0
+        out.seek(0)
+        assert list(iter_frames(out)) == []
+
+
+def test_export_jsonl(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0, when=datetime(2017, 1, 1))
+        db.create(idx=1)
+
+        out = io.BytesIO()
+        assert db.export(out, format='jsonl') == 2
+
+    lines = [json.loads(l) for l in out.getvalue().splitlines()]
+    assert lines == [{'pk': 0, 'entry': {'idx': 0,
+                                         'when': '2017-01-01 00:00:00'}},
+                     {'pk': 1, 'entry': {'idx': 1}}]
+
+
+def test_export_unknown_format(tmpdir):
+    with Model.open(tmpdir) as db:
+        with pytest.raises(ValueError):
+            db.export(io.BytesIO(), format='parquet')
+
+
+def test_truncated_stream_is_detected(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(2)])
+        out = io.BytesIO()
+        db.export(out)
+
+    with pytest.raises(FrameError):
+        list(iter_frames(io.BytesIO(out.getvalue()[:-1])))
+
+    with pytest.raises(FrameError):
+        list(iter_frames(io.BytesIO(b'garbage')))
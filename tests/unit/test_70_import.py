@@ -0,0 +1,125 @@
+import io
+
+import pytest
+
+from binlog.exceptions import IntegrityError, FrameError
+from binlog.frames import write_frame, write_magic
+from binlog.index import TextIndex
+from binlog.model import Model
+
+
+class IndexedModel(Model):
+    name = TextIndex(mandatory=False)
+
+
+def export(db, *args):
+    out = io.BytesIO()
+    db.export(out, *args)
+    out.seek(0)
+    return out
+
+
+def test_import_keeps_pks(tmpdir):
+    with Model.open(str(tmpdir.mkdir('src'))) as src:
+        src.bulk_create([Model(idx=i) for i in range(20)])
+        stream = export(src, 10)
+
+    with Model.open(str(tmpdir.mkdir('dst'))) as dst:
+        assert dst.import_(stream) == 10
+
+        reader = dst.reader()
+        assert [e.pk for e in reader] == list(range(10, 20))
+        assert [e['idx'] for e in reader] == list(range(10, 20))
+
+        # New entries are appended after the imported ones.
+        assert dst.create(idx=20).pk == 20
+
+
+def test_import_is_registry_compatible(tmpdir):
+    with Model.open(str(tmpdir.mkdir('src'))) as src:
+        src.bulk_create([Model(idx=i) for i in range(20)])
+        src.register_reader('myreader')
+        with src.reader('myreader') as reader:
+            for i in range(0, 20, 2):
+                reader.ack(i)
+        pending = [e.pk for e in src.reader('myreader')]
+        stream = export(src)
+
+    with Model.open(str(tmpdir.mkdir('dst'))) as dst:
+        dst.import_(stream)
+        dst.register_reader('myreader')
+        with dst.reader('myreader') as reader:
+            for i in range(0, 20, 2):
+                reader.ack(i)
+
+        assert [e.pk for e in dst.reader('myreader')] == pending
+
+
+def test_import_builds_indexes(tmpdir):
+    with IndexedModel.open(str(tmpdir.mkdir('src'))) as src:
+        src.bulk_create([IndexedModel(name=n)
+                         for n in ['b', 'a', None, 'b', 'c', 'a']])
+        stream = export(src)
+
+    with IndexedModel.open(str(tmpdir.mkdir('dst'))) as dst:
+        assert dst.import_(stream) == 6
+
+        reader = dst.reader()
+        assert [e.pk for e in reader.filter(name='a')] == [1, 5]
+        assert [e.pk for e in reader.filter(name='b')] == [0, 3]
+
+
+def test_import_builds_indexes_after_existing_entries(tmpdir):
+    with IndexedModel.open(str(tmpdir.mkdir('src'))) as src:
+        src.bulk_create([IndexedModel(name=n)
+                         for n in ['b', 'a', None, 'b', 'c', 'a']])
+        stream = export(src, 1)
+
+    with IndexedModel.open(str(tmpdir.mkdir('dst'))) as dst:
+        dst.create(name='a')
+        assert dst.import_(stream) == 5
+
+        reader = dst.reader()
+        assert [e.pk for e in reader.filter(name='a')] == [0, 1, 5]
+        assert [e.pk for e in reader.filter(name='b')] == [3]
+        assert [e.pk for e in reader.filter(name='c')] == [4]
+
+
+def test_import_rejects_used_pks(tmpdir):
+    with Model.open(str(tmpdir.mkdir('src'))) as src:
+        src.bulk_create([Model(idx=i) for i in range(10)])
+        stream = export(src, 5)
+
+    with Model.open(str(tmpdir.mkdir('dst'))) as dst:
+        dst.bulk_create([Model(idx=i) for i in range(8)])
+
+        with pytest.raises(IntegrityError):
+            dst.import_(stream)
+
+        # Nothing was imported.
+        assert [e['idx'] for e in dst.reader()] == list(range(8))
+        assert dst.create(idx=8).pk == 8
+
+
+def test_import_rejects_unordered_frames(tmpdir):
+    stream = io.BytesIO()
+    write_magic(stream)
+    write_frame(stream, b'E', 2, Model.V.db_value({}))
+    write_frame(stream, b'E', 1, Model.V.db_value({}))
+    stream.seek(0)
+
+    with Model.open(tmpdir) as db:
+        with pytest.raises(IntegrityError):
+            db.import_(stream)
+        assert list(db.reader()) == []
+
+
+def test_import_rejects_unknown_frames(tmpdir):
+    stream = io.BytesIO()
+    write_magic(stream)
+    write_frame(stream, b'?', 0, b'')
+    stream.seek(0)
+
+    with Model.open(tmpdir) as db:
+        with pytest.raises(FrameError):
+            db.import_(stream)
@@ -0,0 +1,96 @@
+from unittest.mock import patch
+
+from binlog.connection import Connection
+from binlog.model import Model
+
+
+def test_commit_clears_the_memory_registry(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            reader.ack(0)
+            reader.ack(1)
+            reader.commit()
+            assert reader.registry.acked == []
+
+            # Committed acks are still honored.
+            assert 0 in reader.registry
+            assert [e.pk for e in reader] == list(range(2, 10))
+
+
+def test_commit_saves_only_new_acks(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+
+        saved = []
+        save_registry = Connection.save_registry
+
+        def spy(self, name, added):
+            saved.append(list(added.acked))
+            return save_registry(self, name, added)
+
+        with patch.object(Connection, 'save_registry', spy):
+            with db.reader('myreader') as reader:
+                for i in range(5):
+                    reader.ack(i)
+                reader.commit()
+                reader.ack(7)
+                reader.commit()
+                reader.commit()
+
+        # Commits without new acks don't write.
+        assert saved == [[(0, 4)], [(7, 7)]]
+        assert [e.pk for e in db.reader('myreader')] == [5, 6, 8, 9]
+
+
+def test_commit_keeps_the_saved_segments_around(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(20)])
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            for pk in (2, 8, 12):
+                reader.ack(pk)
+            reader.commit()
+            reader.ack(0)
+            reader.commit()
+            for pk in range(5, 11):
+                reader.ack(pk)
+
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reader] == [1, 3, 4, 11] + list(range(13, 20))
+
+
+def test_commits_of_unrelated_segments(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            reader.ack(2)
+            reader.commit()
+            reader.ack(8)
+            reader.commit()
+            # Touches (8, 8) only, (2, 2) must be kept.
+            reader.ack(7)
+
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reader] == [0, 1, 3, 4, 5, 6, 9]
+
+
+def test_commits_while_iterating_clear_the_memory_registry(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(30)])
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            for entry in reader:
+                reader.ack(entry)
+                if entry.pk % 10 == 9:
+                    reader.commit()
+                    assert reader.registry.acked == []
+
+        assert db.registry_stats('myreader').acked == 30
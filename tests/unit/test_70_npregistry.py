@@ -0,0 +1,106 @@
+from hypothesis import given
+from hypothesis import strategies as st
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from binlog.model import Model
+from binlog.npregistry import NumpyRegistry
+from binlog.registry import Registry, S
+
+
+pks = st.lists(st.integers(min_value=0, max_value=200))
+
+
+def registry(points):
+    r = Registry()
+    for point in points:
+        r.add(point)
+    return r
+
+
+@given(a=pks, b=pks)
+def test_union(a, b):
+    expected = registry(a) | registry(b)
+    result = (NumpyRegistry.from_registry(registry(a))
+              | NumpyRegistry.from_registry(registry(b)))
+    assert result.acked == expected.acked
+
+
+@given(a=pks, b=pks)
+def test_intersection(a, b):
+    expected = registry(a) & registry(b)
+    result = (NumpyRegistry.from_registry(registry(a))
+              & NumpyRegistry.from_registry(registry(b)))
+    assert result.acked == expected.acked
+
+
+@given(a=pks)
+def test_invert(a):
+    expected = ~registry(a)
+    result = ~NumpyRegistry.from_registry(registry(a))
+    assert result.acked == expected.acked
+
+
+def test_invert_bounds():
+    assert (~NumpyRegistry()).acked == [S(S.MIN, S.MAX)]
+    assert (~NumpyRegistry([S.MIN], [S.MAX])).acked == []
+    assert (~NumpyRegistry([0, 10], [5, S.MAX])).acked == [S(6, 9)]
+
+
+@given(a=pks, points=pks)
+def test_contains_many(a, points):
+    r = registry(a)
+    result = NumpyRegistry.from_registry(r).contains_many(points)
+    assert list(result) == [p in r for p in points]
+
+
+@given(a=pks, stop=st.integers(min_value=0, max_value=250))
+def test_count(a, stop):
+    r = NumpyRegistry.from_registry(registry(a))
+    assert r.count() == len(set(a))
+    assert r.count(stop) == len([p for p in set(a) if p < stop])
+
+
+def test_from_db(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(20)])
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            for i in [0, 1, 2, 5, 7, 8, 19]:
+                reader.ack(i)
+
+        r = NumpyRegistry.from_db(db, 'myreader')
+        assert r.acked == [S(0, 2), S(5, 5), S(7, 8), S(19, 19)]
+        assert r.to_registry().acked == r.acked
+        assert 20 - r.count(20) == len(list(db.reader('myreader')))
+
+
+def test_count_does_not_overflow():
+    total = S.MAX - S.MIN + 1
+    assert NumpyRegistry([S.MIN], [S.MAX]).count() == total
+    assert NumpyRegistry([S.MIN, 10], [5, S.MAX]).count() == total - 4
+
+
+def test_purge_intersects_with_numpy(tmpdir, monkeypatch):
+    loaded = []
+    from_db = NumpyRegistry.from_db.__func__
+
+    def _from_db(cls, connection, name):
+        loaded.append(name)
+        return from_db(cls, connection, name)
+
+    monkeypatch.setattr(NumpyRegistry, 'from_db', classmethod(_from_db))
+
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(20)])
+        for name, pks in (('a', [0, 1, 2, 5, 8, 9]), ('b', [0, 1, 5, 9])):
+            db.register_reader(name)
+            with db.reader(name) as reader:
+                for pk in pks:
+                    reader.ack(pk)
+
+        assert db.purge() == (4, 0)
+        assert sorted(loaded) == ['a', 'b']
+        assert [e.pk for e in db.reader()] == [
+            pk for pk in range(20) if pk not in (0, 1, 5, 9)]
@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import binlog
+from binlog.connection import Connection
+from binlog.exceptions import ReaderDoesNotExist
+from binlog.model import Model
+
+
+REGISTER = """
+import sys
+from binlog.model import Model
+
+with Model.open(sys.argv[1]) as db:
+    db.register_reader(sys.argv[2])
+"""
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    calls = []
+    original = Connection._list_readers
+
+    def _list_readers(self, res):
+        calls.append(1)
+        return original(self, res)
+
+    monkeypatch.setattr(Connection, '_list_readers', _list_readers)
+    return calls
+
+
+def test_reader_lookups_use_the_cached_catalog(tmpdir, scans):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        assert db.list_readers() == ['myreader']
+        del scans[:]
+
+        for _ in range(10):
+            db.reader('myreader')
+        assert db.list_readers() == ['myreader']
+        assert not scans
+
+
+def test_reader_does_not_write(tmpdir, monkeypatch):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        db.list_readers()
+
+        def _begin_write(*args, **kwargs):
+            raise AssertionError("reader() began a write transaction")
+
+        monkeypatch.setattr(db, '_begin_write', _begin_write)
+        db.reader('myreader')
+
+
+@pytest.mark.parametrize('change', ['register', 'clone', 'unregister'])
+def test_changes_invalidate_the_catalog(tmpdir, scans, change):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        assert db.list_readers() == ['myreader']
+        del scans[:]
+
+        if change == 'register':
+            db.register_reader('other')
+            expected = ['myreader', 'other']
+        elif change == 'clone':
+            db.clone_reader('myreader', 'other')
+            expected = ['myreader', 'other']
+        else:
+            db.unregister_reader('myreader')
+            expected = []
+
+        assert sorted(db.list_readers()) == expected
+        assert len(scans) == 1
+
+
+def test_other_processes_invalidate_the_catalog(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        with pytest.raises(ReaderDoesNotExist):
+            db.reader('other')
+
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.path.dirname(os.path.dirname(binlog.__file__))
+        subprocess.check_call(
+            [sys.executable, '-c', REGISTER, str(tmpdir), 'other'], env=env)
+
+        assert sorted(db.list_readers()) == ['myreader', 'other']
+        db.reader('other')
+
+
+def test_snapshots_see_new_readers_without_writing(tmpdir, monkeypatch):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+
+        with db.snapshot():
+            db.list_readers()
+
+            env = dict(os.environ)
+            env['PYTHONPATH'] = os.path.dirname(
+                os.path.dirname(binlog.__file__))
+            subprocess.check_call(
+                [sys.executable, '-c', REGISTER, str(tmpdir), 'other'],
+                env=env)
+
+            def _begin_write(*args, **kwargs):
+                raise AssertionError("a write transaction was begun")
+
+            monkeypatch.setattr(db, '_begin_write', _begin_write)
+            assert sorted(db.list_readers()) == ['myreader', 'other']
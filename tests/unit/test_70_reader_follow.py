@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import time
+
+import binlog
+from binlog.model import Model
+
+
+WRITER = """
+import sys, time
+from binlog.model import Model
+
+time.sleep(0.2)
+with Model.open(sys.argv[1]) as db:
+    db.create(idx=1)
+"""
+
+
+def test_follow_returns_pending_entries(tmpdir):
+    with Model.open(tmpdir) as db:
+        entries = [Model(idx=i) for i in range(10)]
+        db.bulk_create(entries)
+
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            reader.ack(0)
+            assert list(reader.follow(timeout=0)) == entries[1:]
+
+
+def test_follow_does_not_repeat_unacked_entries(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        db.create(idx=0)
+
+        with db.reader('myreader') as reader:
+            follower = reader.follow(timeout=0)
+            assert next(follower)['idx'] == 0
+
+            db.create(idx=1)
+            assert next(follower)['idx'] == 1
+
+
+def test_create_rings_the_doorbell(tmpdir):
+    with Model.open(tmpdir) as db:
+        with db.doorbell() as doorbell:
+            db.create(idx=0)
+            assert doorbell.wait(0)
+
+            db.bulk_create([Model(idx=1)])
+            assert doorbell.wait(0)
+
+            db.bulk_create([])
+            assert not doorbell.wait(0)
+
+
+def test_follow_wakes_up_on_other_process_writes(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            follower = reader.follow(timeout=10)
+            db.create(idx=0)
+            assert next(follower)['idx'] == 0
+
+            env = dict(os.environ,
+                       PYTHONPATH=os.path.dirname(
+                           os.path.dirname(binlog.__file__)))
+            writer = subprocess.Popen(
+                [sys.executable, '-c', WRITER, str(tmpdir)], env=env)
+            try:
+                start = time.monotonic()
+                assert next(follower)['idx'] == 1
+                assert time.monotonic() - start < 10
+            finally:
+                assert writer.wait() == 0
@@ -0,0 +1,110 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import binlog
+from binlog.model import Model
+
+
+CONSUMER = """
+import sys
+from binlog.model import Model
+
+opener = getattr(Model, sys.argv[2])
+with opener(sys.argv[1]) as db:
+    reader = db.reader(sys.argv[3] or None)
+    print(','.join(str(e.pk) for e in reader.prefetch(batch_size=3)))
+"""
+
+
+def test_prefetch_empty_binlog(tmpdir):
+    with Model.open(tmpdir) as db:
+        with db.reader() as reader:
+            assert list(reader.prefetch()) == []
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 100])
+def test_prefetch_anonymous_reader(tmpdir, batch_size):
+    with Model.open(tmpdir) as db:
+        entries = [Model(idx=i) for i in range(10)]
+        db.bulk_create(entries)
+
+        with db.reader() as reader:
+            assert list(reader.prefetch(batch_size=batch_size)) == entries
+
+
+def test_prefetch_skips_acked_entries(tmpdir):
+    with Model.open(tmpdir) as db:
+        entries = [Model(idx=i) for i in range(100)]
+        db.bulk_create(entries)
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            for i in range(10, 20):
+                reader.ack(i)
+            reader.ack(50)
+
+        with db.reader('myreader') as reader:
+            for i in range(90, 100):
+                reader.ack(i)
+
+            expected = list(reader)
+            assert len(expected) == 79
+            assert list(reader.prefetch(depth=1, batch_size=7)) == expected
+
+
+def test_prefetch_entries_are_saved(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            entry = next(reader.prefetch())
+            assert entry.saved
+            assert entry.pk == 0
+            assert reader.ack(entry)
+
+
+def test_prefetch_stops_the_helper_thread_on_close(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(1000)])
+
+        with db.reader() as reader:
+            before = threading.active_count()
+            it = reader.prefetch(depth=1, batch_size=1)
+            next(it)
+            assert threading.active_count() == before + 1
+            it.close()
+            assert threading.active_count() == before
+
+
+def test_prefetch_arguments(tmpdir):
+    with Model.open(tmpdir) as db:
+        with db.reader() as reader:
+            with pytest.raises(ValueError):
+                next(reader.prefetch(depth=0))
+            with pytest.raises(ValueError):
+                next(reader.prefetch(batch_size=0))
+
+
+@pytest.mark.parametrize('opener', ['open', 'open_readonly'])
+@pytest.mark.parametrize('name', ['', 'myreader'])
+def test_prefetch_in_a_process_that_never_wrote(tmpdir, opener, name):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            reader.ack(0)
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(binlog.__file__))
+    output = subprocess.check_output(
+        [sys.executable, '-c', CONSUMER, str(tmpdir), opener, name],
+        env=env)
+
+    start = 1 if name else 0
+    assert output.decode().strip() == ','.join(
+        str(pk) for pk in range(start, 10))
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta, timezone
+import time
+
+import pytest
+
+from binlog.exceptions import BadUsageError
+from binlog.model import Model
+
+
+class TimedModel(Model):
+    __meta_timestamp_every__ = 1
+
+
+def create_in_batches(db, batches):
+    """Create every batch in its own transaction, recording the times."""
+    times = []
+    entries = []
+    for size in batches:
+        times.append(datetime.now(timezone.utc))
+        batch = [TimedModel(idx=len(entries) + i) for i in range(size)]
+        db.bulk_create(batch)
+        entries.extend(batch)
+        time.sleep(0.01)
+    times.append(datetime.now(timezone.utc))
+    return times, entries
+
+
+def test_since_without_timestamps_raises(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            with pytest.raises(BadUsageError):
+                list(reader.since(datetime.now(timezone.utc)))
+
+
+def test_since(tmpdir):
+    with TimedModel.open(tmpdir) as db:
+        times, entries = create_in_batches(db, [3, 4, 5])
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            assert list(reader.since(times[0])) == entries
+            assert list(reader.since(times[1])) == entries[3:]
+            assert list(reader.since(times[2])) == entries[7:]
+            assert list(reader.since(times[3])) == []
+
+
+def test_since_skips_acked_entries(tmpdir):
+    with TimedModel.open(tmpdir) as db:
+        times, entries = create_in_batches(db, [3, 4])
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            reader.ack(entries[4])
+            assert list(reader.since(times[1])) == entries[3:4] + entries[5:]
+
+
+def test_between(tmpdir):
+    with TimedModel.open(tmpdir) as db:
+        times, entries = create_in_batches(db, [3, 4, 5])
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            assert list(reader.between(times[0], times[1])) == entries[:3]
+            assert list(reader.between(times[1], times[2])) == entries[3:7]
+            assert list(reader.between(times[0], times[3])) == entries
+
+
+def test_since_accepts_aware_datetimes(tmpdir):
+    with TimedModel.open(tmpdir) as db:
+        times, entries = create_in_batches(db, [3, 4])
+        db.register_reader('myreader')
+
+        since = times[1].astimezone(timezone(timedelta(hours=2)))
+        with db.reader('myreader') as reader:
+            assert list(reader.since(since)) == entries[3:]
+
+
+def test_samples_are_sparse(tmpdir):
+    class SparseModel(Model):
+        __meta_timestamp_every__ = 10
+
+    with SparseModel.open(tmpdir) as db:
+        db.bulk_create([SparseModel(idx=i) for i in range(25)])
+        time.sleep(0.01)
+        t0 = datetime.now(timezone.utc)
+        entries = [SparseModel(idx=i) for i in range(25, 35)]
+        db.bulk_create(entries)
+
+        # Both transactions cross a multiple of 10, so both are sampled.
+        assert db.time_range(t0) == (25, None)
+        assert db.time_range(datetime.now(timezone.utc)) == (35, None)
+        assert db.time_range(datetime(2000, 1, 1)) == (None, None)
+        assert db.time_range(datetime(2000, 1, 1), t0) == (None, 35)
+
+
+def test_between_rounds_until_up(tmpdir):
+    class SparseModel(Model):
+        __meta_timestamp_every__ = 10
+
+    with SparseModel.open(tmpdir) as db:
+        t0 = datetime.now(timezone.utc)
+        db.bulk_create([SparseModel(idx=i) for i in range(11)])
+        # Not sampled: no multiple of 10 between 11 and 13.
+        entries = [db.create(idx=i) for i in range(11, 14)]
+        time.sleep(0.01)
+        t1 = datetime.now(timezone.utc)
+        assert db.time_range(t0, t1) == (None, None)
+
+        db.bulk_create([SparseModel(idx=i) for i in range(14, 24)])
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reader.between(t0, t1)] == list(range(24))
+            assert entries[-1].pk in [e.pk for e in reader.between(t1, t1)]
+
+
+def test_naive_datetimes_are_utc(tmpdir):
+    with TimedModel.open(tmpdir) as db:
+        times, entries = create_in_batches(db, [3, 4])
+        naive = times[1].replace(tzinfo=None)
+        assert db.time_range(naive) == db.time_range(times[1]) == (3, None)
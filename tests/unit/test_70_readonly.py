@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import binlog
+from binlog.connection import ReadonlyConnection
+from binlog.exceptions import BadUsageError
+from binlog.model import Model
+
+
+def run(code, *args):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(binlog.__file__))
+    subprocess.check_call([sys.executable, '-c', code] + list(args),
+                          env=env)
+
+
+WRITER = """
+import sys
+from binlog.model import Model
+
+with Model.open(sys.argv[1], map_size=int(sys.argv[2])) as db:
+    db.bulk_create([Model(blob='x' * 4096) for _ in range(int(sys.argv[3]))])
+    db.register_reader(sys.argv[4])
+"""
+
+
+@pytest.fixture
+def binlog_path(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            reader.ack(0)
+    return tmpdir
+
+
+def test_open_readonly(binlog_path):
+    with Model.open_readonly(binlog_path) as db:
+        assert isinstance(db, ReadonlyConnection)
+        assert [e['idx'] for e in db.reader()] == list(range(10))
+        assert db.list_readers() == ['myreader']
+        assert [e.pk for e in db.reader('myreader')] == list(range(1, 10))
+        assert db.watermark('myreader') == 1
+
+
+def test_readonly_and_writable_connections_are_not_mixed(binlog_path):
+    with Model.open(binlog_path):
+        with pytest.raises(ValueError):
+            Model.open_readonly(binlog_path)
+
+    with Model.open_readonly(binlog_path) as db:
+        assert db.kwargs['readonly'] is True
+        with pytest.raises(ValueError):
+            Model.open(binlog_path)
+
+
+def test_closing_a_reader_without_acks(binlog_path):
+    with Model.open_readonly(binlog_path) as db:
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reader] == list(range(1, 10))
+        assert reader.closed
+
+
+@pytest.mark.parametrize('operation', [
+    lambda db: db.create(idx=10),
+    lambda db: db.bulk_create([Model(idx=10)]),
+    lambda db: db.register_reader('other'),
+    lambda db: db.purge()])
+def test_writes_are_rejected(binlog_path, operation):
+    with Model.open_readonly(binlog_path) as db:
+        with pytest.raises(BadUsageError):
+            operation(db)
+
+
+def test_reader_commit_is_rejected(binlog_path):
+    with Model.open_readonly(binlog_path) as db:
+        reader = db.reader('myreader')
+        reader.ack(1)
+        with pytest.raises(BadUsageError):
+            reader.commit()
+
+
+def test_reader_list_follows_other_processes(binlog_path):
+    with Model.open_readonly(binlog_path) as db:
+        assert db.list_readers() == ['myreader']
+        run(WRITER, str(binlog_path), str(10 * 2**20), '1', 'other')
+        assert db.list_readers() == ['myreader', 'other']
+
+
+def test_tolerates_a_growing_map(binlog_path):
+    with Model.open_readonly(binlog_path) as db:
+        assert len(list(db.reader())) == 10
+        run(WRITER, str(binlog_path), str(64 * 2**20), '5000', 'other')
+        assert len(list(db.reader())) == 5010
@@ -0,0 +1,98 @@
+from hypothesis import given, settings
+from hypothesis import strategies as st
+import pytest
+
+from binlog.databases import Stats
+from binlog.exceptions import ReaderDoesNotExist
+from binlog.model import Model
+from binlog.registry import Registry, RegistryStats
+
+
+def walk(db, name):
+    with db.readers(write=False) as res:
+        return db._registry_stats(res, name, cached=False)
+
+
+def test_new_reader_has_empty_stats(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        assert db.registry_stats('myreader') == (0, 0, None, None)
+
+
+def test_stats_of_unknown_reader(tmpdir):
+    with Model.open(tmpdir) as db:
+        with pytest.raises(ReaderDoesNotExist):
+            db.registry_stats('nope')
+
+
+@settings(max_examples=50, deadline=None)
+@given(commits=st.lists(st.sets(st.integers(min_value=0, max_value=100)),
+                        max_size=5))
+def test_stats_are_maintained_by_commits(tmpdir_factory, commits):
+    with Model.open(tmpdir_factory.mktemp('stats')) as db:
+        db.register_reader('myreader')
+        reader = db.reader('myreader')
+        acked = set()
+        for pks in commits:
+            for pk in pks:
+                reader.ack(pk)
+            reader.commit()
+            acked |= pks
+
+        stats = db.registry_stats('myreader')
+        assert stats == walk(db, 'myreader')
+        assert stats.acked == len(acked)
+        assert stats.first == (min(acked) if acked else None)
+        assert stats.last == (max(acked) if acked else None)
+        assert len(reader.registry.db) == stats.segments
+
+
+def test_lag(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+        assert db.lag('myreader') == 10
+
+        with db.reader('myreader') as reader:
+            for pk in (0, 1, 5):
+                reader.ack(pk)
+        assert db.lag('myreader') == 7
+
+
+def test_clone_copies_the_stats(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('src')
+        with db.reader('src') as reader:
+            reader.ack(3)
+            reader.ack(4)
+        db.clone_reader('src', 'dst')
+
+        assert db.registry_stats('dst') == RegistryStats(1, 2, 3, 4)
+
+
+def test_unregister_removes_the_stats(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        db.unregister_reader('myreader')
+
+        with db.readers(write=False) as res:
+            with Stats.cursor(res) as cursor:
+                assert cursor.get('myreader') is None
+
+        assert 'stats' not in db.list_readers()
+
+
+def test_registries_without_stats_are_counted(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        db.save_registry('myreader', Registry())
+        with db.readers() as res:
+            with Stats.cursor(res) as cursor:
+                cursor.delete('myreader')
+
+        assert db.registry_stats('myreader') == (0, 0, None, None)
+
+        with db.reader('myreader') as reader:
+            reader.ack(1)
+            reader.ack(7)
+        assert db.registry_stats('myreader') == (2, 2, 1, 7)
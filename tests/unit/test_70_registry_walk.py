@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+from hypothesis import given, settings
+from hypothesis import strategies as st
+import pytest
+
+from binlog.abstract import Direction
+from binlog.connection import Connection
+from binlog.model import Model
+from binlog.registry import DBRegistry, Registry
+
+
+def fragmented(db, name, pks):
+    db.register_reader(name)
+    registry = Registry()
+    for pk in pks:
+        registry.add(pk)
+    db.save_registry(name, registry)
+    return registry
+
+
+def test_iteration_inside_a_snapshot_uses_one_readers_transaction(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(200)])
+        fragmented(db, 'myreader', range(0, 200, 2))
+
+        begins = []
+        begin = Connection._begin
+
+        def spy(self, env, write):
+            if env is self.readers_env:
+                begins.append(write)
+            return begin(self, env, write)
+
+        reader = db.reader('myreader')
+        with patch.object(Connection, '_begin', spy):
+            with reader.snapshot():
+                assert [e.pk for e in reader] == list(range(1, 200, 2))
+
+        assert len(begins) == 1
+
+
+def test_iteration_keeps_one_readers_transaction_until_commit(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(200)])
+        fragmented(db, 'myreader', range(0, 200, 2))
+
+        begins = []
+        begin = Connection._begin
+
+        def spy(self, env, write):
+            if env is self.readers_env and not write:
+                begins.append(write)
+            return begin(self, env, write)
+
+        reader = db.reader('myreader')
+        with patch.object(Connection, '_begin', spy):
+            it = iter(reader)
+            assert [next(it).pk for _ in range(10)] == list(range(1, 20, 2))
+            walks = len(begins)
+            assert walks <= 2
+
+            # The commit ends the walk transaction, the acks just saved are
+            # seen by the next lookups.
+            reader.ack(21)
+            reader.ack(23)
+            reader.commit()
+            assert db._reads['readers_env'] == 0
+            assert [e.pk for e in it] == list(range(25, 200, 2))
+            assert len(begins) <= walks + 2
+
+        assert db._reads['readers_env'] == 0
+
+
+@pytest.mark.parametrize('direction', [Direction.F, Direction.B])
+def test_cursor_is_reused_inside_a_snapshot(tmpdir, direction):
+    with Model.open(tmpdir) as db:
+        fragmented(db, 'myreader', range(0, 100, 3))
+        registry = DBRegistry('myreader', db, direction=direction)
+
+        with db.snapshot():
+            assert 30 in registry
+            cursor = registry._cached_cursor[1]
+            assert 31 not in registry
+            assert 99 in registry
+            assert registry._cached_cursor[1] is cursor
+
+        # Outside of a snapshot every lookup has its own cursor.
+        assert 0 in registry
+        assert registry._cached_cursor is None
+
+
+@settings(max_examples=50, deadline=None)
+@given(pks=st.sets(st.integers(min_value=0, max_value=300)),
+       probes=st.lists(st.integers(min_value=0, max_value=320)),
+       direction=st.sampled_from([Direction.F, Direction.B]))
+def test_stepping_lookups_match_set_range(tmpdir_factory, pks, probes,
+                                          direction):
+    path = tmpdir_factory.mktemp('walk')
+    with Model.open(path) as db:
+        registry = fragmented(db, 'myreader', sorted(pks))
+        walked = DBRegistry('myreader', db, direction=direction)
+        with db.readers(write=False):
+            for pos in probes:
+                assert (pos in walked) == (pos in registry)
@@ -0,0 +1,192 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+import binlog
+from binlog.exceptions import FrameError
+from binlog.index import TextIndex
+from binlog.model import Model
+from binlog.replication import Follower, Shipper
+
+
+class IndexedModel(Model):
+    name = TextIndex(mandatory=False)
+
+
+def replicate(shipper, follower_db):
+    stream = io.BytesIO()
+    shipper.fileobj = stream
+    shipper.started = False
+    while shipper.ship():
+        pass
+    stream.seek(0)
+    Follower(follower_db, stream).run()
+
+
+def test_entries_are_replicated_with_their_pks(tmpdir):
+    with IndexedModel.open(str(tmpdir.mkdir('primary'))) as primary, \
+            IndexedModel.open(str(tmpdir.mkdir('replica'))) as replica:
+        primary.bulk_create([IndexedModel(name=str(i % 3))
+                             for i in range(25)])
+        reader = primary.reader()
+        for pk in (3, 4, 10):
+            primary.register_reader('tmp')
+            with primary.reader('tmp') as tmp:
+                tmp.ack(reader[pk])
+            primary.remove(reader[pk])
+            primary.unregister_reader('tmp')
+
+        shipper = Shipper(primary, None, batch_size=10)
+        replicate(shipper, replica)
+
+        assert list(replica.reader()) == list(primary.reader())
+        assert ([e.pk for e in replica.reader().filter(name='1')]
+                == [e.pk for e in primary.reader().filter(name='1')])
+
+        # Only the new entries are shipped in later batches.
+        primary.create(name='x')
+        replicate(shipper, replica)
+        assert list(replica.reader()) == list(primary.reader())
+        assert replica.create(name='y').pk == 26
+
+
+def test_registries_are_replicated(tmpdir):
+    with Model.open(str(tmpdir.mkdir('primary'))) as primary, \
+            Model.open(str(tmpdir.mkdir('replica'))) as replica:
+        primary.bulk_create([Model(idx=i) for i in range(20)])
+        primary.register_reader('myreader')
+        primary.register_reader('other')
+
+        shipper = Shipper(primary, None)
+        replicate(shipper, replica)
+        assert replica.list_readers() == primary.list_readers()
+
+        with primary.reader('myreader') as reader:
+            for i in (0, 1, 2, 7):
+                reader.ack(i)
+        primary.unregister_reader('other')
+        replicate(shipper, replica)
+
+        assert replica.list_readers() == ['myreader']
+        assert ([e.pk for e in replica.reader('myreader')]
+                == [e.pk for e in primary.reader('myreader')])
+        assert replica.watermark('myreader') == 3
+
+
+def test_follower_skips_entries_already_applied(tmpdir):
+    with Model.open(str(tmpdir.mkdir('primary'))) as primary, \
+            Model.open(str(tmpdir.mkdir('replica'))) as replica:
+        primary.bulk_create([Model(idx=i) for i in range(10)])
+        replicate(Shipper(primary, None), replica)
+
+        primary.bulk_create([Model(idx=i) for i in range(10, 15)])
+        replicate(Shipper(primary, None), replica)
+
+        assert list(replica.reader()) == list(primary.reader())
+
+
+def test_truncated_batch(tmpdir):
+    with Model.open(str(tmpdir.mkdir('primary'))) as primary, \
+            Model.open(str(tmpdir.mkdir('replica'))) as replica:
+        primary.bulk_create([Model(idx=i) for i in range(10)])
+        stream = io.BytesIO()
+        Shipper(primary, stream).ship()
+
+        truncated = io.BytesIO(stream.getvalue()[:-17])
+        with pytest.raises(FrameError):
+            Follower(replica, truncated).run()
+        assert list(replica.reader()) == []
+
+
+def test_ship_through_a_pipe(tmpdir):
+    primary_path = str(tmpdir.mkdir('primary'))
+    replica_path = str(tmpdir.mkdir('replica'))
+
+    with Model.open(primary_path) as primary:
+        primary.bulk_create([Model(idx=i) for i in range(100)])
+        primary.register_reader('myreader')
+        with primary.reader('myreader') as reader:
+            reader.ack(0)
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(binlog.__file__))
+    command = [sys.executable, '-m', 'binlog.replication']
+    ship = subprocess.Popen(
+        command + ['ship', '--idle-timeout', '0.5', '--batch-size', '30',
+                   'binlog.model:Model', primary_path],
+        stdout=subprocess.PIPE,
+        env=env)
+    follow = subprocess.Popen(
+        command + ['follow', 'binlog.model:Model', replica_path],
+        stdin=ship.stdout,
+        env=env)
+    ship.stdout.close()
+
+    assert ship.wait(timeout=30) == 0
+    assert follow.wait(timeout=30) == 0
+
+    with Model.open(replica_path) as replica:
+        assert [e['idx'] for e in replica.reader()] == list(range(100))
+        assert [e.pk for e in replica.reader('myreader')] == list(range(1, 100))
+
+
+def test_only_changed_registries_are_read(tmpdir):
+    from unittest.mock import patch
+    from binlog.connection import Connection
+
+    with Model.open(str(tmpdir.mkdir('primary'))) as primary, \
+            Model.open(str(tmpdir.mkdir('replica'))) as replica:
+        primary.bulk_create([Model(idx=i) for i in range(10)])
+        for name in ('one', 'two'):
+            primary.register_reader(name)
+
+        shipper = Shipper(primary, None)
+        replicate(shipper, replica)
+
+        read = []
+        registry = Connection._registry
+
+        def spy(self, res, name, **kwargs):
+            if self is primary:
+                read.append(name)
+            return registry(self, res, name, **kwargs)
+
+        with patch.object(Connection, '_registry', spy):
+            replicate(shipper, replica)
+            assert read == []
+
+            with primary.reader('two') as reader:
+                reader.ack(3)
+            del read[:]
+            replicate(shipper, replica)
+            assert read == ['two']
+
+        with replica.reader('two') as reader:
+            assert 3 not in [e.pk for e in reader]
+
+
+
+def test_reregistered_readers_are_replaced(tmpdir):
+    with Model.open(str(tmpdir.mkdir('primary'))) as primary, \
+            Model.open(str(tmpdir.mkdir('replica'))) as replica:
+        primary.bulk_create([Model(idx=i) for i in range(10)])
+        primary.register_reader('myreader')
+        with primary.reader('myreader') as reader:
+            for pk in range(5):
+                reader.ack(pk)
+
+        shipper = Shipper(primary, None)
+        replicate(shipper, replica)
+
+        primary.unregister_reader('myreader')
+        primary.register_reader('myreader')
+        with primary.reader('myreader') as reader:
+            reader.ack(7)
+        replicate(shipper, replica)
+
+        expected = [0, 1, 2, 3, 4, 5, 6, 8, 9]
+        assert [e.pk for e in primary.reader('myreader')] == expected
+        assert [e.pk for e in replica.reader('myreader')] == expected
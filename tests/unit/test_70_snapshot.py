@@ -0,0 +1,78 @@
+import warnings
+
+import pytest
+
+from binlog.exceptions import LongSnapshotWarning
+from binlog.model import Model
+
+
+def test_snapshot_of_empty_binlog(tmpdir):
+    with Model.open(tmpdir) as db:
+        with db.reader() as reader:
+            with reader.snapshot() as snap:
+                assert snap is reader
+                assert list(snap) == []
+
+
+def test_snapshot_is_consistent(tmpdir):
+    with Model.open(tmpdir) as db:
+        entries = [Model(idx=i) for i in range(10)]
+        db.bulk_create(entries)
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            with reader.snapshot() as snap:
+                assert list(snap) == entries
+
+                db.create(idx=10)
+                reader.ack(0)
+                reader.commit()
+
+                assert list(snap) == entries[1:]
+                assert list(snap[5:]) == entries[5:]
+                with pytest.raises(IndexError):
+                    snap[10]
+
+            assert reader[10]['idx'] == 10
+            assert len(list(reader)) == 10
+
+
+def test_snapshot_pins_one_transaction(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+        db.register_reader('myreader')
+
+        with db.snapshot() as snapshot:
+            pinned = db._data_read.res.txn
+            with db.reader('myreader') as reader:
+                list(reader)
+                list(reader.filter(idx=0))
+                with db.data(write=False) as res:
+                    assert res.txn is pinned
+
+            with db.snapshot() as nested:
+                assert nested is snapshot
+
+        assert db._data_read is None
+        assert db._readers_read is None
+
+
+def test_long_snapshot_warning(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+
+        with pytest.warns(LongSnapshotWarning):
+            with db.reader() as reader:
+                with reader.snapshot(warn_after=0):
+                    list(reader)
+
+
+def test_short_snapshot_does_not_warn(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            with db.reader() as reader:
+                with reader.snapshot(warn_after=None):
+                    list(reader)
@@ -0,0 +1,107 @@
+import pytest
+
+from binlog.exceptions import ReaderDoesNotExist
+from binlog.model import Model
+
+
+class TableModel(Model):
+    __meta_registry_layout__ = 'table'
+
+
+class ChunkedTableModel(Model):
+    __meta_registry_layout__ = 'table'
+    __meta_registry_chunk_size__ = 2
+
+
+def table_keys(db):
+    with db.readers(write=False) as res:
+        with res.txn.cursor(res.db['.registries']) as cursor:
+            return [bytes(k) for k in cursor.iternext(values=False)]
+
+
+def test_unknown_layout(tmpdir):
+    class BadModel(Model):
+        __meta_registry_layout__ = 'nope'
+
+    with pytest.raises(ValueError):
+        BadModel.open(tmpdir)
+
+
+def test_readers_are_not_databases(tmpdir):
+    with TableModel.open(tmpdir) as db:
+        db.register_reader('a.b')
+        assert sorted(db.list_readers()) == ['a', 'a.b']
+
+        with db.readers(write=False) as res:
+            with res.txn.cursor() as cursor:
+                names = {bytes(k) for k in cursor.iternext(values=False)}
+        assert b'a' not in names and b'a.b' not in names
+
+
+@pytest.mark.parametrize('model', [TableModel, ChunkedTableModel])
+def test_table_layout_registries(tmpdir, model):
+    with model.open(tmpdir) as db:
+        db.bulk_create([model(idx=i) for i in range(10)])
+        db.register_reader('one')
+        db.register_reader('two')
+
+        with db.reader('one') as reader:
+            for pk in (0, 1, 2, 5, 7):
+                reader.ack(pk)
+        with db.reader('two') as reader:
+            reader.ack(9)
+
+        with db.reader('one') as reader:
+            assert [e.pk for e in reader] == [3, 4, 6, 8, 9]
+            assert [e.pk for e in reader.prefetch()] == [3, 4, 6, 8, 9]
+            assert [e.pk for e in reader.claim(size=2)] == [3, 4]
+        with db.reader('two') as reader:
+            assert [e.pk for e in reader] == list(range(9))
+
+        assert db.registry_stats('one') == (3, 5, 0, 7)
+        assert db.registry_stats('two') == (1, 1, 9, 9)
+
+
+def test_clone_and_unregister_are_range_operations(tmpdir):
+    with TableModel.open(tmpdir) as db:
+        db.bulk_create([TableModel(idx=i) for i in range(10)])
+        db.register_reader('src')
+        with db.reader('src') as reader:
+            for pk in (1, 3, 5):
+                reader.ack(pk)
+
+        db.clone_reader('src', 'dst')
+        with db.reader('dst') as reader:
+            assert [e.pk for e in reader] == [0, 2, 4, 6, 7, 8, 9]
+        assert db.compact_clones() == 1
+        assert len(table_keys(db)) == 6
+
+        db.unregister_reader('src')
+        assert 'src' not in db.list_readers()
+        assert len(table_keys(db)) == 3
+        with db.reader('dst') as reader:
+            assert [e.pk for e in reader] == [0, 2, 4, 6, 7, 8, 9]
+
+        with pytest.raises(ReaderDoesNotExist):
+            db.reader('src')
+
+
+def test_reregistered_reader_starts_empty(tmpdir):
+    with TableModel.open(tmpdir) as db:
+        db.bulk_create([TableModel(idx=i) for i in range(3)])
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            reader.ack(0)
+        db.unregister_reader('myreader')
+
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reader] == [0, 1, 2]
+
+
+def test_readonly_connection_lists_table_readers(tmpdir):
+    with TableModel.open(tmpdir) as db:
+        db.register_reader('myreader')
+
+    with TableModel.open_readonly(tmpdir) as db:
+        assert db.list_readers() == ['myreader']
@@ -0,0 +1,83 @@
+from binlog.model import Model
+from binlog.index import NumericIndex
+
+
+def test_watermark_of_new_reader(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        assert db.watermark('myreader') == 0
+
+
+def test_watermark_is_updated_on_commit(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(20)])
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            for i in range(1, 10):
+                reader.ack(i)
+            assert db.watermark('myreader') == 0
+
+        assert db.watermark('myreader') == 0
+
+        with db.reader('myreader') as reader:
+            reader.ack(0)
+            reader.ack(15)
+
+        assert db.watermark('myreader') == 10
+
+
+def test_cloned_reader_inherits_watermark(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(20)])
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            for i in range(5):
+                reader.ack(i)
+
+        db.clone_reader('myreader', 'clone')
+        assert db.watermark('clone') == 5
+
+
+def test_iteration_starts_at_watermark(tmpdir):
+    with Model.open(tmpdir) as db:
+        entries = [Model(idx=i) for i in range(20)]
+        db.bulk_create(entries)
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as reader:
+            for i in list(range(10)) + [12, 14]:
+                reader.ack(i)
+
+        with db.reader('myreader') as reader:
+            expected = [e for e in entries if e['idx'] not in (12, 14)][10:]
+            assert list(reader) == expected
+            assert list(reader.filter(idx=13)) == [entries[13]]
+            assert list(reader.filter(idx=5)) == []
+
+
+def test_purge_below_watermark_unindexes_entries(tmpdir):
+    class IndexedModel(Model):
+        idx = NumericIndex()
+
+    with IndexedModel.open(tmpdir) as db:
+        db.bulk_create([IndexedModel(idx=i % 2) for i in range(20)])
+        db.register_reader('reader1')
+        db.register_reader('reader2')
+
+        with db.reader('reader1') as reader:
+            for i in range(15):
+                reader.ack(i)
+
+        with db.reader('reader2') as reader:
+            for i in range(10):
+                reader.ack(i)
+            reader.ack(12)
+
+        assert db.purge(chunk_size=3) == (11, 0)
+
+        with db.reader() as reader:
+            remaining = [e.pk for e in reader]
+            assert remaining == [10, 11] + list(range(13, 20))
+            assert [e.pk for e in reader.filter(idx=0)] == [10, 14, 16, 18]